@@ -0,0 +1,142 @@
+"""
+Adaptive admission control for upstream-bound requests
+
+Each worker keeps a concurrency limit on the requests it lets through to
+the MCP server / SDK. The limit adapts AIMD style: it grows by about one
+per limit's worth of calls that finish within the latency target while
+the limit is actually in use, and shrinks multiplicatively when calls run
+slow or fail upstream, at most once per observed latency so one burst of
+slow calls counts as one signal. Requests over the limit are rejected at
+once with 503 and Retry-After rather than waiting behind busy threads
+until the client gives up.
+
+Shedding needs a worker that runs several requests at once, and a limit
+below its thread count: requests beyond the threads wait in the server's
+own queue, where they are never seen. A sync worker (one request at a
+time) can never shed.
+"""
+
+import threading
+import time
+
+
+def overloaded(retry_after):
+    """
+    Error payload for a request shed by admission control
+
+    Returns:
+        tuple: (payload dict, 503)
+    """
+    return {
+        "success": False,
+        "error": "Overloaded",
+        "code": "overloaded",
+        "message": "Too many requests waiting on the upstream; retry shortly",
+        "retry_after": retry_after
+    }, 503
+
+
+class AdaptiveConcurrencyLimit:
+    """
+    AIMD concurrency limit driven by upstream latency
+
+    Args:
+        initial_limit (int): Concurrent calls admitted at startup
+        min_limit (int): Floor for the limit
+        max_limit (int): Ceiling for the limit
+        latency_target (float): Seconds; slower calls shrink the limit
+        backoff (float): Multiplier applied to the limit on a slow/failed call
+        retry_after (float): Seconds suggested to shed clients
+    """
+
+    def __init__(self, initial_limit=20, min_limit=2, max_limit=100, latency_target=10.0,
+                 backoff=0.9, retry_after=2.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.retry_after = retry_after
+
+        self._lock = threading.Lock()
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._stats = {
+            "admitted": 0,
+            "shed": 0,
+            "increases": 0,
+            "decreases": 0
+        }
+
+    @property
+    def limit(self):
+        with self._lock:
+            return int(self._limit)
+
+    def set_max_limit(self, max_limit):
+        """Change the ceiling, bringing the limit and its floor within it"""
+        with self._lock:
+            self.max_limit = max_limit
+            self.min_limit = min(self.min_limit, max_limit)
+            self._limit = min(self._limit, max_limit)
+
+    def try_acquire(self):
+        """Return True and count the call as in flight, or False to shed it"""
+        with self._lock:
+            if self._in_flight >= int(self._limit):
+                self._stats["shed"] += 1
+                return False
+            self._in_flight += 1
+            self._stats["admitted"] += 1
+            return True
+
+    def slot(self):
+        """
+        Admit a call whose end is signalled later, e.g. a streamed response
+
+        Returns:
+            callable: release(ok=True, latency=None), safe to call more than
+                      once; latency defaults to the time since admission.
+                      None if the call was shed.
+        """
+        if not self.try_acquire():
+            return None
+        start = time.monotonic()
+        # Held for good by the first release() call
+        once = threading.Lock()
+
+        def release(ok=True, latency=None):
+            if not once.acquire(blocking=False):
+                return
+            self.release(time.monotonic() - start if latency is None else latency, ok)
+        return release
+
+    def release(self, latency, ok=True):
+        """
+        Finish an admitted call and adapt the limit
+
+        Args:
+            latency (float): Seconds the call took
+            ok (bool): False if the call failed upstream (5xx, timeout)
+        """
+        now = time.monotonic()
+        with self._lock:
+            in_flight = self._in_flight
+            self._in_flight -= 1
+            if not ok or latency > self.latency_target:
+                if now - self._last_decrease >= latency:
+                    self._limit = max(self.min_limit, self._limit * self.backoff)
+                    self._last_decrease = now
+                    self._stats["decreases"] += 1
+            elif in_flight * 2 >= self._limit:
+                # Only grow while the limit is actually being used
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+                self._stats["increases"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["limit"] = int(self._limit)
+            stats["in_flight"] = self._in_flight
+        stats["latency_target_ms"] = round(self.latency_target * 1000)
+        return stats
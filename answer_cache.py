@@ -0,0 +1,196 @@
+"""
+In-process exact-match answer cache
+
+Answers are keyed on the normalized prompt plus the options that were sent
+upstream. Entries are bounded by count and by approximate size, expire after
+a TTL, and are evicted least-recently-used first. An entry past its TTL but
+still inside the stale window is served immediately while a background
+thread fetches a fresh answer (stale-while-revalidate).
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from structured_log import log_event
+
+
+def normalize_prompt(prompt):
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    normalized = " ".join(prompt.lower().split())
+    return re.sub(r"[\s?!.]+$", "", normalized)
+
+
+class _Entry:
+    __slots__ = ("value", "size", "stored_at")
+
+    def __init__(self, value, size, stored_at):
+        self.value = value
+        self.size = size
+        self.stored_at = stored_at
+
+
+class AnswerCache:
+    """
+    Thread-safe LRU + TTL cache for answer payloads
+
+    Args:
+        max_entries (int): Maximum number of cached answers (0 disables the cache)
+        max_bytes (int): Maximum total size of cached answers, measured as JSON
+        ttl (float): Seconds an entry is served as fresh
+        stale_ttl (float): Extra seconds an expired entry may be served while
+                           it is refreshed in the background
+    """
+
+    def __init__(self, max_entries=512, max_bytes=16 * 1024 * 1024, ttl=3600, stale_ttl=600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "refreshes": 0,
+            "refresh_failures": 0
+        }
+
+    @staticmethod
+    def make_key(prompt, options=None, namespace=""):
+        """
+        Build a cache key from a prompt and its upstream options
+
+        Args:
+            prompt (str): The user's question
+            options (dict): Options forwarded to the MCP server
+            namespace (str): Separates routes whose payloads differ in shape
+
+        Returns:
+            str: Hex digest identifying the request
+        """
+        options_json = json.dumps(options or {}, sort_keys=True, default=str)
+        raw = f"{namespace}\0{normalize_prompt(prompt)}\0{options_json}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, key):
+        """
+        Look up a cached answer
+
+        Returns:
+            tuple: (value, is_stale) on a hit, (None, False) on a miss
+        """
+        if not self.enabled:
+            return None, False
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None, False
+
+            age = now - entry.stored_at
+            if age > self.ttl + self.stale_ttl:
+                self._remove(key)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None, False
+
+            self._entries.move_to_end(key)
+            if age > self.ttl:
+                self._stats["stale_hits"] += 1
+                return entry.value, True
+
+            self._stats["hits"] += 1
+            return entry.value, False
+
+    def set(self, key, value):
+        """Store an answer, evicting least-recently-used entries to fit"""
+        if not self.enabled:
+            return
+
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value, size, time.monotonic())
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+
+    def refresh(self, key, loader):
+        """
+        Refresh an entry in a background thread
+
+        Args:
+            key (str): Cache key to refresh
+            loader (callable): Returns a fresh value, or None if the fetch failed
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                value = loader()
+                if value is not None:
+                    self.set(key, value)
+                    with self._lock:
+                        self._stats["refreshes"] += 1
+                else:
+                    with self._lock:
+                        self._stats["refresh_failures"] += 1
+            except Exception as e:
+                log_event("cache.refresh_failed", logging.WARNING, error=str(e))
+                with self._lock:
+                    self._stats["refresh_failures"] += 1
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name="answer-cache-refresh", daemon=True).start()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return hit/miss/eviction counters and current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 4) if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        stats["max_bytes"] = self.max_bytes
+        stats["ttl"] = self.ttl
+        stats["stale_ttl"] = self.stale_ttl
+        return stats
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
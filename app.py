@@ -1,142 +1,508 @@
-from flask import Flask, render_template, request, jsonify
-from pinecone import Pinecone
+from flask import Flask, render_template, request, jsonify, Response, g
 import os
 from dotenv import load_dotenv
-import requests
-import json
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+import fast_json
+import metrics
+import structured_log
+from structured_log import log_event, truncate
+from mcp_client import MCPClient
+from answer_cache import AnswerCache
+from circuit_breaker import CircuitBreaker, is_upstream_failure
+from hedging import HedgedDispatcher
+from singleflight import SingleFlight
+from prober import UpstreamProber
+from pinecone_clients import PineconeClients
+from static_assets import AssetBundle
+from markdown_render import MarkdownRenderer
+from payload_shaping import compact_payload, parse_fields, select_fields
+from compression import ResponseCompressor
+from rate_limiter import SharedTokenBucket
+from retry_policy import RetryPolicy, parse_retryable
+from admission import AdaptiveConcurrencyLimit, overloaded
+from cassette import Cassette
+from deadlines import DEADLINE_HEADER, Deadline, deadline_exceeded, strip_deadline
+from semantic_cache import SemanticCache, HashingEmbedder, PineconeEmbedder, LocalVectorStore, PineconeVectorStore
 
 # Load environment variables
 load_dotenv('env.txt')  # Using env.txt since .env is blocked
 
 app = Flask(__name__)
+app.json = fast_json.FastJSONProvider(app)
 
-# Initialize Pinecone MCP Assistant
-try:
-    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-    # Use your existing MCP assistant
-    assistant = pc.assistant.Assistant(assistant_name="vb")
-    print("✅ Pinecone MCP Assistant 'vb' connected successfully")
-    
-    # Also try to get the index for additional functionality
-    try:
-        index = pc.Index(os.getenv("PINECONE_INDEX_NAME", "veterans-benefits"))
-        print(f"✅ Pinecone Index '{os.getenv('PINECONE_INDEX_NAME', 'veterans-benefits')}' connected successfully")
-    except Exception as e:
-        print(f"⚠️ Warning: Could not connect to Pinecone index: {e}")
-        index = None
-        
-except Exception as e:
-    print(f"❌ Error initializing Pinecone MCP Assistant: {e}")
-    assistant = None
-    index = None
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop("request_start", None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.record_request(route, request.method, response.status_code, time.perf_counter() - start)
+    return response
+
+# Negotiated gzip/brotli/zstd compression for API responses; registered after
+# the metrics hook so it runs first and its CPU time is included in the timings
+response_compressor = None
+if os.getenv("COMPRESSION_ENABLED", "true").lower() == "true":
+    response_compressor = ResponseCompressor(
+        min_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+        preference=os.getenv("COMPRESSION_PREFERENCE", "zstd,br,gzip").split(","),
+        gzip_level=int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+        brotli_quality=int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4")),
+        zstd_level=int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+    )
+    response_compressor.init_app(app)
+
+# Pinecone SDK assistant and index, created by a background warm-up thread so
+# worker boot never waits on the Pinecone control plane
+pinecone_clients = PineconeClients(
+    api_key=os.getenv("PINECONE_API_KEY"),
+    assistant_name="vb",
+    index_name=os.getenv("PINECONE_INDEX_NAME", "veterans-benefits")
+)
+if os.getenv("PINECONE_WARMUP", "true").lower() == "true":
+    pinecone_clients.warm_up()
+
+# Seconds a request that needs the SDK waits for the warm-up to finish
+PINECONE_INIT_WAIT = float(os.getenv("PINECONE_INIT_WAIT", "10"))
 
 # MCP Server configuration
-MCP_SERVER_URL = "https://prod-1-data.ke.pinecone.io/mcp/assistants/vb"
+MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "https://prod-1-data.ke.pinecone.io/mcp/assistants/vb")
 MCP_API_KEY = os.getenv("PINECONE_API_KEY")
 
-def call_mcp_server(prompt, options=None):
+# One pooled keep-alive client per worker process, shared by every route.
+# Sized for the request threads (GUNICORN_THREADS) plus a full-width batch;
+# calls beyond the pool open throwaway connections (pool_block=False)
+mcp_client = MCPClient(
+    MCP_SERVER_URL,
+    MCP_API_KEY,
+    pool_size=int(os.getenv("MCP_POOL_SIZE", "32")),
+    timeout=float(os.getenv("MCP_TIMEOUT", "60"))
+)
+
+# Record/replay of upstream traffic for offline, reproducible perf runs:
+# MCP_CASSETTE_MODE=record passes MCP and SDK calls through and writes them
+# to MCP_CASSETTE_PATH; replay answers them from it, at the recorded speed
+# or, with MCP_CASSETTE_SPEED=fast, immediately
+upstream_cassette = None
+if os.getenv("MCP_CASSETTE_MODE", "off").lower() in ("record", "replay"):
+    upstream_cassette = Cassette(
+        os.getenv("MCP_CASSETTE_PATH", "cassettes/upstream.jsonl.gz"),
+        mode=os.getenv("MCP_CASSETTE_MODE").lower(),
+        speed=os.getenv("MCP_CASSETTE_SPEED", "recorded").lower()
+    )
+    mcp_client = upstream_cassette.wrap_mcp_client(mcp_client)
+    log_event("startup.cassette", mode=upstream_cassette.mode, speed=upstream_cassette.speed, path=upstream_cassette.path)
+
+# Circuit breaker around the MCP endpoint: while open, calls fail fast
+mcp_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("MCP_BREAKER_FAILURE_THRESHOLD", "5")),
+    recovery_timeout=float(os.getenv("MCP_BREAKER_RECOVERY_TIMEOUT", "30")),
+    half_open_max_calls=int(os.getenv("MCP_BREAKER_HALF_OPEN_CALLS", "1"))
+)
+
+CIRCUIT_OPEN_RESPONSE = {
+    "success": False,
+    "error": "Circuit open",
+    "code": "circuit_open",
+    "message": "MCP server is temporarily bypassed after repeated failures"
+}
+
+# Token bucket in front of the MCP endpoint, shared by every worker on the
+# host through a locked state file. Calls over budget queue for up to
+# MCP_RATE_LIMIT_MAX_WAIT seconds (less if their deadline is nearer); the
+# rate halves on a 429 and creeps back up to MCP_RATE_LIMIT_RPS afterwards
+mcp_rate_limiter = None
+if os.getenv("MCP_RATE_LIMIT_ENABLED", "true").lower() == "true":
+    mcp_rate_limiter = SharedTokenBucket(
+        rate=float(os.getenv("MCP_RATE_LIMIT_RPS", "10")),
+        burst=float(os.getenv("MCP_RATE_LIMIT_BURST", "20")),
+        min_rate=float(os.getenv("MCP_RATE_LIMIT_MIN_RPS", "0.5")),
+        recovery_step=float(os.getenv("MCP_RATE_LIMIT_RECOVERY_STEP", "0.1")),
+        max_queue=int(os.getenv("MCP_RATE_LIMIT_MAX_QUEUE", "32")),
+        path=os.getenv("MCP_RATE_LIMIT_PATH", "/tmp/vb-mcp-ratelimit.bin")
+    )
+MCP_RATE_LIMIT_MAX_WAIT = float(os.getenv("MCP_RATE_LIMIT_MAX_WAIT", "5"))
+
+RATE_LIMITED_RESPONSE = {
+    "success": False,
+    "error": "Rate limited",
+    "code": "rate_limited",
+    "message": "MCP call budget exhausted; no slot freed up in time"
+}
+
+# Retries for transient MCP failures (MCP_RETRY_ON codes): full-jitter
+# exponential backoff or the upstream's Retry-After, only while the retry
+# fits the call's timeout, and at most MCP_RETRY_BUDGET_RATIO retries per
+# first attempt over the last MCP_RETRY_BUDGET_WINDOW seconds
+mcp_retry_policy = None
+if int(os.getenv("MCP_RETRY_MAX", "2")) > 0:
+    mcp_retry_policy = RetryPolicy(
+        max_retries=int(os.getenv("MCP_RETRY_MAX", "2")),
+        base_delay=float(os.getenv("MCP_RETRY_BASE_DELAY_MS", "100")) / 1000,
+        max_delay=float(os.getenv("MCP_RETRY_MAX_DELAY_MS", "2000")) / 1000,
+        max_retry_after=float(os.getenv("MCP_RETRY_MAX_RETRY_AFTER", "5")),
+        retryable=parse_retryable(os.getenv("MCP_RETRY_ON", "429,502,503,504,connection")),
+        budget_ratio=float(os.getenv("MCP_RETRY_BUDGET_RATIO", "0.2")),
+        budget_min=int(os.getenv("MCP_RETRY_BUDGET_MIN", "3")),
+        budget_window=float(os.getenv("MCP_RETRY_BUDGET_WINDOW", "10"))
+    )
+
+# Per-request deadlines: default and ceiling for the X-Request-Deadline-Ms
+# header / options.deadline_ms, the share of the remaining time the MCP call
+# may use when the SDK fallback may still follow, and time kept back for
+# parsing and serializing the answer
+DEADLINE_DEFAULT_MS = float(os.getenv("DEADLINE_DEFAULT_MS", "25000"))
+DEADLINE_MAX_MS = float(os.getenv("DEADLINE_MAX_MS", "60000"))
+DEADLINE_MCP_SHARE = float(os.getenv("DEADLINE_MCP_SHARE", "0.7"))
+DEADLINE_PARSE_RESERVE = float(os.getenv("DEADLINE_PARSE_RESERVE_MS", "200")) / 1000
+
+# The Pinecone SDK call takes no timeout, so deadline-bound calls run here
+# and are abandoned (left to finish in the background) when time runs out
+sdk_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SDK_MAX_WORKERS", "16")),
+    thread_name_prefix="sdk"
+)
+
+def request_deadline(options=None):
+    """Deadline for the current request from its header, options or the server default"""
+    return Deadline.for_request(
+        request.headers.get(DEADLINE_HEADER),
+        options if isinstance(options, dict) else None,
+        default_ms=DEADLINE_DEFAULT_MS,
+        max_ms=DEADLINE_MAX_MS
+    )
+
+def stage_timeout(deadline, share=1.0):
+    """
+    Upstream timeout for the next stage of a request
+    
+    Returns:
+        float or None: Seconds (0 when the deadline leaves no time), or None
+                       without a deadline, meaning the client default
+    """
+    if deadline is None:
+        return None
+    return deadline.budget(share, reserve=DEADLINE_PARSE_RESERVE, cap=mcp_client.timeout)
+
+def acquire_mcp_slot(timeout):
+    """
+    Wait for a rate limiter token before calling the MCP server
+    
+    Args:
+        timeout (float): The call's upstream timeout, or None for the default
+    
+    Returns:
+        tuple: (acquired, timeout) - whether the call may go ahead, and its
+               timeout less the time spent queued
+    """
+    if mcp_rate_limiter is None:
+        return True, timeout
+    
+    max_wait = MCP_RATE_LIMIT_MAX_WAIT if timeout is None else min(MCP_RATE_LIMIT_MAX_WAIT, timeout)
+    waited = mcp_rate_limiter.acquire(max_wait)
+    if waited is None:
+        log_event("mcp.rate_limited", logging.WARNING, max_wait_ms=round(max_wait * 1000, 1))
+        return False, timeout
+    if waited:
+        log_event("mcp.rate_limit_wait", wait_ms=round(waited * 1000, 1))
+    if timeout is not None:
+        timeout -= waited
+        if timeout <= 0:
+            return False, timeout
+    return True, timeout
+
+def record_mcp_result(result, timeout, deadline=None):
+    """
+    Feed an MCP call result to the circuit breaker and the rate limiter
+    
+    A timeout only counts as an upstream failure if the call had at least
+    the time the server default deadline allows; one cut short by a client
+    asking for less is released instead.
+    """
+    if (result.get("code") == "timeout" and deadline is not None and deadline.shortened
+            and timeout is not None and timeout < mcp_client.timeout):
+        # Cut short by the client's own deadline; says nothing about upstream health
+        mcp_breaker.release()
+    else:
+        mcp_breaker.record(result)
+    
+    if mcp_rate_limiter is not None:
+        if result.get("code") == 429:
+            mcp_rate_limiter.on_throttled(result.get("retry_after"))
+        elif result.get("success"):
+            mcp_rate_limiter.on_success()
+
+def call_mcp_server(prompt, options=None, timeout=None, deadline=None):
     """
     Clean JSON-based call to the MCP server endpoint
     
+    Retryable failures are repeated under mcp_retry_policy as long as the
+    retry fits in the timeout; the returned dict then carries "retries" and
+    "retry_latency_ms" (time spent before the final attempt started).
+    
     Args:
         prompt (str): The user's question/prompt
         options (dict): Optional parameters like temperature, max_tokens, etc.
+        timeout (float): Overrides MCP_TIMEOUT, e.g. to fit a request deadline
+        deadline (Deadline): The request deadline timeout was taken from, if any
     
     Returns:
         dict: Clean JSON response with content and metadata
     """
+    started = time.monotonic()
+    retries = 0
+    if mcp_retry_policy is not None:
+        mcp_retry_policy.record_call()
+    
+    while True:
+        attempt_started = time.monotonic()
+        result = call_mcp_server_once(prompt, options, timeout, deadline)
+        delay = next_retry_delay(result, retries, timeout, attempt_started)
+        if delay is None:
+            break
+        time.sleep(delay)
+        retries += 1
+        if timeout is not None:
+            timeout -= time.monotonic() - attempt_started
+    
+    if retries:
+        result = dict(result, retries=retries, retry_latency_ms=round((attempt_started - started) * 1000, 1))
+    return result
+
+def call_mcp_server_once(prompt, options=None, timeout=None, deadline=None):
+    """Make a single MCP call through the circuit breaker and rate limiter"""
+    if not mcp_breaker.allow_request():
+        log_event("mcp.circuit_open", logging.WARNING)
+        return dict(CIRCUIT_OPEN_RESPONSE)
+    
+    acquired, timeout = acquire_mcp_slot(timeout)
+    if not acquired:
+        mcp_breaker.release()
+        return dict(RATE_LIMITED_RESPONSE)
+    
+    start = time.perf_counter()
+    result = mcp_client.chat(prompt, options, timeout=timeout)
+    metrics.record_upstream(result, time.perf_counter() - start)
+    record_mcp_result(result, timeout, deadline)
+    return result
+
+def next_retry_delay(result, retries, timeout, attempt_started):
+    """
+    Seconds to wait before retrying a failed MCP attempt
+    
+    Returns:
+        float or None: Delay, or None if the attempt is final
+    """
+    if mcp_retry_policy is None or result.get("success") is not False:
+        return None
+    remaining = None if timeout is None else timeout - (time.monotonic() - attempt_started)
+    delay = mcp_retry_policy.next_delay(result, retries, remaining)
+    if delay is not None:
+        log_event("mcp.retry", logging.WARNING, attempt=retries + 2, code=result.get("code"),
+                  delay_ms=round(delay * 1000, 1))
+    return delay
+
+def stream_mcp_server(prompt, options=None, timeout=None, retry_info=None, deadline=None):
+    """
+    Streaming counterpart of call_mcp_server
+    
+    A failure before the first chunk is retried like call_mcp_server does;
+    once chunks have been yielded the stream is never restarted.
+    
+    Args:
+        retry_info (dict): Filled with "retries" and "retry_latency_ms"
+                           when the stream needed retries
+    
+    Yields:
+        dict: Decoded stream chunks, or a single error dict on failure
+    """
+    started = time.monotonic()
+    retries = 0
+    if mcp_retry_policy is not None:
+        mcp_retry_policy.record_call()
+    
+    while True:
+        attempt_started = time.monotonic()
+        chunks = stream_mcp_server_once(prompt, options, timeout, deadline)
+        first = next(chunks, None)
+        if first is None:
+            return
+        delay = next_retry_delay(first, retries, timeout, attempt_started)
+        if delay is None:
+            break
+        chunks.close()
+        time.sleep(delay)
+        retries += 1
+        if timeout is not None:
+            timeout -= time.monotonic() - attempt_started
+    
+    if retries and retry_info is not None:
+        retry_info["retries"] = retries
+        retry_info["retry_latency_ms"] = round((attempt_started - started) * 1000, 1)
+    yield first
+    yield from chunks
+
+def stream_mcp_server_once(prompt, options=None, timeout=None, deadline=None):
+    """Make a single streaming MCP call through the circuit breaker and rate limiter"""
+    if not mcp_breaker.allow_request():
+        log_event("mcp.circuit_open", logging.WARNING, stream=True)
+        yield dict(CIRCUIT_OPEN_RESPONSE)
+        return
+    
+    acquired, timeout = acquire_mcp_slot(timeout)
+    if not acquired:
+        mcp_breaker.release()
+        yield dict(RATE_LIMITED_RESPONSE)
+        return
+    
+    failed = False
+    completed = False
+    start = time.perf_counter()
     try:
-        headers = {
-            "Authorization": f"Bearer {MCP_API_KEY}",
-            "Content-Type": "application/json",
-            "User-Agent": "VeteransBenefitsAssistant/1.0"
-        }
-        
-        # Build the payload with clean JSON structure
-        payload = {
-            "messages": [
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            "include_highlights": True,
-            "stream": False
-        }
-        
-        # Add any additional options
-        if options:
-            payload.update(options)
-        
-        print(f"🔗 Calling MCP server: {MCP_SERVER_URL}")
-        print(f"📝 Prompt: {prompt[:100]}...")
-        
-        response = requests.post(
-            f"{MCP_SERVER_URL}/chat",
-            headers=headers,
-            json=payload,
-            timeout=60
+        for chunk in mcp_client.stream_chat(prompt, options, timeout=timeout):
+            if chunk.get("success") is False:
+                failed = True
+                record_mcp_result(chunk, timeout, deadline)
+                metrics.record_upstream(chunk, time.perf_counter() - start)
+            yield chunk
+        completed = True
+    finally:
+        if completed and not failed:
+            mcp_breaker.record_success()
+            if mcp_rate_limiter is not None:
+                mcp_rate_limiter.on_success()
+            metrics.record_upstream({"success": True}, time.perf_counter() - start)
+        elif not failed:
+            # Closed before the end (client went away): says nothing about upstream health
+            mcp_breaker.release()
+
+# Exact-match answer cache shared by /ask and /mcp/chat
+answer_cache = AnswerCache(
+    max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512")),
+    max_bytes=int(os.getenv("ANSWER_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+    ttl=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+    stale_ttl=float(os.getenv("ANSWER_CACHE_STALE_TTL", "600"))
+)
+
+def build_semantic_cache():
+    """
+    Build the semantic answer cache from environment configuration
+    
+    Opt-in: SEMANTIC_CACHE_BACKEND selects "off" (the default), "local"
+    (in-memory, capped at SEMANTIC_CACHE_MAX_ENTRIES; install numpy for a
+    fast scan) or "pinecone" (the connected index). SEMANTIC_CACHE_EMBEDDER
+    selects "pinecone" (inference API, one network round trip per lookup)
+    or "hashing" (offline).
+    
+    SEMANTIC_CACHE_THRESHOLD is the cosine similarity needed for a hit.
+    With e5 embeddings 0.92 also matches prompts that differ only in a
+    number ("100 percent" vs "50 percent"), so hits additionally require
+    the prompts' numbers to be identical.
+    """
+    backend = os.getenv("SEMANTIC_CACHE_BACKEND", "off").lower()
+    if backend == "off":
+        return None
+    
+    # Pinecone handles are resolved per call without waiting, so lookups during
+    # the warm-up fail fast and count as misses
+    has_api_key = bool(pinecone_clients.api_key)
+    embedder_name = os.getenv("SEMANTIC_CACHE_EMBEDDER", "pinecone" if has_api_key else "hashing").lower()
+    if embedder_name == "pinecone" and has_api_key:
+        embedder = PineconeEmbedder(
+            lambda: pinecone_clients.client(timeout=0),
+            model=os.getenv("SEMANTIC_CACHE_MODEL", "multilingual-e5-large")
         )
-        
-        print(f"📡 MCP Server response status: {response.status_code}")
-        
-        if response.status_code == 200:
-            response_data = response.json()
-            print(f"✅ MCP Server response received successfully")
-            return {
-                "success": True,
-                "data": response_data,
-                "status_code": 200
-            }
-        elif response.status_code == 401:
-            print("❌ MCP Server authentication failed - check API key")
-            return {
-                "success": False,
-                "error": "Authentication failed",
-                "code": 401,
-                "message": "Invalid or missing API key"
-            }
-        elif response.status_code == 429:
-            print("⚠️ MCP Server rate limit exceeded")
-            return {
-                "success": False,
-                "error": "Rate limit exceeded",
-                "code": 429,
-                "message": "Too many requests, please try again later"
-            }
-        else:
-            print(f"❌ MCP Server error: {response.status_code} - {response.text}")
-            return {
-                "success": False,
-                "error": f"Server error: {response.status_code}",
-                "code": response.status_code,
-                "message": response.text
-            }
-            
-    except requests.exceptions.Timeout:
-        print("⏰ MCP Server request timed out")
-        return {
-            "success": False,
-            "error": "Request timeout",
-            "code": "timeout",
-            "message": "Request took too long to complete"
-        }
-    except requests.exceptions.ConnectionError:
-        print("🔌 MCP Server connection error")
-        return {
-            "success": False,
-            "error": "Connection error",
-            "code": "connection",
-            "message": "Unable to connect to MCP server"
-        }
-    except Exception as e:
-        print(f"❌ Error calling MCP server: {e}")
-        return {
-            "success": False,
-            "error": str(e),
-            "code": "unknown",
-            "message": "An unexpected error occurred"
-        }
+    else:
+        embedder = HashingEmbedder()
+    
+    if backend == "pinecone" and has_api_key:
+        store = PineconeVectorStore(lambda: pinecone_clients.index(timeout=0), namespace=os.getenv("SEMANTIC_CACHE_NAMESPACE", "semantic-cache"))
+    else:
+        store = LocalVectorStore(max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "512")))
+    
+    log_event("startup.semantic_cache", embedder=embedder.name, backend=store.name)
+    return SemanticCache(
+        embedder,
+        store,
+        threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+        ttl=float(os.getenv("SEMANTIC_CACHE_TTL", os.getenv("ANSWER_CACHE_TTL", "3600")))
+    )
+
+semantic_cache = build_semantic_cache()
+
+# Collapses concurrent identical prompts into one upstream call
+request_coalescer = SingleFlight()
+
+# Per-worker adaptive limit on requests that go upstream (/ask, /ask/stream,
+# /mcp/chat, /mcp/test and each /ask/batch item); excess requests get 503 +
+# Retry-After instead of queueing.
+# Cached answers and callers joining a coalesced call are never counted
+# (a stream is admitted before it can tell whether it will join one).
+# Under gunicorn the ceiling is fitted to the worker's threads by
+# size_admission(), leaving ADMISSION_RESERVED_THREADS for other routes
+ADMISSION_RESERVED_THREADS = int(os.getenv("ADMISSION_RESERVED_THREADS", "2"))
+admission = None
+if os.getenv("ADMISSION_ENABLED", "true").lower() == "true":
+    admission = AdaptiveConcurrencyLimit(
+        initial_limit=int(os.getenv("ADMISSION_INITIAL_LIMIT", "20")),
+        min_limit=int(os.getenv("ADMISSION_MIN_LIMIT", "2")),
+        max_limit=int(os.getenv("ADMISSION_MAX_LIMIT", "100")),
+        latency_target=float(os.getenv("ADMISSION_LATENCY_TARGET_MS", "10000")) / 1000,
+        backoff=float(os.getenv("ADMISSION_BACKOFF", "0.9")),
+        retry_after=float(os.getenv("ADMISSION_RETRY_AFTER", "2"))
+    )
+
+def size_admission(threads):
+    """
+    Fit the admission limit to the threads serving requests in this worker
+    
+    Requests beyond the worker's threads queue inside gunicorn, where
+    admission control never sees them, so the ceiling is kept
+    ADMISSION_RESERVED_THREADS below the thread count; the reserved threads
+    stay free for cached answers, /health and /metrics and for shedding.
+    
+    Args:
+        threads (int): Request threads per worker (gunicorn's threads setting)
+    """
+    if admission is None:
+        return
+    if threads <= 1:
+        log_event("admission.cannot_shed", logging.WARNING, threads=threads,
+                  reason="single-threaded worker; use the gthread worker with GUNICORN_THREADS > 1")
+        return
+    admission.set_max_limit(min(admission.max_limit, max(1, threads - ADMISSION_RESERVED_THREADS)))
+    log_event("startup.admission", threads=threads, max_limit=admission.max_limit, limit=admission.limit)
+
+# Hedged MCP/SDK dispatch for /ask; MCP_HEDGE_DELAY fixes the delay, otherwise
+# the observed p95 MCP latency is used once MCP_HEDGE_MIN_SAMPLES answers have
+# been seen in this worker. Until then nothing is hedged, unless
+# MCP_HEDGE_DEFAULT_DELAY is set explicitly
+hedger = None
+if os.getenv("MCP_HEDGE_ENABLED", "true").lower() == "true":
+    hedger = HedgedDispatcher(
+        max_workers=int(os.getenv("MCP_HEDGE_WORKERS", "32")),
+        delay=float(os.environ["MCP_HEDGE_DELAY"]) if os.getenv("MCP_HEDGE_DELAY") else None,
+        default_delay=float(os.environ["MCP_HEDGE_DEFAULT_DELAY"]) if os.getenv("MCP_HEDGE_DEFAULT_DELAY") else None,
+        min_delay=float(os.getenv("MCP_HEDGE_MIN_DELAY", "0.5")),
+        max_delay=float(os.getenv("MCP_HEDGE_MAX_DELAY", "30")),
+        min_samples=int(os.getenv("MCP_HEDGE_MIN_SAMPLES", "20"))
+    )
+
+def format_mcp_citation(citation):
+    """Convert a raw MCP citation into the citation dict returned to clients"""
+    return {
+        "file": citation.get("file", {}).get("name", "Unknown"),
+        "page": citation.get("page", 1),
+        "url": citation.get("url", "#"),
+        "text": citation.get("text", ""),
+        "confidence": citation.get("confidence", 0.0)
+    }
 
 def process_mcp_response(mcp_response):
     """
@@ -151,6 +517,11 @@ def process_mcp_response(mcp_response):
     if not mcp_response or not mcp_response.get("success"):
         return None, None, None
     
+    with metrics.observe_stage("parse"):
+        return _process_mcp_response(mcp_response)
+
+def _process_mcp_response(mcp_response):
+    """Extract content, citations and metadata from a successful MCP response"""
     try:
         response_data = mcp_response.get("data", {})
         content = ""
@@ -172,16 +543,9 @@ def process_mcp_response(mcp_response):
         if "citations" in response_data and response_data["citations"]:
             for citation in response_data["citations"]:
                 try:
-                    citation_data = {
-                        "file": citation.get("file", {}).get("name", "Unknown"),
-                        "page": citation.get("page", 1),
-                        "url": citation.get("url", "#"),
-                        "text": citation.get("text", ""),
-                        "confidence": citation.get("confidence", 0.0)
-                    }
-                    citations.append(citation_data)
+                    citations.append(format_mcp_citation(citation))
                 except Exception as e:
-                    print(f"Error processing citation: {e}")
+                    log_event("mcp.citation_error", logging.WARNING, error=str(e))
                     continue
         
         # Extract metadata
@@ -190,326 +554,785 @@ def process_mcp_response(mcp_response):
             "usage": response_data.get("usage", {}),
             "created": response_data.get("created"),
             "id": response_data.get("id"),
-            "response_time": mcp_response.get("response_time")
+            "response_time": mcp_response.get("response_time"),
+            "retries": mcp_response.get("retries", 0),
+            "retry_latency_ms": mcp_response.get("retry_latency_ms", 0.0)
         }
         
         return content, citations, metadata
         
     except Exception as e:
-        print(f"Error processing MCP response: {e}")
+        log_event("mcp.parse_error", logging.ERROR, error=str(e))
         return None, None, None
 
-@app.route("/")
-def home():
-    # Temporary inline HTML to fix template issue
-    html_content = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Veterans Benefits Assistant</title>
-    <style>
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            max-width: 800px;
-            margin: 0 auto;
-            padding: 20px;
-            background-color: #f5f5f5;
-        }
-        .container {
-            background: white;
-            padding: 30px;
-            border-radius: 10px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }
-        h1 {
-            color: #2c3e50;
-            text-align: center;
-            margin-bottom: 30px;
-        }
-        .input-group {
-            margin-bottom: 20px;
-        }
-        textarea {
-            width: 100%;
-            height: 100px;
-            padding: 15px;
-            border: 2px solid #ddd;
-            border-radius: 8px;
-            font-size: 16px;
-            resize: vertical;
-            font-family: inherit;
-        }
-        textarea:focus {
-            outline: none;
-            border-color: #3498db;
-        }
-        button {
-            background-color: #3498db;
-            color: white;
-            padding: 12px 30px;
-            border: none;
-            border-radius: 6px;
-            font-size: 16px;
-            cursor: pointer;
-            transition: background-color 0.3s;
-        }
-        button:hover {
-            background-color: #2980b9;
-        }
-        button:disabled {
-            background-color: #bdc3c7;
-            cursor: not-allowed;
-        }
-        .response {
-            margin-top: 30px;
-            padding: 20px;
-            background-color: #f8f9fa;
-            border-radius: 8px;
-            border-left: 4px solid #3498db;
-            line-height: 1.6;
-        }
-        .response h1, .response h2, .response h3 {
-            margin-top: 20px;
-            margin-bottom: 10px;
-            color: #2c3e50;
-        }
-        .response h1 {
-            font-size: 24px;
-            border-bottom: 2px solid #3498db;
-            padding-bottom: 5px;
-        }
-        .response h2 {
-            font-size: 20px;
-            border-bottom: 1px solid #ddd;
-            padding-bottom: 3px;
-        }
-        .response h3 {
-            font-size: 18px;
-            color: #34495e;
-        }
-        .response ul, .response ol {
-            margin: 15px 0;
-            padding-left: 30px;
-        }
-        .response li {
-            margin-bottom: 8px;
-            padding-left: 5px;
-        }
-        .response ol {
-            counter-reset: item;
-        }
-        .response ol li {
-            display: block;
-            position: relative;
-        }
-        .response ol li:before {
-            content: counter(item) ". ";
-            counter-increment: item;
-            font-weight: bold;
-            color: #3498db;
-            position: absolute;
-            left: -25px;
-        }
-        .response strong {
-            color: #2c3e50;
-        }
-        .response em {
-            color: #7f8c8d;
-        }
-        .citations {
-            margin-top: 20px;
-        }
-        .citations h3 {
-            color: #2c3e50;
-            margin-bottom: 15px;
-        }
-        .citation-item {
-            background: white;
-            padding: 15px;
-            margin-bottom: 10px;
-            border-radius: 6px;
-            border: 1px solid #ddd;
-        }
-        .citation-item a {
-            color: #3498db;
-            text-decoration: none;
-            font-weight: 500;
-        }
-        .citation-item a:hover {
-            text-decoration: underline;
-        }
-        .loading {
-            text-align: center;
-            color: #7f8c8d;
-            font-style: italic;
-        }
-        .status {
-            text-align: center;
-            padding: 10px;
-            margin-bottom: 20px;
-            border-radius: 6px;
-            font-weight: bold;
-        }
-        .status.success {
-            background-color: #d4edda;
-            color: #155724;
-            border: 1px solid #c3e6cb;
-        }
-        .status.warning {
-            background-color: #fff3cd;
-            color: #856404;
-            border: 1px solid #ffeaa7;
-        }
-        .mcp-info {
-            background-color: #e3f2fd;
-            color: #1565c0;
-            border: 1px solid #bbdefb;
-            padding: 15px;
-            border-radius: 6px;
-            margin-bottom: 20px;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>Veterans Benefits Knowledge Base Assistant</h1>
-        
-        <div class="status success">
-            ✅ App is running successfully on Render!
-        </div>
+def mcp_answer(prompt, options=None, timeout=None, deadline=None):
+    """
+    Answer a prompt via the MCP server only
+    
+    Returns:
+        tuple: (payload dict, HTTP status code)
+    """
+    # Call the MCP server directly
+    mcp_response = call_mcp_server(prompt, options, timeout=timeout, deadline=deadline)
+    
+    if mcp_response and mcp_response.get("success"):
+        # Process MCP server response
+        content, citations, metadata = process_mcp_response(mcp_response)
         
-        <div class="mcp-info">
-            🔗 Connected to Pinecone MCP Assistant: <strong>vb</strong><br>
-            📍 Endpoint: <code>https://prod-1-data.ke.pinecone.io/mcp/assistants/vb</code>
-        </div>
+        if content:
+            return {
+                "success": True,
+                "content": content,
+                "citations": citations or [],
+                "source": "mcp_server",
+                "metadata": metadata
+            }, 200
+        return {"error": "MCP server returned an empty answer", "code": "empty"}, 502
+    
+    log_event("ask.mcp_failed", logging.WARNING, error=mcp_response.get("error", "Unknown error"), code=mcp_response.get("code"))
+    return {
+        "error": mcp_response.get("error", "Unknown error"),
+        "code": mcp_response.get("code", "unknown")
+    }, 502
+
+def answer_question(prompt, options=None, deadline=None):
+    """
+    Answer a prompt via the MCP server, falling back to the Pinecone SDK
+    
+    With hedging enabled, the SDK call is started in parallel once the MCP
+    call has run longer than the hedge delay, and the first valid answer wins.
+    
+    Args:
+        prompt (str): The user's question
+        options (dict): Optional parameters forwarded to the MCP server
+        deadline (Deadline): The MCP call gets DEADLINE_MCP_SHARE of the
+                             remaining time, the fallback whatever is left
+    
+    Returns:
+        tuple: (payload dict, HTTP status code)
+    """
+    # Try using the MCP server first (more direct integration)
+    log_event("ask.start", prompt=truncate(prompt, 50))
+    
+    mcp_timeout = stage_timeout(deadline, DEADLINE_MCP_SHARE)
+    if mcp_timeout == 0:
+        return deadline_exceeded(deadline, "mcp_call")
+    
+    if not hedger:
+        payload, status = mcp_answer(prompt, options, timeout=mcp_timeout, deadline=deadline)
+        if status == 200:
+            return payload, status
         
-        <div class="input-group">
-            <textarea id="prompt" placeholder="Ask a question about veterans benefits..."></textarea>
-        </div>
+        # Fallback to Pinecone SDK if MCP server fails
+        return sdk_answer(prompt, deadline)
+    
+    try:
+        payload, status, winner, hedged = hedger.run(
+            lambda: mcp_answer(prompt, options, timeout=mcp_timeout, deadline=deadline),
+            lambda: sdk_answer(prompt, deadline),
+            timeout=deadline.budget(reserve=DEADLINE_PARSE_RESERVE) if deadline else None
+        )
+    except TimeoutError:
+        return deadline_exceeded(deadline, "hedged mcp_call/sdk_fallback")
+    if status == 200 and hedged:
+        log_event("ask.hedge_won", source=payload.get("source"), winner=winner)
+        payload["metadata"] = dict(payload.get("metadata") or {}, hedged=True)
+    return payload, status
+
+def sdk_answer(prompt, deadline=None):
+    """
+    Answer a prompt with the Pinecone SDK assistant
+    
+    Args:
+        prompt (str): The user's question
+        deadline (Deadline): Abandon the SDK call when it runs out
+    
+    Returns:
+        tuple: (payload dict, HTTP status code)
+    """
+    init_wait = PINECONE_INIT_WAIT
+    if deadline is not None:
+        init_wait = min(init_wait, deadline.remaining())
+    if upstream_cassette is not None and upstream_cassette.replaying:
+        # Answers come from the cassette; the real assistant is not needed
+        assistant = upstream_cassette.wrap_assistant(None)
+    else:
+        assistant = pinecone_clients.assistant(timeout=init_wait)
+        if assistant and upstream_cassette is not None:
+            assistant = upstream_cassette.wrap_assistant(assistant)
+    if deadline is not None and deadline.expired():
+        return deadline_exceeded(deadline, "sdk_fallback")
+    if assistant:
+        log_event("ask.sdk_fallback")
+        with metrics.observe_stage("sdk_fallback"):
+            if deadline is None:
+                return _sdk_answer(assistant, prompt)
+            future = sdk_executor.submit(_sdk_answer, assistant, prompt)
+            try:
+                return future.result(timeout=deadline.remaining())
+            except FuturesTimeout:
+                log_event("sdk.deadline_exceeded", logging.WARNING, elapsed_ms=deadline.elapsed_ms())
+                return deadline_exceeded(deadline, "sdk_fallback")
+    else:
+        return {"error": "Neither MCP server nor Pinecone SDK available"}, 500
+
+def _sdk_answer(assistant, prompt):
+    """Call the SDK assistant and shape its answer and citations"""
+    try:
+        try:
+            from pinecone_plugins.assistant.models.chat import Message
+            messages = [Message(role="user", content=prompt)]
+        except ImportError:
+            # Replaying from a cassette does not need the Pinecone plugin
+            messages = [{"role": "user", "content": prompt}]
         
-        <button onclick="ask()" id="askButton">Ask Question</button>
+        resp = assistant.chat(
+            messages=messages, 
+            include_highlights=True
+        )
         
-        <div id="response" class="response" style="display: none;"></div>
+        return {
+            "content": resp.message.content,
+            "citations": extract_sdk_citations(resp),
+            "source": "pinecone_sdk"
+        }, 200
         
-        <div id="refs" class="citations" style="display: none;"></div>
-    </div>
-
-    <script>
-        async function ask() {
-            const prompt = document.getElementById('prompt').value.trim();
-            if (!prompt) {
-                alert('Please enter a question');
-                return;
-            }
+    except Exception as e:
+        log_event("sdk.error", logging.ERROR, error=str(e))
+        return {"error": f"Both MCP server and Pinecone SDK failed: {str(e)}"}, 500
 
-            const button = document.getElementById('askButton');
-            const responseDiv = document.getElementById('response');
-            const refsDiv = document.getElementById('refs');
-
-            // Show loading state
-            button.disabled = true;
-            button.textContent = 'Processing...';
-            responseDiv.style.display = 'block';
-            responseDiv.innerHTML = '<div class="loading">Processing your question...</div>';
-            refsDiv.style.display = 'none';
-
-            try {
-                const res = await fetch('/ask', {
-                    method: 'POST',
-                    headers: {'Content-Type': 'application/json'},
-                    body: JSON.stringify({prompt})
-                });
-                
-                if (!res.ok) {
-                    throw new Error(`HTTP error! status: ${res.status}`);
-                }
-                
-                const data = await res.json();
-                
-                // Display response with proper formatting
-                let formattedContent = data.content;
-                
-                // Convert markdown headers
-                formattedContent = formattedContent
-                    .replace(/### (.*?)(?=\\n|$)/g, '<h3>$1</h3>')     // H3 headers
-                    .replace(/## (.*?)(?=\\n|$)/g, '<h2>$1</h2>')      // H2 headers
-                    .replace(/# (.*?)(?=\\n|$)/g, '<h1>$1</h1>');     // H1 headers
-                
-                // Convert numbered lists
-                formattedContent = formattedContent.replace(/(\\d+\\.\\s+.*?)(?=\\n\\d+\\.|$)/gs, function(match) {
-                    const items = match.split('\\n').filter(line => line.trim());
-                    if (items.length > 0) {
-                        const listItems = items.map(item => 
-                            item.replace(/^\\d+\\.\\s+/, '<li>') + '</li>'
-                        ).join('');
-                        return `<ol>${listItems}</ol>`;
-                    }
-                    return match;
-                });
-                
-                // Convert bullet lists
-                formattedContent = formattedContent.replace(/(- .*?)(?=\\n-|$)/gs, function(match) {
-                    const items = match.split('\\n').filter(line => line.trim());
-                    if (items.length > 0) {
-                        const listItems = items.map(item => 
-                            item.replace(/^- /, '<li>') + '</li>'
-                        ).join('');
-                        return `<ul>${listItems}</ul>`;
-                    }
-                    return match;
-                });
-                
-                // Convert bold and italic text
-                formattedContent = formattedContent
-                    .replace(/\\*\\*(.*?)\\*\\*/g, '<strong>$1</strong>')  // Bold text
-                    .replace(/\\*(.*?)\\*/g, '<em>$1</em>');              // Italic text
-                
-                // Convert line breaks
-                formattedContent = formattedContent
-                    .replace(/\\n\\n/g, '<br><br>')  // Double line breaks become <br><br>
-                    .replace(/\\n/g, '<br>');         // Single line breaks become <br>
-                
-                responseDiv.innerHTML = `<strong>Answer:</strong><br><br>${formattedContent}`;
-                
-                // Display citations if available
-                if (data.citations && data.citations.length > 0) {
-                    refsDiv.style.display = 'block';
-                    refsDiv.innerHTML = '<h3>References:</h3>';
-                    
-                    data.citations.forEach((c, i) => {
-                        const div = document.createElement('div');
-                        div.className = 'citation-item';
-                        const a = document.createElement('a');
-                        a.href = c.url;
-                        a.target = '_blank';
-                        a.textContent = `Reference ${i+1}: ${c.file} (Page ${c.page})`;
-                        div.appendChild(a);
-                        refsDiv.appendChild(div);
-                    });
+def extract_sdk_citations(resp):
+    """
+    Shape the citations of a Pinecone SDK chat response
+    
+    Args:
+        resp: The SDK assistant's chat response
+    
+    Returns:
+        list: Citation dicts ({"file", "page", "url"}); citations that
+              cannot be read are logged and skipped
+    """
+    citations = []
+    if hasattr(resp, 'citations') and resp.citations:
+        for citation in resp.citations:
+            try:
+                citation_data = {
+                    "file": citation.references[0].file.name if citation.references else "Unknown",
+                    "page": citation.references[0].pages[0] if citation.references and citation.references[0].pages else 1,
+                    "url": f"{citation.references[0].file.signed_url}#page={citation.references[0].references[0].pages[0]}" if citation.references and citation.references[0].file and citation.references[0].references else "#"
                 }
-            } catch (error) {
-                responseDiv.innerHTML = `<strong>Error:</strong> ${error.message}`;
-                console.error('Error:', error);
-            } finally {
-                // Reset button state
-                button.disabled = false;
-                button.textContent = 'Ask Question';
-            }
+                citations.append(citation_data)
+            except Exception as e:
+                log_event("sdk.citation_error", logging.WARNING, error=str(e))
+                continue
+    return citations
+
+def mcp_chat_answer(prompt, options=None, deadline=None):
+    """
+    Answer a prompt via the MCP server only, passing through chat options
+    
+    Returns:
+        tuple: (payload dict, HTTP status code)
+    """
+    timeout = stage_timeout(deadline)
+    if timeout == 0:
+        return deadline_exceeded(deadline, "mcp_call")
+    mcp_response = call_mcp_server(prompt, options, timeout=timeout, deadline=deadline)
+    
+    if mcp_response and mcp_response.get("success"):
+        content, citations, metadata = process_mcp_response(mcp_response)
+        
+        return {
+            "success": True,
+            "content": content,
+            "citations": citations or [],
+            "metadata": metadata,
+            "source": "mcp_server_advanced"
+        }, 200
+    elif deadline is not None and mcp_response.get("code") == "timeout" and timeout < mcp_client.timeout:
+        return deadline_exceeded(deadline, "mcp_call")
+    elif mcp_response.get("code") == "rate_limited":
+        return dict(mcp_response), 429
+    else:
+        return {
+            "success": False,
+            "error": mcp_response.get("error", "Unknown error"),
+            "code": mcp_response.get("code", "unknown"),
+            "message": mcp_response.get("message", "No additional details")
+        }, 500
+
+def cache_loader(answer_fn, *args):
+    """Wrap an answer function so background refreshes only cache successes"""
+    def load():
+        payload, status = answer_fn(*args)
+        return payload if status == 200 else None
+    return load
+
+def with_cache_metadata(payload, cached, stale=False, layer="exact", similarity=None):
+    """Return a copy of payload whose metadata records whether it came from cache"""
+    metadata = dict(payload.get("metadata") or {})
+    metadata["cached"] = cached
+    if cached:
+        metadata["cache_layer"] = layer
+        metadata["cache_state"] = "stale" if stale else "fresh"
+        if similarity is not None:
+            metadata["similarity"] = similarity
+    return dict(payload, metadata=metadata)
+
+def lookup_cached_answer(namespace, answer_fn, prompt, options=None):
+    """
+    Look a prompt up in the exact and semantic caches
+    
+    Args:
+        namespace (str): Cache namespace for the calling route
+        answer_fn (callable): answer_fn(prompt, options) -> (payload, status),
+                              used to refresh stale entries in the background
+        prompt (str): The user's question
+        options (dict): Options forwarded to the MCP server
+    
+    Returns:
+        tuple: (cached payload or None, cache key, prompt embedding or None)
+    """
+    # Serve repeated questions from the exact-match cache
+    cache_key = answer_cache.make_key(prompt, options, namespace=namespace)
+    cached, stale = answer_cache.get(cache_key)
+    if cached is not None:
+        if stale:
+            answer_cache.refresh(cache_key, cache_loader(answer_fn, prompt, options))
+        return with_cache_metadata(cached, True, stale), cache_key, None
+    
+    # Then look for a differently-worded question we already answered
+    vector = None
+    if semantic_cache:
+        cached, similarity, vector = semantic_cache.lookup(prompt, dict(options or {}, _route=namespace))
+        if cached is not None:
+            log_event("semantic_cache.hit", similarity=similarity)
+            answer_cache.set(cache_key, cached)
+            return with_cache_metadata(cached, True, layer="semantic", similarity=similarity), cache_key, vector
+    
+    return None, cache_key, vector
+
+def store_cached_answer(namespace, cache_key, prompt, payload, options=None, vector=None):
+    """Remember a fresh answer in the exact and semantic caches"""
+    answer_cache.set(cache_key, payload)
+    if semantic_cache:
+        semantic_cache.store_answer(prompt, payload, dict(options or {}, _route=namespace), vector=vector)
+
+def admitted(fn):
+    """
+    Run an upstream-bound call under admission control
+    
+    Args:
+        fn (callable): fn() -> (payload, status)
+    
+    Returns:
+        tuple: fn's (payload, status), or (overloaded payload, 503) if shed
+    """
+    if admission is None:
+        return fn()
+    if not admission.try_acquire():
+        log_event("admission.shed", logging.WARNING, limit=admission.limit)
+        return overloaded(admission.retry_after)
+    
+    start = time.monotonic()
+    status = 500
+    try:
+        payload, status = fn()
+        return payload, status
+    finally:
+        admission.release(time.monotonic() - start, ok=status < 500)
+
+def admitted_stream(events, release):
+    """
+    Pass SSE events through, releasing an admission slot when the stream ends
+    
+    The latency fed back is the time to the first event, since a healthy
+    stream may run for as long as the answer takes to write; a stream that
+    ends with an "error" event counts as failed.
+    
+    Args:
+        events (generator): SSE events, e.g. from stream_answer()
+        release (callable): From admission.slot()
+    
+    Yields:
+        str: The events unchanged
+    """
+    started = time.monotonic()
+    first_event = None
+    ok = True
+    try:
+        for event in events:
+            if first_event is None:
+                first_event = time.monotonic() - started
+            if event.startswith("event: error"):
+                ok = False
+            yield event
+    finally:
+        events.close()
+        release(ok, first_event)
+
+def answer_response(payload, status):
+    """jsonify an answer, adding Retry-After to a load-shedding 503"""
+    response = jsonify(payload)
+    response.status_code = status
+    if status == 503 and payload.get("retry_after"):
+        response.headers["Retry-After"] = str(math.ceil(payload["retry_after"]))
+    return response
+
+def serve_answer(namespace, answer_fn, prompt, options=None, deadline=None, admit=False):
+    """
+    Answer a prompt through the exact and semantic caches
+    
+    Args:
+        namespace (str): Cache namespace for the calling route
+        answer_fn (callable): answer_fn(prompt, options, deadline) -> (payload, status)
+        prompt (str): The user's question
+        options (dict): Options forwarded to the MCP server
+        deadline (Deadline): Request deadline, or None for no limit
+        admit (bool): Put the upstream call (not cache hits) under admission control
+    
+    Returns:
+        tuple: (payload dict, HTTP status code)
+    """
+    cached, cache_key, vector = lookup_cached_answer(namespace, answer_fn, prompt, options)
+    if cached is not None:
+        return cached, 200
+    
+    # Concurrent identical questions share one upstream call
+    def compute():
+        if admit:
+            payload, status = admitted(lambda: answer_fn(prompt, options, deadline))
+        else:
+            payload, status = answer_fn(prompt, options, deadline)
+        if status == 200:
+            store_cached_answer(namespace, cache_key, prompt, payload, options, vector)
+        return payload, status
+    
+    try:
+        (payload, status), shared = request_coalescer.do(
+            cache_key, compute, timeout=deadline.remaining() if deadline else None
+        )
+    except TimeoutError:
+        return deadline_exceeded(deadline, "coalesced upstream call")
+    if status == 200:
+        payload = with_cache_metadata(payload, False)
+        if shared:
+            payload["metadata"]["coalesced"] = True
+    return payload, status
+
+def sse_event(event, data):
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {fast_json.dumps(data)}\n\n"
+
+def done_event(payload, render_html=False):
+    """Final SSE event, carrying the rendered answer if requested"""
+    data = {
+        "source": payload.get("source"),
+        "metadata": payload.get("metadata", {})
+    }
+    if render_html:
+        data["html"] = markdown_renderer.render(payload.get("content", ""))
+    return sse_event("done", data)
+
+def replay_answer_events(payload, render_html=False):
+    """Emit an already-complete answer as a short SSE sequence"""
+    yield sse_event("token", {"content": payload.get("content", "")})
+    for citation in payload.get("citations", []):
+        yield sse_event("citation", citation)
+    yield done_event(payload, render_html)
+
+def mcp_stream_events(prompt, cache_key, vector=None, timeout=None, deadline=None):
+    """
+    The upstream half of stream_answer(), shared by concurrent identical streams
+    
+    Yields:
+        tuple: (event, data) - "token" and "citation" events as they arrive,
+               then "done" with the complete payload (already cached) or
+               "error" with the MCP error dict
+    """
+    content_parts = []
+    citations = []
+    metadata = {}
+    retry_info = {}
+    chunks = stream_mcp_server(prompt, timeout=timeout, retry_info=retry_info, deadline=deadline)
+    try:
+        for chunk in chunks:
+            if chunk.get("success") is False:
+                yield "error", chunk
+                return
+            
+            chunk_type = chunk.get("type")
+            if chunk_type == "content_chunk":
+                text = chunk.get("delta", {}).get("content", "")
+            elif "choices" in chunk and chunk["choices"]:
+                # Handle OpenAI-style stream chunks
+                text = chunk["choices"][0].get("delta", {}).get("content") or ""
+            else:
+                text = ""
+            
+            if text:
+                content_parts.append(text)
+                yield "token", {"content": text}
+            elif chunk_type == "citation":
+                try:
+                    citation = format_mcp_citation(chunk.get("citation", {}))
+                except Exception as e:
+                    log_event("mcp.citation_error", logging.WARNING, error=str(e), stream=True)
+                    continue
+                citations.append(citation)
+                yield "citation", citation
+            elif chunk_type == "message_start":
+                metadata["model"] = chunk.get("model", "unknown")
+                metadata["id"] = chunk.get("id")
+            elif chunk_type == "message_end":
+                metadata["usage"] = chunk.get("usage", {})
+                metadata["finish_reason"] = chunk.get("finish_reason")
+    finally:
+        # Drops the upstream stream if every reader has gone
+        chunks.close()
+    
+    metadata["retries"] = retry_info.get("retries", 0)
+    metadata["retry_latency_ms"] = retry_info.get("retry_latency_ms", 0.0)
+    payload = {
+        "success": True,
+        "content": "".join(content_parts),
+        "citations": citations,
+        "source": "mcp_server",
+        "metadata": metadata
+    }
+    store_cached_answer("ask", cache_key, prompt, payload, vector=vector)
+    yield "done", payload
+
+def sdk_fallback_answer(prompt, options=None, deadline=None):
+    """sdk_answer() in the answer_fn shape serve_answer() expects"""
+    return sdk_answer(prompt, deadline)
+
+def stream_answer(prompt, cache_key, vector=None, render_html=False, deadline=None):
+    """
+    Stream an answer as SSE events, falling back to the Pinecone SDK
+    
+    Concurrent identical prompts read one upstream stream, and a fallback
+    goes through serve_answer(), so it is coalesced and cached like /ask.
+    
+    Args:
+        prompt (str): The user's question
+        cache_key (str): From lookup_cached_answer(), which missed
+        vector (list): The prompt's embedding from the same lookup, if any
+        render_html (bool): Include the rendered answer in the "done" event
+        deadline (Deadline): Bounds the wait for the first chunk and for each
+                             gap between chunks (the MCP read timeout), not
+                             the stream's total length, so an answer that
+                             keeps arriving is never cut off
+    
+    Yields:
+        str: "token", "citation", "done" or "error" events
+    """
+    has_content = False
+    error = None
+    
+    mcp_timeout = stage_timeout(deadline, DEADLINE_MCP_SHARE)
+    if mcp_timeout == 0:
+        error = deadline_exceeded(deadline, "mcp_stream")[0]
+    else:
+        events, shared = request_coalescer.stream(
+            cache_key,
+            lambda: mcp_stream_events(prompt, cache_key, vector, mcp_timeout, deadline),
+            timeout=mcp_timeout
+        )
+        try:
+            for event, data in events:
+                if event == "error":
+                    error = data
+                    break
+                if event == "done":
+                    payload = with_cache_metadata(data, False)
+                    if shared:
+                        payload["metadata"]["coalesced"] = True
+                    yield done_event(payload, render_html)
+                    return
+                has_content = has_content or event == "token"
+                yield sse_event(event, data)
+        except TimeoutError:
+            # Joined another request's stream, which went quiet for longer
+            # than this request's own budget allows
+            error = deadline_exceeded(deadline, "mcp_stream")[0]
+        finally:
+            events.close()
+    
+    if not has_content:
+        log_event("ask.mcp_failed", logging.WARNING, error=error.get("error", "Unknown error"), code=error.get("code"), stream=True)
+        payload, status = serve_answer("ask", sdk_fallback_answer, prompt, deadline=deadline)
+        if status != 200:
+            yield sse_event("error", payload)
+            return
+        yield from replay_answer_events(payload, render_html)
+        return
+    
+    yield sse_event("error", {
+        "error": error.get("error", "Unknown error"),
+        "code": error.get("code", "unknown"),
+        "message": error.get("message", "Stream interrupted")
+    })
+
+def batch_item_answer(prompt, options, deadline=None):
+    """
+    Answer one batch item, turning exceptions into the call_mcp_server error shape
+    
+    Items count against admission control like single requests; a shed
+    item comes back with code "overloaded" and its retry_after.
+    """
+    try:
+        return serve_answer("mcp_chat", mcp_chat_answer, prompt, options, deadline, admit=True)[0]
+    except Exception as e:
+        log_event("batch.item_error", logging.ERROR, error=str(e), exc_info=True)
+        return {
+            "success": False,
+            "error": str(e),
+            "code": "exception",
+            "message": "An unexpected error occurred"
         }
 
-        // Allow Enter key to submit
-        document.getElementById('prompt').addEventListener('keydown', function(e) {
-            if (e.key === 'Enter' && e.ctrlKey) {
-                ask();
-            }
-        });
-    </script>
-</body>
-</html>
+def run_batch(prompts, options, concurrency, item_timeout):
+    """
+    Answer prompts concurrently, yielding results in input order
+    
+    At most `concurrency` upstream calls run at once. Each item gets
+    `item_timeout` seconds from the moment it starts; an item that misses
+    its deadline is reported as a timeout and its late result discarded.
+    
+    Yields:
+        dict: {"index", "prompt", ...answer or error fields}
+    """
+    started = {}
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch")
+    
+    def run(i, prompt):
+        started[i] = time.monotonic()
+        return batch_item_answer(prompt, options, Deadline(item_timeout))
+    
+    try:
+        futures = [executor.submit(run, i, prompt) for i, prompt in enumerate(prompts)]
+        for i, future in enumerate(futures):
+            # Items still queued behind the concurrency limit have no deadline yet
+            while i not in started and not future.done():
+                try:
+                    future.result(timeout=0.05)
+                except FuturesTimeout:
+                    pass
+            
+            remaining = item_timeout - (time.monotonic() - started.get(i, time.monotonic()))
+            try:
+                result = future.result(timeout=max(0.0, remaining))
+            except FuturesTimeout:
+                result = {
+                    "success": False,
+                    "error": "Request timeout",
+                    "code": "timeout",
+                    "message": f"Item did not complete within {item_timeout}s"
+                }
+            yield dict(result, index=i, prompt=prompts[i])
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def probe_mcp():
+    """Probe the MCP endpoint with a real chat call, bypassing the circuit breaker"""
+    test_response = mcp_client.chat("Test connection")
+    if not test_response.get("success"):
+        return False, {"code": test_response.get("code"), "error": test_response.get("error")}
+    content, citations, metadata = process_mcp_response(test_response)
+    return True, {
+        "has_content": bool(content),
+        "has_citations": bool(citations),
+        "has_metadata": bool(metadata)
+    }
+
+def probe_sdk():
+    """Check the Pinecone SDK assistant is connected and describable"""
+    if not pinecone_clients.wait(timeout=0):
+        return False, {"error": "Pinecone SDK still initializing"}
+    if not pinecone_clients.assistant(timeout=0):
+        return False, {"error": "Pinecone SDK assistant not connected"}
+    describe = getattr(pinecone_clients.client(timeout=0).assistant, "describe_assistant", None)
+    if describe:
+        info = describe(assistant_name="vb")
+        return True, {"status": str(getattr(info, "status", "unknown"))}
+    return True, {}
+
+def probe_index():
+    """Check the Pinecone index answers a stats call"""
+    if not pinecone_clients.wait(timeout=0):
+        return False, {"error": "Pinecone SDK still initializing"}
+    index = pinecone_clients.index(timeout=0)
+    if index is None:
+        return False, {"error": "Pinecone index not connected"}
+    stats = index.describe_index_stats()
+    total = stats.get("total_vector_count") if isinstance(stats, dict) else getattr(stats, "total_vector_count", None)
+    return True, {"total_vector_count": total}
+
+def probe_status(snapshot):
+    """
+    /mcp/status connection fields from an upstream prober snapshot
+    
+    Returns:
+        dict: connection_test ("pending" until the first MCP probe) and
+              last_test_time, plus mcp_response_sample and probes once
+              probes have run
+    """
+    mcp_probe = (snapshot or {}).get("checks", {}).get("mcp")
+    if not mcp_probe:
+        return {"connection_test": "pending", "last_test_time": None}
+    
+    status = {
+        "connection_test": "success" if mcp_probe["ok"] else "failed",
+        "last_test_time": mcp_probe["checked_at"],
+        "probes": snapshot["checks"]
+    }
+    if mcp_probe["ok"]:
+        status["mcp_response_sample"] = mcp_probe["detail"]
+    return status
+
+# /ask/batch limits; a batch's concurrency is also capped at MCP_POOL_SIZE so
+# every concurrent item gets a pooled connection
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "5000"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
+BATCH_DEFAULT_CONCURRENCY = int(os.getenv("BATCH_DEFAULT_CONCURRENCY", "4"))
+BATCH_ITEM_TIMEOUT = float(os.getenv("BATCH_ITEM_TIMEOUT", "60"))
+
+upstream_prober = None
+if os.getenv("PROBE_ENABLED", "true").lower() == "true":
+    upstream_prober = UpstreamProber(
+        {"mcp": probe_mcp, "sdk": probe_sdk, "index": probe_index},
+        interval=float(os.getenv("PROBE_INTERVAL", "60")),
+        jitter=float(os.getenv("PROBE_JITTER", "0.1")),
+        history=int(os.getenv("PROBE_HISTORY", "50")),
+        lock_path=os.getenv("PROBE_LOCK_PATH", "/tmp/vb-prober.lock"),
+        state_path=os.getenv("PROBE_STATE_PATH", "/tmp/vb-prober-state.json")
+    )
+    upstream_prober.start()
+
+# Home page shell and its fingerprinted CSS/JS, precompressed once at startup
+static_assets = AssetBundle(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "static"),
+    url_prefix="/assets"
+)
+log_event("startup.static_assets", **static_assets.stats())
+
+# Answer markdown rendered server-side, memoized by content hash
+markdown_renderer = MarkdownRenderer(max_entries=int(os.getenv("MARKDOWN_MEMO_ENTRIES", "1024")))
+
+# Default highlight window per citation in compact responses
+COMPACT_SNIPPET_CHARS = int(os.getenv("COMPACT_SNIPPET_CHARS", "200"))
+
+FLAG_VALUES = {"true": True, "1": True, "yes": True, "false": False, "0": False, "no": False, "": False}
+
+def parse_flag(value):
+    """
+    Coerce a boolean option that may arrive as a string ("false", "0", "no")
+    
+    Raises:
+        ValueError: For a string that is not a recognised flag value
+    """
+    if isinstance(value, str):
+        flag = FLAG_VALUES.get(value.strip().lower())
+        if flag is None:
+            raise ValueError(f"not a boolean: {value!r}")
+        return flag
+    return bool(value)
+
+def request_option(data, name):
+    """Read a response option from the JSON body, falling back to the query string"""
+    if data and name in data:
+        return data[name]
+    return request.args.get(name)
+
+def response_options(data):
+    """
+    Read and validate a request's response options, before any upstream work
+    
+    Options (JSON body or query string):
+        html (bool): Add the rendered answer under "html"
+        compact (bool): Merge duplicate citations and truncate highlights
+        snippet_chars (int): Highlight window in compact mode; 0 drops highlights
+        fields (str or list): Keys to keep, e.g. "content,citations.url"
+    
+    Returns:
+        dict: The parsed options, for shape_answer()
+    
+    Raises:
+        ValueError: Naming the option that is invalid
+    """
+    options = {}
+    for name in ("html", "compact"):
+        try:
+            options[name] = parse_flag(request_option(data, name))
+        except ValueError:
+            raise ValueError(f"{name} must be a boolean") from None
+    
+    snippet_chars = request_option(data, "snippet_chars")
+    if snippet_chars is None:
+        snippet_chars = COMPACT_SNIPPET_CHARS
+    else:
+        error = ValueError("snippet_chars must be a non-negative integer")
+        if isinstance(snippet_chars, (bool, float)) or not isinstance(snippet_chars, (int, str)):
+            raise error
+        try:
+            snippet_chars = int(snippet_chars)
+        except ValueError:
+            raise error from None
+        if snippet_chars < 0:
+            raise error
+    options["snippet_chars"] = snippet_chars
+    
+    fields = request_option(data, "fields")
+    if fields is not None and not isinstance(fields, str) and not (
+            isinstance(fields, list) and all(isinstance(field, str) for field in fields)):
+        raise ValueError("fields must be a string or list of strings")
+    options["fields"] = parse_fields(fields)
+    return options
+
+def shape_answer(payload, options):
+    """
+    Apply response options from response_options() to a successful answer
+    
+    Returns:
+        dict: Shaped copy of the payload
     """
-    return html_content
+    if options["html"]:
+        payload = markdown_renderer.with_html(payload)
+    if options["compact"]:
+        payload = compact_payload(payload, options["snippet_chars"])
+    return select_fields(payload, options["fields"])
+
+def serve_static_asset(asset):
+    """Respond with the best precompressed encoding, or 304 if the client's copy is current"""
+    encoding = asset.select_encoding(request.accept_encodings)
+    etag = asset.etag(encoding)
+    headers = {
+        "Cache-Control": asset.cache_control,
+        "Vary": "Accept-Encoding"
+    }
+
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304, headers=headers)
+        response.set_etag(etag)
+        return response
+
+    response = Response(asset.bodies[encoding], content_type=asset.content_type, headers=headers)
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    response.set_etag(etag)
+    return response
+
+@app.route("/")
+def home():
+    return serve_static_asset(static_assets.index)
+
+@app.route("/assets/<name>")
+def static_asset(name):
+    asset = static_assets.get(name)
+    if asset is None:
+        return jsonify({"error": "Not found"}), 404
+    return serve_static_asset(asset)
 
 @app.route("/ask", methods=["POST"])
 def ask():
@@ -517,87 +1340,201 @@ def ask():
         prompt = request.json.get("prompt", "")
         if not prompt:
             return jsonify({"error": "No prompt provided"}), 400
+        try:
+            shaping = response_options(request.json)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        # Try using the MCP server first (more direct integration)
-        print(f"🔄 Attempting to use MCP server for prompt: {prompt[:50]}...")
-        
-        # Call the MCP server directly
-        mcp_response = call_mcp_server(prompt)
-        
-        if mcp_response and mcp_response.get("success"):
-            # Process MCP server response
-            content, citations, metadata = process_mcp_response(mcp_response)
-            
-            if content:
-                print("✅ Successfully processed MCP server response")
-                return jsonify({
-                    "success": True,
-                    "content": content,
-                    "citations": citations or [],
-                    "source": "mcp_server",
-                    "metadata": metadata
-                })
-        else:
-            print(f"⚠️ MCP server failed: {mcp_response.get('error', 'Unknown error')}")
-        
-        # Fallback to Pinecone SDK if MCP server fails
-        if assistant:
-            print("🔄 Falling back to Pinecone SDK...")
-            try:
-                from pinecone_plugins.assistant.models.chat import Message
-                
-                resp = assistant.chat(
-                    messages=[Message(role="user", content=prompt)], 
-                    include_highlights=True
-                )
-                
-                # Process citations from the response
-                citations = []
-                if hasattr(resp, 'citations') and resp.citations:
-                    for citation in resp.citations:
-                        try:
-                            citation_data = {
-                                "file": citation.references[0].file.name if citation.references else "Unknown",
-                                "page": citation.references[0].pages[0] if citation.references and citation.references[0].pages else 1,
-                                "url": f"{citation.references[0].file.signed_url}#page={citation.references[0].references[0].pages[0]}" if citation.references and citation.references[0].file and citation.references[0].references else "#"
-                            }
-                            citations.append(citation_data)
-                        except Exception as e:
-                            print(f"Error processing citation: {e}")
-                            continue
-                
-                return jsonify({
-                    "content": resp.message.content,
-                    "citations": citations,
-                    "source": "pinecone_sdk"
-                })
-                
-            except Exception as e:
-                print(f"Error with Pinecone SDK fallback: {e}")
-                return jsonify({"error": f"Both MCP server and Pinecone SDK failed: {str(e)}"}), 500
-        else:
-            return jsonify({"error": "Neither MCP server nor Pinecone SDK available"}), 500
+        deadline = request_deadline(request.json.get("options"))
+        payload, status = serve_answer("ask", answer_question, prompt, deadline=deadline, admit=True)
+        if status == 200:
+            payload = shape_answer(payload, shaping)
+        return answer_response(payload, status)
         
     except Exception as e:
-        print(f"Error in ask endpoint: {e}")
+        log_event("ask.error", logging.ERROR, error=str(e), exc_info=True)
         return jsonify({"error": str(e)}), 500
 
+@app.route("/ask/stream", methods=["POST"])
+def ask_stream():
+    """
+    Stream an answer as Server-Sent Events
+    
+    Events: "token" ({"content": ...}), "citation" (citation dict),
+    "done" ({"source", "metadata"}, plus "html" when the request sets
+    "html": true) and "error" ({"error", "code", "message"})
+    """
+    data = request.get_json(silent=True) or {}
+    prompt = data.get("prompt", "")
+    if not prompt:
+        return jsonify({"error": "No prompt provided"}), 400
+    try:
+        render_html = parse_flag(data.get("html", False))
+    except ValueError:
+        return jsonify({"error": "html must be a boolean"}), 400
+    
+    cached, cache_key, vector = lookup_cached_answer("ask", answer_question, prompt)
+    release = None
+    if cached is not None:
+        events = replay_answer_events(cached, render_html)
+    else:
+        # Admitted before the response starts, so a shed request still gets its 503
+        events = stream_answer(prompt, cache_key, vector, render_html, request_deadline(data.get("options")))
+        if admission is not None:
+            release = admission.slot()
+            if release is None:
+                log_event("admission.shed", logging.WARNING, limit=admission.limit, stream=True)
+                return answer_response(*overloaded(admission.retry_after))
+            events = admitted_stream(events, release)
+    
+    response = Response(
+        events,
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+    if release is not None:
+        # A response closed before its first event never runs the generator's finally
+        response.call_on_close(release)
+    return response
+
+def batch_error(message):
+    """400 response for an invalid /ask/batch request"""
+    return jsonify({
+        "success": False,
+        "error": message,
+        "code": 400
+    }), 400
+
+def batch_number(data, name, default, cast):
+    """
+    Read a positive number from a /ask/batch request
+    
+    Args:
+        cast (type): int or float
+    
+    Raises:
+        ValueError: If the value is not a finite number above zero
+    """
+    value = data.get(name, default)
+    error = ValueError(f"{name} must be {'an integer' if cast is int else 'a number'} greater than 0")
+    if isinstance(value, bool) or (cast is int and isinstance(value, float) and not value.is_integer()):
+        raise error
+    try:
+        number = cast(value)
+    except (TypeError, ValueError, OverflowError):
+        raise error from None
+    if not math.isfinite(number) or number <= 0:
+        raise error
+    return number
+
+@app.route("/ask/batch", methods=["POST"])
+def ask_batch():
+    """
+    Answer a list of prompts with bounded concurrent fan-out
+    
+    Expected JSON payload:
+    {
+        "prompts": ["Question 1", "Question 2"],
+        "options": {"temperature": 0.7},
+        "concurrency": 8,
+        "item_timeout": 60,
+        "stream": false
+    }
+    
+    Results come back in input order. With "stream": true (or an
+    Accept: application/x-ndjson header) each result is streamed as one
+    NDJSON line as soon as it and all earlier items are done.
+    """
+    data = request.get_json(silent=True) or {}
+    prompts = data.get("prompts")
+    if not isinstance(prompts, list) or not prompts or not all(isinstance(p, str) and p for p in prompts):
+        return batch_error("prompts must be a non-empty list of strings")
+    if len(prompts) > BATCH_MAX_ITEMS:
+        return batch_error(f"Too many prompts (max {BATCH_MAX_ITEMS})")
+    
+    options = strip_deadline(data.get("options", {}))
+    try:
+        concurrency = batch_number(data, "concurrency", BATCH_DEFAULT_CONCURRENCY, int)
+        item_timeout = batch_number(data, "item_timeout", BATCH_ITEM_TIMEOUT, float)
+    except ValueError as e:
+        return batch_error(str(e))
+    concurrency = min(concurrency, BATCH_MAX_CONCURRENCY, mcp_client.pool_size)
+    if admission is not None:
+        # Items count against admission control; more at once would only be shed
+        concurrency = min(concurrency, admission.limit)
+    try:
+        stream = parse_flag(data.get("stream", False))
+    except ValueError:
+        return batch_error("stream must be a boolean")
+    stream = stream or "application/x-ndjson" in request.headers.get("Accept", "")
+    
+    log_event("batch.start", items=len(prompts), concurrency=concurrency)
+    results = run_batch(prompts, options, concurrency, item_timeout)
+    
+    if stream:
+        return Response(
+            (fast_json.dumps(result) + "\n" for result in results),
+            mimetype="application/x-ndjson",
+            headers={"X-Accel-Buffering": "no"}
+        )
+    
+    start = time.monotonic()
+    results = list(results)
+    succeeded = sum(1 for result in results if result.get("success"))
+    return jsonify({
+        "success": True,
+        "count": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "concurrency": concurrency,
+        "elapsed_s": round(time.monotonic() - start, 3),
+        "results": results
+    })
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus metrics aggregated across all worker processes"""
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
 @app.route("/health")
 def health():
     return jsonify({
         "status": "healthy",
-        "pinecone_available": assistant is not None,
-        "index_available": index is not None,
+        "pinecone_available": pinecone_clients.assistant(timeout=0) is not None,
+        "index_available": pinecone_clients.index(timeout=0) is not None,
+        "pinecone": pinecone_clients.stats(),
         "mcp_endpoint": MCP_SERVER_URL,
         "mcp_api_key_configured": bool(MCP_API_KEY),
+        "mcp_pool": mcp_client.pool_stats(),
+        "answer_cache": answer_cache.stats(),
+        "semantic_cache": semantic_cache.stats() if semantic_cache else None,
+        "hedging": hedger.stats() if hedger else None,
+        "circuit_breaker": mcp_breaker.stats(),
+        "retries": mcp_retry_policy.stats() if mcp_retry_policy else None,
+        "rate_limiter": mcp_rate_limiter.stats() if mcp_rate_limiter else None,
+        "coalescing": request_coalescer.stats(),
+        "admission": admission.stats() if admission else None,
+        "probes": upstream_prober.snapshot() if upstream_prober else None,
+        "logging": structured_log.stats(),
+        "markdown": markdown_renderer.stats(),
+        "compression": response_compressor.stats() if response_compressor else None,
+        "cassette": upstream_cassette.stats() if upstream_cassette else None,
         "environment": os.getenv("FLASK_ENV", "production"),
         "endpoints": {
             "main": "/",
             "ask": "/ask",
+            "ask_stream": "/ask/stream",
+            "ask_batch": "/ask/batch",
             "health": "/health",
+            "ready": "/ready",
             "mcp_test": "/mcp/test",
             "mcp_status": "/mcp/status",
             "mcp_chat": "/mcp/chat",
+            "metrics": "/metrics",
             "debug": "/debug"
         }
     })
@@ -612,10 +1549,24 @@ def debug():
         "routes": [str(rule) for rule in app.url_map.iter_rules()],
         "current_working_directory": os.getcwd(),
         "files_in_cwd": os.listdir(".") if os.path.exists(".") else "Directory not accessible",
-        "pinecone_assistant_status": "connected" if assistant else "disconnected",
-        "pinecone_index_status": "connected" if index else "disconnected"
+        "pinecone_assistant_status": "connected" if pinecone_clients.assistant(timeout=0) else "disconnected",
+        "pinecone_index_status": "connected" if pinecone_clients.index(timeout=0) else "disconnected"
     })
 
+@app.route("/ready")
+def ready():
+    """
+    Readiness, as opposed to liveness (/ping, /health)
+    
+    Returns 503 until the Pinecone warm-up has finished. A failed warm-up
+    still counts as ready: MCP-backed answers work without the SDK.
+    """
+    is_ready = pinecone_clients.wait(timeout=0)
+    return jsonify({
+        "ready": is_ready,
+        "pinecone": pinecone_clients.stats()
+    }), 200 if is_ready else 503
+
 @app.route("/test")
 def test():
     return "Test route working! Flask is running correctly."
@@ -629,15 +1580,35 @@ def test_mcp():
     """Test endpoint specifically for MCP server functionality"""
     try:
         test_prompt = request.json.get("prompt", "Hello, can you tell me about veterans benefits?")
+        try:
+            shaping = response_options(request.json)
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e),
+                "code": 400
+            }), 400
         
-        print(f"🧪 Testing MCP server with prompt: {test_prompt}")
+        log_event("mcp_test.start", prompt=truncate(test_prompt, 100))
         
         # Test the MCP server
-        mcp_response = call_mcp_server(test_prompt)
+        deadline = request_deadline()
+        timeout = stage_timeout(deadline)
+        if timeout == 0:
+            payload, status = deadline_exceeded(deadline, "mcp_call")
+            return jsonify(payload), status
+        
+        def run_test():
+            result = call_mcp_server(test_prompt, timeout=timeout, deadline=deadline)
+            return result, 502 if is_upstream_failure(result.get("code")) else 200
+        
+        mcp_response, status = admitted(run_test)
+        if status == 503:
+            return answer_response(mcp_response, status)
         
         if mcp_response and mcp_response.get("success"):
             content, citations, metadata = process_mcp_response(mcp_response)
-            return jsonify({
+            result = {
                 "success": True,
                 "mcp_server_status": "working",
                 "response": {
@@ -646,7 +1617,12 @@ def test_mcp():
                     "metadata": metadata
                 },
                 "raw_response": mcp_response
-            })
+            }
+            # Compact mode drops the echoed upstream body
+            if shaping["compact"]:
+                del result["raw_response"]
+            result["response"] = shape_answer(result["response"], shaping)
+            return jsonify(result)
         else:
             return jsonify({
                 "success": False,
@@ -657,7 +1633,7 @@ def test_mcp():
             })
             
     except Exception as e:
-        print(f"Error testing MCP server: {e}")
+        log_event("mcp_test.error", logging.ERROR, error=str(e), exc_info=True)
         return jsonify({
             "success": False,
             "mcp_server_status": "error",
@@ -666,28 +1642,32 @@ def test_mcp():
 
 @app.route("/mcp/status")
 def mcp_status():
-    """Get detailed status of MCP server connection"""
+    """
+    Get detailed status of MCP server connection
+    
+    Served from the background prober's latest results; pass ?live=true
+    to force a real test call instead.
+    """
     try:
-        # Test a simple connection
-        test_response = call_mcp_server("Test connection")
-        
         status_info = {
             "mcp_server_url": MCP_SERVER_URL,
             "api_key_configured": bool(MCP_API_KEY),
-            "connection_test": "success" if test_response and test_response.get("success") else "failed",
-            "last_test_time": "now",
-            "pinecone_sdk_status": "connected" if assistant else "disconnected",
-            "pinecone_index_status": "connected" if index else "disconnected"
+            "pinecone_sdk_status": "connected" if pinecone_clients.assistant(timeout=0) else "disconnected",
+            "pinecone_index_status": "connected" if pinecone_clients.index(timeout=0) else "disconnected",
+            "mcp_pool": mcp_client.pool_stats(),
+            "circuit_breaker": mcp_breaker.stats()
         }
         
-        if test_response and test_response.get("success"):
-            content, citations, metadata = process_mcp_response(test_response)
-            status_info["mcp_response_sample"] = {
-                "has_content": bool(content),
-                "has_citations": bool(citations),
-                "has_metadata": bool(metadata)
-            }
+        if request.args.get("live", "").lower() == "true":
+            # Test a simple connection
+            ok, sample = probe_mcp()
+            status_info["connection_test"] = "success" if ok else "failed"
+            status_info["last_test_time"] = "now"
+            if ok:
+                status_info["mcp_response_sample"] = sample
+            return jsonify(status_info)
         
+        status_info.update(probe_status(upstream_prober.snapshot() if upstream_prober else None))
         return jsonify(status_info)
         
     except Exception as e:
@@ -710,8 +1690,13 @@ def mcp_chat():
             "temperature": 0.7,
             "max_tokens": 1000,
             "include_highlights": true
-        }
+        },
+        "compact": true,
+        "fields": "content,citations.file,citations.page,citations.url"
     }
+    
+    "html", "compact", "snippet_chars" and "fields" shape the response;
+    see response_options().
     """
     try:
         data = request.get_json()
@@ -729,36 +1714,30 @@ def mcp_chat():
                 "error": "No prompt provided",
                 "code": 400
             }), 400
+        try:
+            shaping = response_options(data)
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e),
+                "code": 400
+            }), 400
         
-        # Extract options
+        # Extract options; deadline_ms is ours, not an upstream chat option
         options = data.get("options", {})
+        deadline = request_deadline(options)
+        options = strip_deadline(options)
         
-        print(f"💬 Advanced MCP chat request: {prompt[:100]}...")
-        print(f"⚙️ Options: {options}")
+        log_event("mcp_chat.start", prompt=truncate(prompt, 100), options=options)
         
         # Call MCP server with options
-        mcp_response = call_mcp_server(prompt, options)
-        
-        if mcp_response and mcp_response.get("success"):
-            content, citations, metadata = process_mcp_response(mcp_response)
-            
-            return jsonify({
-                "success": True,
-                "content": content,
-                "citations": citations or [],
-                "metadata": metadata,
-                "source": "mcp_server_advanced"
-            })
-        else:
-            return jsonify({
-                "success": False,
-                "error": mcp_response.get("error", "Unknown error"),
-                "code": mcp_response.get("code", "unknown"),
-                "message": mcp_response.get("message", "No additional details")
-            }), 500
+        payload, status = serve_answer("mcp_chat", mcp_chat_answer, prompt, options, deadline, admit=True)
+        if status == 200:
+            payload = shape_answer(payload, shaping)
+        return answer_response(payload, status)
             
     except Exception as e:
-        print(f"Error in advanced MCP chat: {e}")
+        log_event("mcp_chat.error", logging.ERROR, error=str(e), exc_info=True)
         return jsonify({
             "success": False,
             "error": str(e),
@@ -766,13 +1745,14 @@ def mcp_chat():
         }), 500
 
 if __name__ == "__main__":
-    print("🚀 Starting Veterans Benefits Assistant...")
-    print(f"📁 Templates folder: {app.template_folder}")
-    print(f"🔑 Pinecone API Key: {'✅ Set' if os.getenv('PINECONE_API_KEY') else '❌ Missing'}")
-    print(f"📊 Pinecone Index: {os.getenv('PINECONE_INDEX_NAME', 'veterans-benefits')}")
-    print(f"📍 Current working directory: {os.getcwd()}")
-    print(f"📂 Files in current directory: {os.listdir('.') if os.path.exists('.') else 'Directory not accessible'}")
-    print(f"🔗 MCP Endpoint: https://prod-1-data.ke.pinecone.io/mcp/assistants/vb")
+    log_event(
+        "startup",
+        templates_folder=app.template_folder,
+        pinecone_api_key_set=bool(os.getenv("PINECONE_API_KEY")),
+        pinecone_index=os.getenv("PINECONE_INDEX_NAME", "veterans-benefits"),
+        cwd=os.getcwd(),
+        mcp_endpoint=MCP_SERVER_URL
+    )
     
     # Get port from environment variable (for cloud deployment)
     port = int(os.environ.get("PORT", 5000))
@@ -0,0 +1,368 @@
+"""
+asyncio-native (ASGI) variant of the Veterans Benefits Assistant API
+
+Serves the same /ask, /mcp/chat, /mcp/status and /health routes as app.py,
+but awaits the MCP call on a shared httpx client and runs the blocking
+Pinecone SDK fallback in a thread pool, so one process can keep hundreds
+of slow upstream calls in flight.
+
+The MCP call goes through app.py's circuit breaker, host-wide rate
+limiter, retry policy and upstream metrics, and concurrent identical
+prompts share one call, as they do in app.py.
+
+Run with:
+    gunicorn asgi_app:app -k uvicorn.workers.UvicornWorker
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import app as sync_app
+import metrics
+from deadlines import DEADLINE_HEADER, Deadline, deadline_exceeded, strip_deadline
+from mcp_client import AsyncMCPClient
+from structured_log import log_event
+
+# Bounded pool for the blocking Pinecone SDK fallback and cache lookups
+executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("ASGI_EXECUTOR_WORKERS", "32")),
+    thread_name_prefix="asgi-blocking"
+)
+
+mcp_client = None
+
+# In-flight answers by cache key, so concurrent identical prompts share one
+in_flight = {}
+
+
+async def run_blocking(fn, *args):
+    """Run a blocking call in the shared executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, fn, *args)
+
+
+def request_deadline(request, options=None):
+    """Deadline for a request from its header, options or the server default, as in app.py"""
+    return Deadline.for_request(
+        request.headers.get(DEADLINE_HEADER),
+        options if isinstance(options, dict) else None,
+        default_ms=sync_app.DEADLINE_DEFAULT_MS,
+        max_ms=sync_app.DEADLINE_MAX_MS
+    )
+
+
+async def call_mcp_server(prompt, options=None, timeout=None, deadline=None):
+    """
+    Async counterpart of app.call_mcp_server: retries under app.mcp_retry_policy
+
+    Returns:
+        dict: The final attempt's result, with "retries" and
+              "retry_latency_ms" when it needed retries
+    """
+    started = time.monotonic()
+    retries = 0
+    if sync_app.mcp_retry_policy is not None:
+        sync_app.mcp_retry_policy.record_call()
+
+    while True:
+        attempt_started = time.monotonic()
+        result = await call_mcp_server_once(prompt, options, timeout, deadline)
+        delay = sync_app.next_retry_delay(result, retries, timeout, attempt_started)
+        if delay is None:
+            break
+        await asyncio.sleep(delay)
+        retries += 1
+        if timeout is not None:
+            timeout -= time.monotonic() - attempt_started
+
+    if retries:
+        result = dict(result, retries=retries, retry_latency_ms=round((attempt_started - started) * 1000, 1))
+    return result
+
+
+async def call_mcp_server_once(prompt, options=None, timeout=None, deadline=None):
+    """Make a single MCP call through app.py's circuit breaker and rate limiter"""
+    if not sync_app.mcp_breaker.allow_request():
+        log_event("mcp.circuit_open", logging.WARNING)
+        return dict(sync_app.CIRCUIT_OPEN_RESPONSE)
+
+    # The shared token bucket is file-locked and may queue, so wait off the loop
+    acquired, timeout = await run_blocking(sync_app.acquire_mcp_slot, timeout)
+    if not acquired:
+        sync_app.mcp_breaker.release()
+        return dict(sync_app.RATE_LIMITED_RESPONSE)
+
+    start = time.perf_counter()
+    result = await mcp_client.chat(prompt, options, timeout=timeout)
+    metrics.record_upstream(result, time.perf_counter() - start)
+    # 429s slow the shared bucket down, successes let it recover
+    await run_blocking(sync_app.record_mcp_result, result, timeout, deadline)
+    return result
+
+
+async def mcp_answer(prompt, options=None, source="mcp_server", timeout=None, deadline=None):
+    """
+    Call the MCP server and shape a successful answer
+
+    Args:
+        timeout (float): Overrides the client timeout, e.g. to fit a request deadline
+        deadline (Deadline): The request deadline timeout was taken from, if any
+
+    Returns:
+        tuple: (payload dict or None, raw MCP response)
+    """
+    mcp_response = await call_mcp_server(prompt, options, timeout=timeout, deadline=deadline)
+    if mcp_response.get("success"):
+        content, citations, metadata = sync_app.process_mcp_response(mcp_response)
+        if content:
+            return {
+                "success": True,
+                "content": content,
+                "citations": citations or [],
+                "source": source,
+                "metadata": metadata
+            }, mcp_response
+    return None, mcp_response
+
+
+async def serve_cached(namespace, answer_fn, prompt, options, compute, deadline=None):
+    """
+    Answer through the shared caches, awaiting compute() on a miss
+
+    Concurrent misses for the same cache key share the first caller's
+    compute(); the others wait for it until their own deadline.
+
+    Returns:
+        tuple: (payload dict, HTTP status code)
+    """
+    cached, cache_key, vector = await run_blocking(
+        sync_app.lookup_cached_answer, namespace, answer_fn, prompt, options
+    )
+    if cached is not None:
+        return cached, 200
+
+    async def compute_and_store():
+        payload, status = await compute()
+        if status == 200:
+            await run_blocking(
+                sync_app.store_cached_answer, namespace, cache_key, prompt, payload, options, vector
+            )
+        return payload, status
+
+    task = in_flight.get(cache_key)
+    shared = task is not None
+    if not shared:
+        task = in_flight[cache_key] = asyncio.ensure_future(compute_and_store())
+        task.add_done_callback(lambda done: in_flight.pop(cache_key, None))
+
+    try:
+        # Shielded: a caller that gives up does not cancel the call for the others
+        payload, status = await asyncio.wait_for(
+            asyncio.shield(task), timeout=deadline.remaining() if deadline else None
+        )
+    except asyncio.TimeoutError:
+        return deadline_exceeded(deadline, "coalesced upstream call")
+    if status == 200:
+        payload = sync_app.with_cache_metadata(payload, False)
+        if shared:
+            payload["metadata"]["coalesced"] = True
+    return payload, status
+
+
+async def ask(request):
+    try:
+        data = await request.json()
+        prompt = data.get("prompt", "")
+        if not prompt:
+            return JSONResponse({"error": "No prompt provided"}, status_code=400)
+
+        deadline = request_deadline(request)
+
+        async def compute():
+            # Same split as app.answer_question: the SDK fallback gets what the MCP call leaves
+            timeout = sync_app.stage_timeout(deadline, sync_app.DEADLINE_MCP_SHARE)
+            if timeout == 0:
+                return deadline_exceeded(deadline, "mcp_call")
+            payload, mcp_response = await mcp_answer(prompt, timeout=timeout, deadline=deadline)
+            if payload:
+                return payload, 200
+            log_event("ask.mcp_failed", logging.WARNING, error=mcp_response.get("error", "Unknown error"), code=mcp_response.get("code"))
+            return await run_blocking(sync_app.sdk_answer, prompt, deadline)
+
+        payload, status = await serve_cached("ask", sync_app.answer_question, prompt, None, compute, deadline)
+        return JSONResponse(payload, status_code=status)
+
+    except Exception as e:
+        log_event("ask.error", logging.ERROR, error=str(e), exc_info=True)
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def mcp_chat(request):
+    try:
+        data = await request.json()
+        if not data:
+            return JSONResponse({
+                "success": False,
+                "error": "No JSON data provided",
+                "code": 400
+            }, status_code=400)
+
+        prompt = data.get("prompt")
+        if not prompt:
+            return JSONResponse({
+                "success": False,
+                "error": "No prompt provided",
+                "code": 400
+            }, status_code=400)
+
+        # deadline_ms is ours, not an upstream chat option
+        options = data.get("options", {})
+        deadline = request_deadline(request, options)
+        options = strip_deadline(options)
+
+        async def compute():
+            timeout = sync_app.stage_timeout(deadline)
+            if timeout == 0:
+                return deadline_exceeded(deadline, "mcp_call")
+            payload, mcp_response = await mcp_answer(
+                prompt, options, source="mcp_server_advanced", timeout=timeout, deadline=deadline
+            )
+            if payload:
+                return payload, 200
+            if mcp_response.get("code") == "timeout" and timeout < mcp_client.timeout:
+                return deadline_exceeded(deadline, "mcp_call")
+            if mcp_response.get("code") == "rate_limited":
+                return dict(mcp_response), 429
+            return {
+                "success": False,
+                "error": mcp_response.get("error", "Unknown error"),
+                "code": mcp_response.get("code", "unknown"),
+                "message": mcp_response.get("message", "No additional details")
+            }, 500
+
+        payload, status = await serve_cached("mcp_chat", sync_app.mcp_chat_answer, prompt, options, compute, deadline)
+        return JSONResponse(payload, status_code=status)
+
+    except Exception as e:
+        log_event("mcp_chat.error", logging.ERROR, error=str(e), exc_info=True)
+        return JSONResponse({
+            "success": False,
+            "error": str(e),
+            "code": "exception"
+        }, status_code=500)
+
+
+async def probe_snapshot():
+    """The background prober's latest results (a small file read), or None"""
+    if sync_app.upstream_prober is None:
+        return None
+    return await run_blocking(sync_app.upstream_prober.snapshot)
+
+
+async def mcp_status(request):
+    """
+    Status of the MCP server connection
+
+    Served from the background prober's latest results, as in app.py; pass
+    ?live=true to force a real test call instead.
+    """
+    try:
+        status_info = {
+            "mcp_server_url": sync_app.MCP_SERVER_URL,
+            "api_key_configured": bool(sync_app.MCP_API_KEY),
+            "pinecone_sdk_status": "connected" if sync_app.pinecone_clients.assistant(timeout=0) else "disconnected",
+            "pinecone_index_status": "connected" if sync_app.pinecone_clients.index(timeout=0) else "disconnected",
+            "mcp_pool": mcp_client.pool_stats()
+        }
+
+        if request.query_params.get("live", "").lower() == "true":
+            test_response = await mcp_client.chat("Test connection")
+            status_info["connection_test"] = "success" if test_response.get("success") else "failed"
+            status_info["last_test_time"] = "now"
+            if test_response.get("success"):
+                content, citations, metadata = sync_app.process_mcp_response(test_response)
+                status_info["mcp_response_sample"] = {
+                    "has_content": bool(content),
+                    "has_citations": bool(citations),
+                    "has_metadata": bool(metadata)
+                }
+            return JSONResponse(status_info)
+
+        status_info.update(sync_app.probe_status(await probe_snapshot()))
+        return JSONResponse(status_info)
+
+    except Exception as e:
+        return JSONResponse({
+            "mcp_server_url": sync_app.MCP_SERVER_URL,
+            "api_key_configured": bool(sync_app.MCP_API_KEY),
+            "connection_test": "error",
+            "error": str(e)
+        }, status_code=500)
+
+
+async def health(request):
+    return JSONResponse({
+        "status": "healthy",
+        "server": "asgi",
+        "pinecone_available": sync_app.pinecone_clients.assistant(timeout=0) is not None,
+        "index_available": sync_app.pinecone_clients.index(timeout=0) is not None,
+        "pinecone": sync_app.pinecone_clients.stats(),
+        "mcp_endpoint": sync_app.MCP_SERVER_URL,
+        "mcp_api_key_configured": bool(sync_app.MCP_API_KEY),
+        "mcp_pool": mcp_client.pool_stats() if mcp_client else None,
+        "answer_cache": sync_app.answer_cache.stats(),
+        "semantic_cache": sync_app.semantic_cache.stats() if sync_app.semantic_cache else None,
+        "circuit_breaker": sync_app.mcp_breaker.stats(),
+        "retries": sync_app.mcp_retry_policy.stats() if sync_app.mcp_retry_policy else None,
+        "rate_limiter": sync_app.mcp_rate_limiter.stats() if sync_app.mcp_rate_limiter else None,
+        "probes": await probe_snapshot(),
+        "environment": os.getenv("FLASK_ENV", "production")
+    })
+
+
+async def ready(request):
+    is_ready = sync_app.pinecone_clients.wait(timeout=0)
+    return JSONResponse({
+        "ready": is_ready,
+        "pinecone": sync_app.pinecone_clients.stats()
+    }, status_code=200 if is_ready else 503)
+
+
+async def ping(request):
+    return JSONResponse({"message": "pong", "status": "ok"})
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    global mcp_client
+    mcp_client = AsyncMCPClient(
+        sync_app.MCP_SERVER_URL,
+        sync_app.MCP_API_KEY,
+        pool_size=int(os.getenv("ASGI_MCP_POOL_SIZE", "200")),
+        timeout=float(os.getenv("MCP_TIMEOUT", "60"))
+    )
+    try:
+        yield
+    finally:
+        await mcp_client.close()
+
+
+app = Starlette(
+    routes=[
+        Route("/ask", ask, methods=["POST"]),
+        Route("/mcp/chat", mcp_chat, methods=["POST"]),
+        Route("/mcp/status", mcp_status),
+        Route("/health", health),
+        Route("/ready", ready),
+        Route("/ping", ping),
+    ],
+    lifespan=lifespan
+)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark the sync (gunicorn sync workers) app against the ASGI variant
+
+Both servers are pointed at a local fake MCP upstream with a fixed latency,
+then hit with the same number of concurrent /ask requests. With sync
+workers, throughput is capped at workers / latency; the ASGI app should
+keep every request in flight at once.
+
+Usage:
+    python bench_asgi.py --workers 2 --concurrency 100 --requests 300 --latency 1.0
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+
+def start_fake_upstream(latency):
+    """Start a threaded HTTP server that answers /chat after a fixed delay"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length))
+            time.sleep(latency)
+            answer = json.dumps({
+                "message": {"content": f"Answer to: {body['messages'][0]['content']}"},
+                "citations": [],
+                "model": "fake"
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(answer)))
+            self.end_headers()
+            self.wfile.write(answer)
+
+    ThreadingHTTPServer.daemon_threads = True
+    ThreadingHTTPServer.request_queue_size = 1024
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_server(command, port, upstream_url):
+    env = dict(
+        os.environ,
+        MCP_SERVER_URL=upstream_url,
+        ANSWER_CACHE_MAX_ENTRIES="0",
+        SEMANTIC_CACHE_BACKEND="off"
+    )
+    proc = subprocess.Popen(
+        command,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/ping", timeout=1).status_code == 200:
+                return proc
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"Server did not start: {' '.join(command)}")
+
+
+def run_load(port, total, concurrency, timeout):
+    local = threading.local()
+
+    def one(i):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = session.post(
+                f"http://127.0.0.1:{port}/ask",
+                json={"prompt": f"benchmark question {i}"},
+                timeout=timeout
+            )
+            ok = response.status_code == 200
+        except requests.exceptions.RequestException:
+            ok = False
+        return ok, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for ok, latency in results if ok)
+    errors = sum(1 for ok, _ in results if not ok)
+    return {
+        "requests": total,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round((total - errors) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1) if latencies else None,
+        "max_ms": round(latencies[-1] * 1000, 1) if latencies else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=1.0, help="Fake upstream latency in seconds")
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    upstream = start_fake_upstream(args.latency)
+    upstream_url = f"http://127.0.0.1:{upstream.server_port}/mcp/assistants/vb"
+
+    servers = {
+        # gunicorn.conf.py defaults to gthread; force one-request-at-a-time workers
+        "sync (gunicorn sync)": ["gunicorn", "app:app", "-k", "sync", "--threads", "1"],
+        "async (uvicorn worker)": ["gunicorn", "asgi_app:app", "-k", "uvicorn.workers.UvicornWorker"]
+    }
+
+    print(f"🏁 {args.requests} requests, concurrency {args.concurrency}, "
+          f"{args.workers} workers, upstream latency {args.latency}s")
+    results = {}
+    for offset, (name, command) in enumerate(servers.items()):
+        port = 8700 + offset
+        command = command + ["-w", str(args.workers), "-b", f"127.0.0.1:{port}", "--timeout", "300"]
+        proc = start_server([sys.executable, "-m"] + command, port, upstream_url)
+        try:
+            results[name] = run_load(port, args.requests, args.concurrency, args.timeout)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    for name, result in results.items():
+        print(f"{name:<24} " + "  ".join(f"{key}={value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
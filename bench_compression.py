@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark response compression: CPU time versus bytes per encoding and level
+
+Compresses /ask response bodies with every available encoder at several
+levels and reports the mean compressed size, ratio and compression time
+per response. Bodies come from a file of recorded answers (one JSON answer
+payload per line, e.g. captured /ask responses) or, by default, from
+synthetic answers whose text is shuffled from a domain vocabulary, so it
+compresses roughly like real prose rather than repeated sentences.
+
+Usage:
+    python bench_compression.py --answers recorded_answers.jsonl
+    python bench_compression.py --iterations 200
+"""
+
+import argparse
+import json
+import random
+import time
+
+import fast_json
+from compression import BrotliEncoder, GzipEncoder, ZstdEncoder, available_encoders
+
+LEVELS = {
+    "gzip": (GzipEncoder, (1, 6, 9)),
+    "br": (BrotliEncoder, (1, 4, 7, 11)),
+    "zstd": (ZstdEncoder, (1, 3, 9, 19))
+}
+
+
+VOCABULARY = (
+    "veteran veterans disability compensation rating service-connected claim claims evidence "
+    "medical examination VA benefits eligibility discharge honorable pension survivors dependents "
+    "education GI Bill housing loan guaranty health care enrollment priority group appeal review "
+    "supplemental higher-level board decision effective date percent monthly payment condition "
+    "injury illness presumptive exposure deployment burn pit Agent Orange PACT Act hearing nexus "
+    "opinion records treatment private provider form application submit online regional office "
+    "the a of to and in for with may be is are your you if an or on by at from that this must"
+).split()
+
+
+def synthetic_answer(rng, citations):
+    def prose(words):
+        return " ".join(rng.choice(VOCABULARY) for _ in range(words)).capitalize() + "."
+
+    return {
+        "success": True,
+        "content": "\n\n".join(prose(rng.randint(40, 90)) for _ in range(8)),
+        "citations": [
+            {
+                "file": f"M21-1 Adjudication Procedures Manual part {rng.randint(1, 12)}.pdf",
+                "page": rng.randint(1, 300),
+                "url": f"https://storage.googleapis.com/knowledge-prod-files/vb/file-{rng.getrandbits(64):016x}.pdf"
+                       f"?X-Goog-Signature={rng.getrandbits(256):064x}",
+                "text": prose(rng.randint(60, 120)),
+                "confidence": round(rng.random(), 3)
+            }
+            for _ in range(citations)
+        ],
+        "source": "mcp_server",
+        "metadata": {"model": "gpt-4o-2024-05-13", "usage": {"total_tokens": rng.randint(3000, 8000)}}
+    }
+
+
+def load_bodies(path):
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return [fast_json.dumps_bytes(json.loads(line)) for line in f if line.strip()]
+    rng = random.Random(42)
+    return [fast_json.dumps_bytes(synthetic_answer(rng, n)) for n in (0, 5, 10, 25, 50)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--answers", help="JSONL file of recorded answer payloads")
+    parser.add_argument("--iterations", type=int, default=100, help="Compressions per body and level")
+    args = parser.parse_args()
+
+    bodies = load_bodies(args.answers)
+    raw_bytes = sum(len(body) for body in bodies) / len(bodies)
+    print(f"{len(bodies)} responses, mean {raw_bytes:.0f} bytes uncompressed")
+    print(f"{'encoding':<9} {'level':>5} {'mean bytes':>11} {'ratio':>7} {'us/response':>12}")
+
+    for name in available_encoders():
+        encoder_class, levels = LEVELS[name]
+        for level in levels:
+            encoder = encoder_class(level)
+            sizes = [len(encoder.compress(body)) for body in bodies]
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                for body in bodies:
+                    encoder.compress(body)
+            per_response_us = (time.perf_counter() - start) / (args.iterations * len(bodies)) * 1e6
+            mean_size = sum(sizes) / len(sizes)
+            print(f"{name:<9} {level:>5} {mean_size:>11.0f} {mean_size / raw_bytes:>7.3f} {per_response_us:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark JSON decode/encode per request: stdlib json versus fast_json
+
+For synthetic MCP responses with 0 to 50 citations (each carrying a
+highlight, several pointing at the same file and page), it times the two
+JSON steps of one /ask request:
+
+- decoding the upstream body (what MCPClient.chat does)
+- encoding the /ask response through the Flask JSON provider (jsonify)
+
+A second table compares response size and encode time for the full
+payload, compact mode, and compact mode with the fields the page uses.
+
+Usage:
+    python bench_json.py --iterations 2000
+"""
+
+import argparse
+import json
+import time
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import fast_json
+from payload_shaping import compact_payload, parse_fields, select_fields
+
+PAGE_FIELDS = "html,citations.file,citations.page,citations.url"
+
+SENTENCE = "Veterans with a service-connected disability rated at 10 percent or higher may qualify for monthly compensation. "
+
+
+def mcp_body(citations):
+    """Raw MCP chat response body, as bytes off the wire"""
+    return json.dumps({
+        "id": "chatcmpl-0f6c2d",
+        "model": "gpt-4o-2024-05-13",
+        "created": 1717000000,
+        "message": {"role": "assistant", "content": SENTENCE * 30},
+        "citations": [
+            {
+                "position": 120 * i,
+                "file": {"name": f"M21-1 Adjudication Procedures Manual part {i % 6}.pdf", "id": f"file-{i % 6:04d}"},
+                "page": i % 9 + 1,
+                "url": f"https://storage.googleapis.com/knowledge-prod-files/vb/file-{i:04d}.pdf?X-Goog-Signature={'ab' * 64}",
+                "text": SENTENCE * 5,
+                "confidence": 0.87
+            }
+            for i in range(citations)
+        ],
+        "usage": {"prompt_tokens": 5231, "completion_tokens": 612, "total_tokens": 5843}
+    }).encode("utf-8")
+
+
+def ask_payload(data):
+    """The /ask response built from a decoded MCP body"""
+    return {
+        "success": True,
+        "content": data["message"]["content"],
+        "citations": [
+            {
+                "file": c["file"]["name"],
+                "page": c["page"],
+                "url": c["url"],
+                "text": c["text"],
+                "confidence": c["confidence"]
+            }
+            for c in data["citations"]
+        ],
+        "source": "mcp_server",
+        "metadata": {"model": data["model"], "usage": data["usage"], "id": data["id"], "cached": False}
+    }
+
+
+def per_call_us(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    stdlib_app = Flask("stdlib")
+    stdlib_app.json = DefaultJSONProvider(stdlib_app)
+    fast_app = Flask("fast")
+    fast_app.json = fast_json.FastJSONProvider(fast_app)
+
+    print(f"fast_json backend: {fast_json.BACKEND}")
+    print(f"{'citations':>9} {'body KB':>8} {'decode json':>12} {'decode fast':>12} "
+          f"{'encode json':>12} {'encode fast':>12}   (us per request)")
+
+    for citations in (0, 10, 25, 50):
+        body = mcp_body(citations)
+        payload = ask_payload(json.loads(body))
+
+        decode_std = per_call_us(lambda: json.loads(body), args.iterations)
+        decode_fast = per_call_us(lambda: fast_json.loads(body), args.iterations)
+        with stdlib_app.app_context():
+            encode_std = per_call_us(lambda: stdlib_app.json.response(payload), args.iterations)
+        with fast_app.app_context():
+            encode_fast = per_call_us(lambda: fast_app.json.response(payload), args.iterations)
+
+        print(f"{citations:>9} {len(body) / 1024:>8.1f} {decode_std:>12.1f} {decode_fast:>12.1f} "
+              f"{encode_std:>12.1f} {encode_fast:>12.1f}")
+
+    print()
+    print(f"{'citations':>9} {'mode':<16} {'bytes':>8} {'shape+encode us':>16}")
+    fields = parse_fields(PAGE_FIELDS)
+    modes = {
+        "full": lambda p: p,
+        "compact": lambda p: compact_payload(p),
+        "compact+fields": lambda p: select_fields(compact_payload(dict(p, html=p["content"])), fields)
+    }
+    for citations in (0, 10, 25, 50):
+        payload = ask_payload(json.loads(mcp_body(citations)))
+        for mode, shape in modes.items():
+            size = len(fast_json.dumps_bytes(shape(payload)))
+            with fast_app.app_context():
+                encode = per_call_us(lambda: fast_app.json.response(shape(payload)), args.iterations)
+            print(f"{citations:>9} {mode:<16} {size:>8} {encode:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-request logging overhead: print() versus structured_log
+
+Replays the log lines a typical /ask request emits (a success, and an
+upstream error carrying a large response body) against two sinks: a fast
+one (/dev/null) and a slow one that sleeps on every write to mimic a
+backed-up log drain. Only time spent on the request thread is counted.
+
+Usage:
+    python bench_logging.py --requests 2000 --slow-write-us 200
+"""
+
+import argparse
+import io
+import logging
+import time
+
+import structured_log
+from structured_log import log_event, truncate
+
+PROMPT = "What are the basic eligibility requirements for VA disability compensation? " * 3
+ERROR_BODY = '{"error": "upstream failure", "detail": "' + "x" * 20000 + '"}'
+URL = "https://prod-1-data.ke.pinecone.io/mcp/assistants/vb"
+
+
+class SlowSink(io.TextIOBase):
+    """Text sink whose writes block, like stdout behind a slow log drain"""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def write(self, text):
+        time.sleep(self.delay)
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def print_request(sink, error):
+    """The print() lines app.py used to emit for one /ask request"""
+    print(f"🔄 Attempting to use MCP server for prompt: {PROMPT[:50]}...", file=sink)
+    print(f"🔗 Calling MCP server: {URL}", file=sink)
+    print(f"📝 Prompt: {PROMPT[:100]}...", file=sink)
+    if error:
+        print("📡 MCP Server response status: 502", file=sink)
+        print(f"❌ MCP Server error: 502 - {ERROR_BODY}", file=sink)
+        print("⚠️ MCP server failed: Server error: 502", file=sink)
+    else:
+        print("📡 MCP Server response status: 200", file=sink)
+        print("✅ MCP Server response received successfully", file=sink)
+        print("✅ Successfully processed MCP server response", file=sink)
+
+
+def structured_request(sink, error):
+    """The structured events app.py emits for the same request"""
+    log_event("ask.start", prompt=truncate(PROMPT, 50))
+    log_event("mcp.request", url=URL, prompt=truncate(PROMPT, 100))
+    if error:
+        log_event("mcp.response", status=502)
+        log_event("mcp.error", logging.ERROR, code=502, error="Server error", body=ERROR_BODY)
+        log_event("ask.mcp_failed", logging.WARNING, error="Server error: 502", code=502)
+    else:
+        log_event("mcp.response", status=200)
+
+
+def measure(emit, sink, requests, error):
+    start = time.perf_counter()
+    for _ in range(requests):
+        emit(sink, error)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--slow-write-us", type=float, default=200, help="Per-write delay of the slow sink")
+    args = parser.parse_args()
+
+    print(f"{'sink':<6} {'request':<8} {'print() us/req':>15} {'structured us/req':>18} {'dropped':>8}")
+    for sink_name in ("fast", "slow"):
+        for error in (False, True):
+            if sink_name == "fast":
+                sink = open("/dev/null", "w")
+            else:
+                sink = SlowSink(args.slow_write_us / 1e6)
+
+            before = measure(print_request, sink, args.requests, error)
+
+            structured_log.configure_logging(stream=sink, level="INFO", sample_rates={})
+            after = measure(structured_request, sink, args.requests, error)
+            dropped = structured_log.stats()["dropped"]
+            structured_log.flush(timeout=60)
+
+            kind = "error" if error else "success"
+            print(f"{sink_name:<6} {kind:<8} {before:>15.1f} {after:>18.1f} {dropped:>8}")
+
+    structured_log.configure_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark the answer parsers: process_mcp_response and extract_sdk_citations
+
+Each parser runs on payloads with 0, 10, 100 and 1000 citations:
+
+- mcp/message: MCP chat body in the usual {"message": {...}} shape
+- mcp/choices: the same answer in OpenAI "choices" shape, the last format
+  process_mcp_response probes for
+- sdk: an SDK chat response object, with the attributes extract_sdk_citations reads
+- sdk/skipped: SDK citations whose URL lookup fails, so every citation takes
+  the logged-and-skipped path
+
+MCP bodies are generated like fake_mcp_server's answers. Recorded bodies
+can be added with --payloads, a JSONL file with one MCP chat body per line
+as returned by the upstream; they run as mcp/recorded, labelled by their
+citation count.
+
+Timing follows pytest-benchmark: rounds of calibrated iterations, reporting
+min/median/mean/stddev per call. Memory is measured separately under
+tracemalloc: the peak allocated during one call and what the result keeps
+alive afterwards.
+
+Usage:
+    python bench_parsing.py
+    python bench_parsing.py --payloads recorded_mcp_bodies.jsonl --rounds 20 --json parsing.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+os.environ.setdefault("PINECONE_WARMUP", "false")
+os.environ.setdefault("PROBE_ENABLED", "false")
+
+import app
+import fake_mcp_server
+import structured_log
+
+SIZES = (0, 10, 100, 1000)
+
+
+def mcp_body(citations):
+    fake = fake_mcp_server.FakeMCP(fake_mcp_server.FakeMCPConfig(citations=citations, seed=42))
+    return fake.answer("What disability compensation am I eligible for?")
+
+
+def choices_body(body):
+    """The same answer in OpenAI "choices" shape"""
+    body = dict(body, choices=[{"message": body["message"]}])
+    del body["message"]
+    return body
+
+
+def sdk_response(body, url_pages=True):
+    """
+    SDK-style response object built from an MCP body
+
+    extract_sdk_citations takes the URL's page from reference.references;
+    without it (url_pages=False) reading the citation fails and it is skipped.
+    """
+    def reference(c):
+        ref = SimpleNamespace(
+            file=SimpleNamespace(name=c["file"]["name"], signed_url=c["url"]),
+            pages=[c["page"]],
+            highlight=SimpleNamespace(content=c["text"])
+        )
+        if url_pages:
+            ref.references = [SimpleNamespace(pages=[c["page"]])]
+        return ref
+
+    return SimpleNamespace(
+        message=SimpleNamespace(role="assistant", content=body["message"]["content"]),
+        citations=[SimpleNamespace(position=c["position"], references=[reference(c)]) for c in body["citations"]]
+    )
+
+
+def mcp_result(body):
+    """call_mcp_server's success shape around an MCP body"""
+    return {"success": True, "data": body, "status_code": 200}
+
+
+def cases(payloads_path):
+    """Yield (parser, case name, citations, fn) for every benchmark"""
+    for n in SIZES:
+        body = mcp_body(n)
+        result = mcp_result(body)
+        choices = mcp_result(choices_body(body))
+        sdk = sdk_response(body)
+        sdk_skipped = sdk_response(body, url_pages=False)
+        yield "process_mcp_response", "mcp/message", n, lambda r=result: app.process_mcp_response(r)
+        yield "process_mcp_response", "mcp/choices", n, lambda r=choices: app.process_mcp_response(r)
+        yield "extract_sdk_citations", "sdk", n, lambda r=sdk: app.extract_sdk_citations(r)
+        yield "extract_sdk_citations", "sdk/skipped", n, lambda r=sdk_skipped: app.extract_sdk_citations(r)
+
+    if payloads_path:
+        with open(payloads_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    body = json.loads(line)
+                    result = mcp_result(body)
+                    n = len(body.get("citations") or [])
+                    yield "process_mcp_response", "mcp/recorded", n, lambda r=result: app.process_mcp_response(r)
+
+
+def calibrate(fn, min_round_time):
+    """Iterations per round so a round takes at least min_round_time"""
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        if time.perf_counter() - start >= min_round_time or iterations >= 1_000_000:
+            return iterations
+        iterations *= 2
+
+
+def time_per_call(fn, rounds, min_round_time):
+    iterations = calibrate(fn, min_round_time)
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        samples.append((time.perf_counter() - start) / iterations)
+    return {
+        "rounds": rounds,
+        "iterations": iterations,
+        "min_us": round(min(samples) * 1e6, 2),
+        "median_us": round(statistics.median(samples) * 1e6, 2),
+        "mean_us": round(statistics.mean(samples) * 1e6, 2),
+        "stddev_us": round(statistics.stdev(samples) * 1e6, 2) if len(samples) > 1 else 0.0
+    }
+
+
+def memory_per_call(fn):
+    """Peak bytes allocated during one call, and bytes its result keeps alive"""
+    fn()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = fn()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return {"peak_kb": round((peak - before) / 1024, 1), "retained_kb": round((after - before) / 1024, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payloads", help="JSONL file of recorded MCP chat bodies")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--min-round-time", type=float, default=0.05, help="Seconds per round, at least")
+    parser.add_argument("--json", help="Write the results to this file as well")
+    args = parser.parse_args()
+
+    # Skipped citations are logged; keep the cost of logging but not the output
+    sink = open(os.devnull, "w")
+    structured_log.configure_logging(stream=sink, sample_rates={})
+
+    print(f"{'parser':<22} {'case':<13} {'citations':>9} {'min us':>10} {'median us':>10} "
+          f"{'mean us':>10} {'stddev us':>10} {'peak KB':>9} {'retained KB':>11}")
+    results = []
+    for parser_name, case, citations, fn in cases(args.payloads):
+        timing = time_per_call(fn, args.rounds, args.min_round_time)
+        memory = memory_per_call(fn)
+        results.append(dict(parser=parser_name, case=case, citations=citations, **timing, **memory))
+        print(f"{parser_name:<22} {case:<13} {citations:>9} {timing['min_us']:>10} {timing['median_us']:>10} "
+              f"{timing['mean_us']:>10} {timing['stddev_us']:>10} {memory['peak_kb']:>9} {memory['retained_kb']:>11}")
+
+    structured_log.configure_logging()
+    sink.close()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark with a regression budget
+
+Each run starts a fresh interpreter, imports app (what a gunicorn worker
+does on boot) and serves one /ping through the test client. The median
+import and first-request times over all runs are compared against the
+budget, and the script exits non-zero when the budget is exceeded, so it
+can gate CI or a deploy.
+
+Time until the background Pinecone warm-up finishes is reported too, but
+it depends on the network and is not part of the budget.
+
+Usage:
+    python bench_startup.py --runs 5 --budget-ms 1500
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get("/ping")
+served = time.perf_counter()
+ready = app.pinecone_clients.wait(timeout=float(sys.argv[1]))
+warmed = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "first_request_ms": (served - start) * 1000,
+    "ping_status": response.status_code,
+    "pinecone_ready_ms": (warmed - start) * 1000 if ready else None,
+    "pinecone_state": app.pinecone_clients.state
+}))
+"""
+
+
+def run_once(ready_timeout):
+    env = dict(os.environ, LOG_LEVEL=os.getenv("LOG_LEVEL", "WARNING"))
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, str(ready_timeout)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    # Log lines share stdout with the result
+    for line in reversed(result.stdout.splitlines()):
+        if line.startswith('{"import_ms"'):
+            return json.loads(line)
+    raise RuntimeError(f"No result from child process:\n{result.stdout}{result.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500,
+                        help="Maximum median time from interpreter start to the first served request")
+    parser.add_argument("--ready-timeout", type=float, default=30,
+                        help="Seconds to wait for the Pinecone warm-up in each run")
+    args = parser.parse_args()
+
+    runs = [run_once(args.ready_timeout) for _ in range(args.runs)]
+    import_ms = statistics.median(run["import_ms"] for run in runs)
+    first_request_ms = statistics.median(run["first_request_ms"] for run in runs)
+    ready = [run["pinecone_ready_ms"] for run in runs if run["pinecone_ready_ms"] is not None]
+
+    print(f"runs:                {args.runs}")
+    print(f"import app:          {import_ms:8.1f} ms (median)")
+    print(f"first request:       {first_request_ms:8.1f} ms (median)")
+    if ready:
+        print(f"pinecone warm-up:    {statistics.median(ready):8.1f} ms (median, state {runs[-1]['pinecone_state']})")
+    else:
+        print(f"pinecone warm-up:    not finished within {args.ready_timeout}s")
+    print(f"budget:              {args.budget_ms:8.1f} ms")
+
+    if any(run["ping_status"] != 200 for run in runs):
+        print("FAIL: /ping did not return 200")
+        sys.exit(1)
+    if first_request_ms > args.budget_ms:
+        print(f"FAIL: boot exceeds the budget by {first_request_ms - args.budget_ms:.1f} ms")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
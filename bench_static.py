@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark the home page: inline HTML string versus precompressed static assets
+
+"before" rebuilds the old home() response - the page shell with the CSS and
+JS inlined, returned as an uncompressed string with no validators. "after"
+is the current app: a small shell that links fingerprinted CSS/JS, each
+served precompressed with a strong ETag.
+
+Bytes on the wire (status line, headers and body) are reported for a first
+visit and a repeat visit. On a repeat visit the browser revalidates the
+shell (304) and takes the immutable assets from its cache. Requests per
+second are measured in-process with the Flask test client, so they show
+the server-side cost only.
+
+Usage:
+    python bench_static.py --requests 5000
+"""
+
+import argparse
+import os
+import re
+import time
+
+os.environ.setdefault("PROBE_ENABLED", "false")
+
+from flask import Flask
+
+import app as vb_app
+
+BROWSER_ENCODING = "gzip, deflate, br"
+
+
+def inline_page():
+    """The page as home() used to return it: one string with everything inlined"""
+    static_dir = vb_app.static_assets.static_dir
+    with open(os.path.join(static_dir, "index.html"), encoding="utf-8") as f:
+        shell = f.read()
+
+    def inline(match):
+        with open(os.path.join(static_dir, match.group(1)), encoding="utf-8") as f:
+            content = f.read()
+        if match.group(1).endswith(".css"):
+            return f"<style>\n{content}</style>"
+        return f"<script>\n{content}</script>"
+
+    shell = re.sub(r'<link rel="stylesheet" href="\{\{ url:([\w.-]+) \}\}">', inline, shell)
+    return re.sub(r'<script src="\{\{ url:([\w.-]+) \}\}"></script>', inline, shell)
+
+
+def build_before_app():
+    page = inline_page()
+    before = Flask("before")
+    # Same per-request hooks as the real app, so only the page serving differs
+    before.before_request(vb_app.start_request_timer)
+    before.after_request(vb_app.record_request_metrics)
+
+    @before.route("/")
+    def home():
+        return page
+
+    return before
+
+
+def wire_bytes(response):
+    """Approximate HTTP/1.1 response size: status line, headers and body"""
+    head = f"HTTP/1.1 {response.status}\r\n"
+    head += "".join(f"{name}: {value}\r\n" for name, value in response.headers.items())
+    return len(head.encode("latin-1")) + 2 + len(response.get_data())
+
+
+def first_visit(client, encoding):
+    """Fetch / and every asset it links, as a browser with an empty cache would"""
+    response = client.get("/", headers={"Accept-Encoding": encoding})
+    total = wire_bytes(response)
+    html = vb_app.static_assets.index.bodies["identity"].decode("utf-8")
+    for url in re.findall(r'(?:href|src)="(/assets/[^"]+)"', html):
+        total += wire_bytes(client.get(url, headers={"Accept-Encoding": encoding}))
+    return total, response.headers.get("ETag")
+
+
+def requests_per_second(client, requests, headers):
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get("/", headers=headers)
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    before = build_before_app().test_client()
+    after = vb_app.app.test_client()
+
+    before_bytes = wire_bytes(before.get("/", headers={"Accept-Encoding": BROWSER_ENCODING}))
+    after_first, etag = first_visit(after, BROWSER_ENCODING)
+    after_first_gzip, _ = first_visit(after, "gzip")
+    revalidate = {"Accept-Encoding": BROWSER_ENCODING, "If-None-Match": etag}
+    after_repeat = wire_bytes(after.get("/", headers=revalidate))
+
+    print("Bytes on the wire")
+    print(f"  before, any visit:            {before_bytes:>7}")
+    print(f"  after, first visit (br):      {after_first:>7}  (/ + CSS + JS)")
+    print(f"  after, first visit (gzip):    {after_first_gzip:>7}  (/ + CSS + JS)")
+    print(f"  after, repeat visit:          {after_repeat:>7}  (304 for /, assets cached)")
+
+    print(f"Requests per second for / ({args.requests} requests, in-process)")
+    print(f"  before:                       {requests_per_second(before, args.requests, {'Accept-Encoding': BROWSER_ENCODING}):>7.0f}")
+    print(f"  after, 200 (br):              {requests_per_second(after, args.requests, {'Accept-Encoding': BROWSER_ENCODING}):>7.0f}")
+    print(f"  after, 304:                   {requests_per_second(after, args.requests, revalidate):>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+Record/replay cassettes for upstream MCP and Pinecone SDK traffic
+
+In record mode the MCP client and the SDK assistant are wrapped so every
+call is passed through and written to the cassette: the request (prompt
+and options), the response (MCP result dict, stream chunks with their
+offsets, or the SDK chat response as plain data) and how long it took.
+The cassette is gzip-compressed JSON lines, appended one gzip member per
+interaction under an exclusive flock so several worker processes can
+record into the same file.
+
+In replay mode nothing goes upstream: calls are answered from the
+cassette, matched on kind, prompt and options; repeated requests cycle
+through the recorded answers for that request. Speed "recorded" sleeps
+for the original duration (or until the call's timeout, which then
+returns the usual timeout error); "fast" answers at once. A request not
+in the cassette fails with code "cassette_miss" (MCP) or CassetteMiss
+(SDK).
+"""
+
+import fcntl
+import gzip
+import hashlib
+import logging
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import requests
+
+import fast_json
+from mcp_client import error_for_exception
+from structured_log import log_event
+
+MODES = ("record", "replay")
+SPEEDS = ("recorded", "fast")
+
+CASSETTE_MISS_RESPONSE = {
+    "success": False,
+    "error": "Not in cassette",
+    "code": "cassette_miss",
+    "message": "No recorded upstream response for this request"
+}
+
+
+class CassetteMiss(Exception):
+    """Raised by a replaying SDK assistant for a request it has no recording of"""
+
+
+def to_plain(obj):
+    """Convert an SDK response object into JSON-serializable data"""
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    if isinstance(obj, dict):
+        return {str(key): to_plain(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_plain(value) for value in obj]
+    to_dict = getattr(obj, "to_dict", None)
+    if callable(to_dict):
+        return to_plain(to_dict())
+    if hasattr(obj, "__dict__"):
+        return {key: to_plain(value) for key, value in vars(obj).items() if not key.startswith("_")}
+    return str(obj)
+
+
+def to_namespace(data):
+    """Turn to_plain() output back into attribute-accessible objects"""
+    if isinstance(data, dict):
+        return SimpleNamespace(**{key: to_namespace(value) for key, value in data.items()})
+    if isinstance(data, list):
+        return [to_namespace(value) for value in data]
+    return data
+
+
+class Cassette:
+    """
+    On-disk store of upstream interactions
+
+    Args:
+        path (str): Cassette file (gzip-compressed JSON lines)
+        mode (str): "record" or "replay"
+        speed (str): Replay timing, "recorded" or "fast"
+    """
+
+    def __init__(self, path, mode="replay", speed="recorded"):
+        if mode not in MODES:
+            raise ValueError(f"Cassette mode must be one of {', '.join(MODES)}")
+        if speed not in SPEEDS:
+            raise ValueError(f"Cassette speed must be one of {', '.join(SPEEDS)}")
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+
+        self._lock = threading.Lock()
+        self._fd = None
+        self._pid = None
+        self._interactions = {}
+        self._cursors = {}
+        self._stats = {"recorded": 0, "replayed": 0, "misses": 0}
+        if mode == "replay":
+            self._load()
+
+    @property
+    def replaying(self):
+        return self.mode == "replay"
+
+    @staticmethod
+    def key(kind, prompt, options=None):
+        request = fast_json.dumps_bytes({"prompt": prompt, "options": options or {}}, sort_keys=True)
+        return f"{kind}:{hashlib.sha256(request).hexdigest()[:32]}"
+
+    def wrap_mcp_client(self, client):
+        return CassetteMCPClient(client, self)
+
+    def wrap_assistant(self, assistant):
+        return CassetteAssistant(assistant, self)
+
+    def record(self, kind, prompt, options, elapsed, **response):
+        """
+        Append one interaction
+
+        Args:
+            kind (str): "mcp_chat", "mcp_stream" or "sdk_chat"
+            elapsed (float): Seconds the upstream call took
+            response: response= (result dict or plain SDK data) or
+                      chunks= ([offset_ms, chunk] pairs)
+        """
+        entry = dict(
+            kind=kind,
+            key=self.key(kind, prompt, options),
+            prompt=prompt,
+            options=options or {},
+            elapsed_ms=round(elapsed * 1000, 1),
+            recorded_at=time.time(),
+            **response
+        )
+        member = gzip.compress(fast_json.dumps_bytes(entry) + b"\n", mtime=0)
+        with self._lock:
+            fd = self._file()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                os.write(fd, member)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self._stats["recorded"] += 1
+
+    def lookup(self, kind, prompt, options=None):
+        """
+        Next recorded interaction for a request, cycling through repeats
+
+        Returns:
+            dict or None: A freshly decoded entry, or None if not recorded
+        """
+        key = self.key(kind, prompt, options)
+        with self._lock:
+            lines = self._interactions.get(key)
+            if not lines:
+                self._stats["misses"] += 1
+                log_event("cassette.miss", logging.WARNING, kind=kind, key=key)
+                return None
+            index = self._cursors.get(key, 0)
+            self._cursors[key] = (index + 1) % len(lines)
+            self._stats["replayed"] += 1
+        return fast_json.loads(lines[index])
+
+    def wait(self, seconds, timeout=None):
+        """
+        Sleep for a recorded duration when replaying at recorded speed
+
+        Returns:
+            bool: False if the timeout ran out first
+        """
+        if self.speed == "fast":
+            return True
+        if timeout is not None and seconds > timeout:
+            time.sleep(timeout)
+            return False
+        time.sleep(seconds)
+        return True
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["interactions"] = sum(len(lines) for lines in self._interactions.values())
+        stats["mode"] = self.mode
+        stats["speed"] = self.speed
+        stats["path"] = self.path
+        return stats
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            log_event("cassette.missing", logging.WARNING, path=self.path)
+            return
+        count = 0
+        try:
+            with gzip.open(self.path, "rb") as f:
+                for line in f:
+                    if line.strip():
+                        key = fast_json.loads(line)["key"]
+                        self._interactions.setdefault(key, []).append(line)
+                        count += 1
+        except (EOFError, OSError) as e:
+            # A recorder killed mid-write leaves a truncated last member
+            log_event("cassette.truncated", logging.WARNING, path=self.path, error=str(e))
+        log_event("cassette.loaded", path=self.path, interactions=count, requests=len(self._interactions))
+
+    def _file(self):
+        # Reopen after a fork so each process appends through its own descriptor
+        if self._fd is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            self._pid = os.getpid()
+        return self._fd
+
+
+class CassetteMCPClient:
+    """
+    MCPClient stand-in that records to or replays from a cassette
+
+    Everything other than chat() and stream_chat() (timeout, pool_stats,
+    close, ...) is delegated to the wrapped client.
+    """
+
+    def __init__(self, client, cassette):
+        self._client = client
+        self.cassette = cassette
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def chat(self, prompt, options=None, timeout=None):
+        if not self.cassette.replaying:
+            start = time.perf_counter()
+            result = self._client.chat(prompt, options, timeout=timeout)
+            self.cassette.record("mcp_chat", prompt, options, time.perf_counter() - start, response=result)
+            return result
+
+        entry = self.cassette.lookup("mcp_chat", prompt, options)
+        if entry is None:
+            return dict(CASSETTE_MISS_RESPONSE)
+        if not self.cassette.wait(entry["elapsed_ms"] / 1000, self._timeout(timeout)):
+            return error_for_exception(requests.exceptions.Timeout())
+        return entry["response"]
+
+    def stream_chat(self, prompt, options=None, timeout=None):
+        if not self.cassette.replaying:
+            yield from self._record_stream(prompt, options, timeout)
+            return
+
+        entry = self.cassette.lookup("mcp_stream", prompt, options)
+        if entry is None:
+            yield dict(CASSETTE_MISS_RESPONSE)
+            return
+        previous = 0.0
+        for offset_ms, chunk in entry["chunks"]:
+            # The client timeout applies per read, i.e. to each gap between chunks
+            if not self.cassette.wait((offset_ms - previous) / 1000, self._timeout(timeout)):
+                yield error_for_exception(requests.exceptions.Timeout())
+                return
+            previous = offset_ms
+            yield chunk
+
+    def _timeout(self, timeout):
+        return self._client.timeout if timeout is None else timeout
+
+    def _record_stream(self, prompt, options, timeout):
+        start = time.perf_counter()
+        chunks = []
+        try:
+            for chunk in self._client.stream_chat(prompt, options, timeout=timeout):
+                chunks.append([round((time.perf_counter() - start) * 1000, 1), chunk])
+                yield chunk
+        finally:
+            self.cassette.record("mcp_stream", prompt, options, time.perf_counter() - start, chunks=chunks)
+
+
+class CassetteAssistant:
+    """
+    Pinecone SDK assistant stand-in that records to or replays from a cassette
+
+    Args:
+        assistant: The real SDK assistant (None when replaying)
+        cassette (Cassette): Where interactions are recorded or replayed from
+    """
+
+    def __init__(self, assistant, cassette):
+        self._assistant = assistant
+        self.cassette = cassette
+
+    def __getattr__(self, name):
+        return getattr(self._assistant, name)
+
+    def chat(self, messages, **kwargs):
+        last = messages[-1]
+        prompt = last["content"] if isinstance(last, dict) else last.content
+
+        if not self.cassette.replaying:
+            start = time.perf_counter()
+            resp = self._assistant.chat(messages=messages, **kwargs)
+            self.cassette.record("sdk_chat", prompt, kwargs, time.perf_counter() - start, response=to_plain(resp))
+            return resp
+
+        entry = self.cassette.lookup("sdk_chat", prompt, kwargs)
+        if entry is None:
+            raise CassetteMiss(f"No recorded SDK answer for key {self.cassette.key('sdk_chat', prompt, kwargs)}")
+        self.cassette.wait(entry["elapsed_ms"] / 1000)
+        return to_namespace(entry["response"])
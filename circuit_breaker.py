@@ -0,0 +1,137 @@
+"""
+Circuit breaker for the MCP endpoint
+
+After enough consecutive upstream failures (timeouts, connection errors,
+5xx) the breaker opens and calls fail immediately instead of waiting for
+the full request timeout. After the recovery timeout a limited number of
+trial calls are let through (half-open); a success closes the breaker
+again, a failure re-opens it.
+"""
+
+import logging
+import threading
+import time
+
+from structured_log import log_event
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def is_upstream_failure(code):
+    """True for the call_mcp_server error codes that indicate an unhealthy upstream"""
+    if code in ("timeout", "connection"):
+        return True
+    return isinstance(code, int) and code >= 500
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open breaker driven by call_mcp_server results
+
+    Args:
+        failure_threshold (int): Consecutive failures that open the breaker
+        recovery_timeout (float): Seconds to stay open before trial calls
+        half_open_max_calls (int): Trial calls allowed at once while half-open
+    """
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30, half_open_max_calls=1):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._half_open_in_flight = 0
+        self._rejected = 0
+        self._transitions = {}
+
+    @property
+    def state(self):
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def allow_request(self):
+        """Return True if a call may go upstream, False to fail fast"""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._half_open_in_flight < self.half_open_max_calls:
+                self._half_open_in_flight += 1
+                return True
+            self._rejected += 1
+            return False
+
+    def record(self, result):
+        """
+        Update the breaker from a call_mcp_server result dict
+
+        Only upstream failures count against the breaker; 401/429 and other
+        client-side errors show the server is reachable.
+        """
+        if result.get("success") or not is_upstream_failure(result.get("code")):
+            self.record_success()
+        else:
+            self.record_failure()
+
+    def record_success(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+                self._transition(CLOSED)
+            self._consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+                self._transition(OPEN)
+            elif self._state == CLOSED and self._consecutive_failures >= self.failure_threshold:
+                self._transition(OPEN)
+
+    def release(self):
+        """
+        Forget a call that says nothing about upstream health, such as one
+        cut short by the caller's own deadline, freeing its half-open slot
+        """
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+
+    def stats(self):
+        with self._lock:
+            self._maybe_half_open()
+            retry_in = None
+            if self._state == OPEN:
+                retry_in = round(max(0.0, self._opened_at + self.recovery_timeout - time.monotonic()), 3)
+            return {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "recovery_timeout": self.recovery_timeout,
+                "retry_in_s": retry_in,
+                "rejected": self._rejected,
+                "transitions": dict(self._transitions)
+            }
+
+    def _maybe_half_open(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._transition(HALF_OPEN)
+
+    def _transition(self, new_state):
+        if new_state == self._state:
+            return
+        key = f"{self._state}->{new_state}"
+        self._transitions[key] = self._transitions.get(key, 0) + 1
+        log_event("circuit_breaker.transition", logging.WARNING, transition=key)
+        self._state = new_state
+        if new_state == OPEN:
+            self._opened_at = time.monotonic()
+        elif new_state == HALF_OPEN:
+            self._half_open_in_flight = 0
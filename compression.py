@@ -0,0 +1,251 @@
+"""
+Response compression for the JSON API
+
+Registered as an after_request hook, it compresses responses with the best
+encoding the client accepts (zstd, brotli or gzip; zstd and brotli only
+when their packages are installed). Only compressible content types are
+touched, and buffered bodies below a size threshold are left alone, since
+the framing overhead outweighs the savings. Streamed responses (SSE,
+NDJSON) are compressed chunk by chunk and flushed after every chunk, so
+events still reach the client as soon as they are produced.
+
+Responses that already carry a Content-Encoding (the precompressed static
+assets) or opt out with Cache-Control: no-transform pass through unchanged.
+"""
+
+import threading
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = frozenset({
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/event-stream",
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/javascript"
+})
+
+
+class GzipEncoder:
+    name = "gzip"
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def compress(self, data):
+        return zlib.compress(data, self.level, wbits=31)
+
+    def stream(self):
+        return _ZlibStream(zlib.compressobj(self.level, zlib.DEFLATED, 31))
+
+
+class _ZlibStream:
+    def __init__(self, compressobj):
+        self._z = compressobj
+
+    def compress(self, chunk):
+        return self._z.compress(chunk) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._z.flush()
+
+
+class BrotliEncoder:
+    name = "br"
+
+    def __init__(self, quality=4):
+        self.quality = quality
+
+    def compress(self, data):
+        return brotli.compress(data, quality=self.quality)
+
+    def stream(self):
+        return _BrotliStream(brotli.Compressor(quality=self.quality))
+
+
+class _BrotliStream:
+    def __init__(self, compressor):
+        self._c = compressor
+
+    def compress(self, chunk):
+        return self._c.process(chunk) + self._c.flush()
+
+    def finish(self):
+        return self._c.finish()
+
+
+class ZstdEncoder:
+    name = "zstd"
+
+    def __init__(self, level=3):
+        self.level = level
+        self._local = threading.local()
+
+    def _compressor(self):
+        # ZstdCompressor instances are not safe to share between threads
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = self._local.compressor = zstandard.ZstdCompressor(level=self.level)
+        return compressor
+
+    def compress(self, data):
+        return self._compressor().compress(data)
+
+    def stream(self):
+        return _ZstdStream(zstandard.ZstdCompressor(level=self.level).compressobj())
+
+
+class _ZstdStream:
+    def __init__(self, compressobj):
+        self._z = compressobj
+
+    def compress(self, chunk):
+        return self._z.compress(chunk) + self._z.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._z.flush()
+
+
+def available_encoders(gzip_level=6, brotli_quality=4, zstd_level=3):
+    """
+    Encoders usable in this process, keyed by Content-Encoding token
+
+    Returns:
+        dict: name -> encoder
+    """
+    encoders = {"gzip": GzipEncoder(gzip_level)}
+    if brotli is not None:
+        encoders["br"] = BrotliEncoder(brotli_quality)
+    if zstandard is not None:
+        encoders["zstd"] = ZstdEncoder(zstd_level)
+    return encoders
+
+
+class ResponseCompressor:
+    """
+    after_request hook that negotiates and applies Content-Encoding
+
+    Args:
+        min_size (int): Buffered bodies smaller than this are sent as-is
+        preference (list): Encodings in order of preference when the client
+                           accepts several with the same quality
+        gzip_level (int): zlib level, 1-9
+        brotli_quality (int): brotli quality, 0-11
+        zstd_level (int): zstd level, 1-22
+    """
+
+    def __init__(self, min_size=1024, preference=("zstd", "br", "gzip"),
+                 gzip_level=6, brotli_quality=4, zstd_level=3):
+        self.min_size = min_size
+        self.encoders = available_encoders(gzip_level, brotli_quality, zstd_level)
+        self.preference = [name for name in preference if name in self.encoders]
+
+        self._lock = threading.Lock()
+        self._stats = {
+            "compressed": 0,
+            "streamed": 0,
+            "skipped_small": 0,
+            "bytes_in": 0,
+            "bytes_out": 0,
+            "by_encoding": {}
+        }
+
+    def init_app(self, app):
+        app.after_request(self.after_request)
+
+    def negotiate(self, accept_encodings):
+        """
+        Pick an encoding from a werkzeug Accept-Encoding object
+
+        Returns:
+            str or None: Encoding name, or None to send identity
+        """
+        best = None
+        best_quality = 0
+        for name in self.preference:
+            quality = accept_encodings[name]
+            if quality > best_quality:
+                best, best_quality = name, quality
+        return best
+
+    def after_request(self, response):
+        if not self._should_compress(response):
+            return response
+        encoding = self.negotiate(request.accept_encodings)
+        response.vary.add("Accept-Encoding")
+        if encoding is None:
+            return response
+
+        encoder = self.encoders[encoding]
+        if response.is_streamed:
+            response.response = self._stream(response.iter_encoded(), response.response, encoder.stream())
+            response.headers.pop("Content-Length", None)
+            self._count(encoding, streamed=True)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                with self._lock:
+                    self._stats["skipped_small"] += 1
+                return response
+            compressed = encoder.compress(data)
+            response.set_data(compressed)
+            self._count(encoding, bytes_in=len(data), bytes_out=len(compressed))
+
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # A strong validator must differ between encodings of the same body
+            response.set_etag(f"{etag}-{encoding}")
+        return response
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, by_encoding=dict(self._stats["by_encoding"]))
+        stats["ratio"] = round(stats["bytes_out"] / stats["bytes_in"], 4) if stats["bytes_in"] else None
+        stats["encodings"] = self.preference
+        stats["min_size"] = self.min_size
+        return stats
+
+    def _should_compress(self, response):
+        if response.status_code < 200 or response.status_code in (204, 304):
+            return False
+        if response.direct_passthrough or "Content-Encoding" in response.headers:
+            return False
+        if "no-transform" in response.headers.get("Cache-Control", ""):
+            return False
+        return response.mimetype in COMPRESSIBLE_TYPES
+
+    def _stream(self, chunks, original, stream):
+        """Compress a streamed body, flushing after every chunk"""
+        try:
+            for chunk in chunks:
+                if chunk:
+                    yield stream.compress(chunk)
+            yield stream.finish()
+        finally:
+            close = getattr(original, "close", None)
+            if close is not None:
+                close()
+
+    def _count(self, encoding, streamed=False, bytes_in=0, bytes_out=0):
+        with self._lock:
+            self._stats["streamed" if streamed else "compressed"] += 1
+            self._stats["bytes_in"] += bytes_in
+            self._stats["bytes_out"] += bytes_out
+            self._stats["by_encoding"][encoding] = self._stats["by_encoding"].get(encoding, 0) + 1
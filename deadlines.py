@@ -0,0 +1,114 @@
+"""
+Per-request deadlines
+
+A Deadline is created when a request arrives, from the X-Request-Deadline-Ms
+header, an options.deadline_ms field, or the server default, and is passed
+down the answer path. Each stage (MCP call, SDK fallback, parsing) asks it
+for a time budget, so the request as a whole finishes, successfully or with
+a deadline error, before the client or load balancer gives up on it.
+"""
+
+import time
+
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+
+
+def parse_deadline_ms(value):
+    """
+    Parse a client-supplied deadline in milliseconds
+
+    Returns:
+        float or None: Positive milliseconds, or None if missing or invalid
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        deadline_ms = float(value)
+    except (TypeError, ValueError):
+        return None
+    return deadline_ms if deadline_ms > 0 else None
+
+
+class Deadline:
+    """
+    Point in time by which a request must be answered
+
+    Args:
+        timeout (float): Seconds from now
+        shortened (bool): The client asked for less time than the server
+                          default, so running out says nothing about the
+                          upstream
+    """
+
+    def __init__(self, timeout, shortened=False):
+        self.timeout = timeout
+        self.shortened = shortened
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + timeout
+
+    @classmethod
+    def for_request(cls, header_value=None, options=None, default_ms=25000, max_ms=60000):
+        """
+        Build the deadline for an incoming request
+
+        The header takes precedence over options["deadline_ms"]; either is
+        capped at max_ms, and default_ms applies when neither is given.
+        """
+        deadline_ms = parse_deadline_ms(header_value)
+        if deadline_ms is None and options:
+            deadline_ms = parse_deadline_ms(options.get("deadline_ms"))
+        if deadline_ms is None:
+            deadline_ms = default_ms
+        deadline_ms = min(deadline_ms, max_ms)
+        return cls(deadline_ms / 1000, shortened=deadline_ms < default_ms)
+
+    def remaining(self):
+        """Seconds left, never negative"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def elapsed_ms(self):
+        return round((time.monotonic() - self.started_at) * 1000, 1)
+
+    def budget(self, share=1.0, reserve=0.0, cap=None):
+        """
+        Time a stage may spend, in seconds
+
+        Args:
+            share (float): Fraction of the remaining time (after the reserve)
+                           this stage may use, leaving the rest for later stages
+            reserve (float): Seconds kept back for work after this stage
+            cap (float): Upper bound, e.g. the stage's own timeout
+
+        Returns:
+            float: Seconds, 0 if nothing is left for this stage
+        """
+        seconds = max(0.0, (self.remaining() - reserve) * share)
+        if cap is not None:
+            seconds = min(seconds, cap)
+        return seconds
+
+
+def deadline_exceeded(deadline, stage):
+    """
+    Error payload for a request that ran out of time
+
+    Returns:
+        tuple: (payload dict, 504)
+    """
+    return {
+        "success": False,
+        "error": "Deadline exceeded",
+        "code": "deadline_exceeded",
+        "message": f"Request deadline of {round(deadline.timeout * 1000)} ms exceeded during {stage}",
+        "elapsed_ms": deadline.elapsed_ms()
+    }, 504
+
+
+def strip_deadline(options):
+    """Copy of chat options without deadline_ms, which is not an upstream option"""
+    if not options or "deadline_ms" not in options:
+        return options
+    return {key: value for key, value in options.items() if key != "deadline_ms"}
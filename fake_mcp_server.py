@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Pinecone MCP assistant chat endpoint
+
+Serves POST /mcp/assistants/vb/chat (JSON, or SSE when the request sets
+"stream": true) with answers shaped like the real endpoint's, so the app
+can be run and load-tested without touching Pinecone. Latency follows a
+configurable distribution, and a configurable share of calls fail with
+429 (with Retry-After) or 5xx. Answer length and citation count set the
+response size.
+
+GET /mcp/assistants/vb/_stats returns the calls served so far by outcome.
+
+Usage:
+    python fake_mcp_server.py --port 8600 --latency-ms 800 --latency-dist lognormal
+    MCP_SERVER_URL=http://127.0.0.1:8600/mcp/assistants/vb gunicorn app:app
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "/mcp/assistants/vb"
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+VOCABULARY = (
+    "veteran veterans disability compensation rating service-connected claim evidence medical "
+    "examination VA benefits eligibility discharge pension survivors dependents education GI Bill "
+    "housing loan health care enrollment appeal review decision effective date percent monthly "
+    "payment condition injury presumptive exposure hearing records treatment form application "
+    "the a of to and in for with may be is are your you if an or on by at from that this must"
+).split()
+
+
+class FakeMCPConfig:
+    """
+    Behaviour of the fake endpoint
+
+    Args:
+        latency_ms (float): Median latency (mean for exponential)
+        latency_dist (str): fixed, uniform, exponential or lognormal
+        latency_spread (float): uniform: +/- fraction of latency_ms;
+                                lognormal: sigma of the underlying normal
+        error_rate (float): Share of calls answered with 500/502/503
+        rate_429 (float): Share of calls answered with 429
+        retry_after (float): Retry-After seconds sent with a 429, 0 for none
+        content_words (int): Words in each answer
+        citations (int): Citations per answer
+        citation_words (int): Words in each citation's text
+        seed (int): Random seed, for repeatable runs
+    """
+
+    def __init__(self, latency_ms=800, latency_dist="lognormal", latency_spread=0.5, error_rate=0.0,
+                 rate_429=0.0, retry_after=1.0, content_words=250, citations=5, citation_words=80, seed=None):
+        if latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency_dist must be one of {', '.join(LATENCY_DISTRIBUTIONS)}")
+        self.latency_ms = latency_ms
+        self.latency_dist = latency_dist
+        self.latency_spread = latency_spread
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.content_words = content_words
+        self.citations = citations
+        self.citation_words = citation_words
+        self.seed = seed
+
+
+class FakeMCP:
+    """Draws latencies, outcomes and answers for the handler"""
+
+    def __init__(self, config):
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "ok": 0, "streamed": 0, "429": 0, "5xx": 0}
+
+    def latency(self):
+        """Seconds to wait before answering"""
+        c = self.config
+        with self._lock:
+            if c.latency_dist == "fixed":
+                ms = c.latency_ms
+            elif c.latency_dist == "uniform":
+                ms = self._rng.uniform(c.latency_ms * (1 - c.latency_spread), c.latency_ms * (1 + c.latency_spread))
+            elif c.latency_dist == "exponential":
+                ms = self._rng.expovariate(1 / c.latency_ms)
+            else:
+                ms = self._rng.lognormvariate(math.log(c.latency_ms), c.latency_spread)
+        return max(0.0, ms) / 1000
+
+    def outcome(self):
+        """200, 429 or a 5xx status for the next call"""
+        with self._lock:
+            self._stats["calls"] += 1
+            draw = self._rng.random()
+            if draw < self.config.rate_429:
+                self._stats["429"] += 1
+                return 429
+            if draw < self.config.rate_429 + self.config.error_rate:
+                self._stats["5xx"] += 1
+                return self._rng.choice((500, 502, 503))
+            self._stats["ok"] += 1
+            return 200
+
+    def prose(self, words):
+        with self._lock:
+            return " ".join(self._rng.choice(VOCABULARY) for _ in range(words)).capitalize() + "."
+
+    def citation(self, i):
+        return {
+            "position": i * 100,
+            "file": {"name": f"M21-1 Adjudication Procedures Manual part {i % 6 + 1}.pdf", "id": f"file-{i % 6:04d}"},
+            "page": i % 40 + 1,
+            "url": f"https://storage.example.invalid/vb/file-{i % 6:04d}.pdf",
+            "text": self.prose(self.config.citation_words),
+            "confidence": 0.9
+        }
+
+    def answer(self, prompt):
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "model": "fake-mcp",
+            "created": int(time.time()),
+            "message": {"role": "assistant", "content": f"{prompt}\n\n{self.prose(self.config.content_words)}"},
+            "citations": [self.citation(i) for i in range(self.config.citations)],
+            "usage": {"prompt_tokens": 1200, "completion_tokens": self.config.content_words, "total_tokens": 1200 + self.config.content_words}
+        }
+
+    def count_streamed(self):
+        with self._lock:
+            self._stats["streamed"] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+def make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path == f"{PREFIX}/_stats":
+                self._send_json(200, fake.stats())
+            else:
+                self._send_json(404, {"error": "Not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if self.path != f"{PREFIX}/chat":
+                self._send_json(404, {"error": "Not found"})
+                return
+
+            latency = fake.latency()
+            status = fake.outcome()
+            if status != 200:
+                time.sleep(latency / 4)
+                headers = {"Retry-After": f"{fake.config.retry_after:g}"} if status == 429 and fake.config.retry_after else {}
+                self._send_json(status, {"error": "Too many requests" if status == 429 else "Upstream error"}, headers)
+                return
+
+            messages = body.get("messages") or [{}]
+            answer = fake.answer(messages[-1].get("content", ""))
+            if body.get("stream"):
+                fake.count_streamed()
+                self._stream(answer, latency)
+            else:
+                time.sleep(latency)
+                self._send_json(200, answer)
+
+        def _send_json(self, status, data, headers=None):
+            payload = json.dumps(data).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _stream(self, answer, latency):
+            """Send the answer as SSE chunks: a third of the latency before the first, the rest spread out"""
+            words = answer["message"]["content"].split(" ")
+            pieces = [" ".join(words[i:i + 20]) + " " for i in range(0, len(words), 20)]
+            events = [{"type": "message_start", "id": answer["id"], "model": answer["model"]}]
+            events += [{"type": "content_chunk", "delta": {"content": piece}} for piece in pieces]
+            events += [{"type": "citation", "citation": citation} for citation in answer["citations"]]
+            events.append({"type": "message_end", "usage": answer["usage"], "finish_reason": "stop"})
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            time.sleep(latency / 3)
+            gap = latency * 2 / 3 / max(1, len(pieces))
+            self.close_connection = True
+            try:
+                for event in events:
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    if event["type"] == "content_chunk":
+                        time.sleep(gap)
+                self.wfile.write(b"data: [DONE]\n\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # The client stopped reading mid-stream
+                pass
+
+    return Handler
+
+
+def start(config, host="127.0.0.1", port=0):
+    """
+    Serve the fake endpoint on a background thread
+
+    Returns:
+        ThreadingHTTPServer: Call shutdown() to stop it; server_port has the
+                             port and fake the FakeMCP, whose config can be
+                             changed while it runs
+    """
+    fake = FakeMCP(config)
+    server = ThreadingHTTPServer((host, port), make_handler(fake))
+    server.fake = fake
+    server.daemon_threads = True
+    server.request_queue_size = 1024
+    threading.Thread(target=server.serve_forever, name="fake-mcp", daemon=True).start()
+    return server
+
+
+def add_arguments(parser):
+    """Add the FakeMCPConfig options to an argparse parser"""
+    parser.add_argument("--latency-ms", type=float, default=800, help="Median latency (mean for exponential)")
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--latency-spread", type=float, default=0.5,
+                        help="uniform: +/- fraction of the latency; lognormal: sigma")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls answered with 5xx")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Share of calls answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on 429 (0 for none)")
+    parser.add_argument("--content-words", type=int, default=250, help="Words per answer")
+    parser.add_argument("--citations", type=int, default=5, help="Citations per answer")
+    parser.add_argument("--citation-words", type=int, default=80, help="Words per citation text")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args):
+    return FakeMCPConfig(
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        latency_spread=args.latency_spread,
+        error_rate=args.error_rate,
+        rate_429=args.rate_429,
+        retry_after=args.retry_after,
+        content_words=args.content_words,
+        citations=args.citations,
+        citation_words=args.citation_words,
+        seed=args.seed
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = start(config_from_args(args), args.host, args.port)
+    print(f"Fake MCP server on http://{args.host}:{server.server_port}{PREFIX}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
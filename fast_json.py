@@ -0,0 +1,98 @@
+"""
+Pluggable JSON encoding and decoding
+
+Uses orjson when it is installed and the standard library json module
+otherwise; JSON_BACKEND=json forces the standard library. Both backends
+produce compact output. Objects orjson refuses (integers wider than 64
+bits, unusual dict keys) are retried with the standard library, so
+switching backends never changes which payloads can be serialized.
+Other types go through Flask's own fallback, so dates (as HTTP dates),
+UUIDs, decimals and dataclasses come out as they would from jsonify()
+with the default provider.
+
+FastJSONProvider plugs the same encoder into Flask, so jsonify() and
+request.get_json() use it too.
+"""
+
+import json
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if os.getenv("JSON_BACKEND", "orjson").lower() == "json":
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def _default(o):
+    """Fallback serializer for types neither backend handles natively"""
+    return DefaultJSONProvider.default(o)
+
+
+def dumps_bytes(obj, sort_keys=False, default=_default):
+    """
+    Serialize obj to compact UTF-8 JSON
+
+    Args:
+        obj: Value to serialize
+        sort_keys (bool): Emit object keys in sorted order
+        default: Called for objects that are not natively serializable
+
+    Returns:
+        bytes: Encoded JSON
+    """
+    if orjson is not None:
+        # Dates go to _default too, for Flask's HTTP-date format
+        option = orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except TypeError:
+            pass
+    return json.dumps(
+        obj, default=default, sort_keys=sort_keys, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def dumps(obj, sort_keys=False, default=_default):
+    """Like dumps_bytes(), but returns str"""
+    return dumps_bytes(obj, sort_keys=sort_keys, default=default).decode("utf-8")
+
+
+def loads(data):
+    """
+    Parse JSON from str, bytes or bytearray
+
+    Raises:
+        ValueError: If data is not valid JSON
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by dumps_bytes()/loads()"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj, sort_keys=kwargs.pop("sort_keys", self.sort_keys))
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        # Pretty-printed debug output keeps the standard library path
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            dumps_bytes(obj, sort_keys=self.sort_keys) + b"\n",
+            mimetype=self.mimetype
+        )
@@ -0,0 +1,37 @@
+"""
+Gunicorn configuration (loaded automatically from the working directory)
+
+Sets up a shared directory for Prometheus multiprocess metrics so /metrics
+aggregates samples from every worker process, and runs threaded workers so
+admission control can shed load.
+"""
+
+import os
+import shutil
+import sys
+
+# A sync worker serves one request at a time, so app.admission could never
+# see more than one in flight and would never shed; gthread workers run
+# GUNICORN_THREADS requests each, and post_worker_init fits the admission
+# limit below that
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+
+
+def on_starting(server):
+    metrics_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/vb-prometheus-multiproc")
+    # Samples from a previous run would otherwise be aggregated into this one
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from metrics import mark_process_dead
+    mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    # The app is loaded by now; threads may also come from --threads
+    app_module = sys.modules.get("app")
+    if app_module is not None and hasattr(app_module, "size_admission"):
+        app_module.size_admission(worker.cfg.threads)
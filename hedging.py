@@ -0,0 +1,191 @@
+"""
+Hedged dispatch between a primary and a backup answer path
+
+The primary call (MCP server) starts immediately. If it has not answered
+within the hedge delay, the backup call (Pinecone SDK) is started in
+parallel and whichever returns a valid answer first wins; the other result
+is discarded. The delay defaults to the observed p95 latency of the
+primary, so only the slow tail pays for a second upstream call.
+
+Latencies are observed per process and start empty on every boot. Until
+min_samples primary calls have succeeded there is no p95 to go by, so no
+call is hedged (unless a fixed or cold-start delay is configured): a
+guessed delay below the real latency would double upstream load after
+every deploy or worker restart.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies in seconds"""
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def count(self):
+        return len(self._samples)
+
+    def percentile(self, pct):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[int(pct / 100 * (len(samples) - 1))]
+
+
+class HedgedDispatcher:
+    """
+    Run a primary answer function, hedging with a backup after a delay
+
+    Both functions return (payload, status); a status of 200 counts as a
+    valid answer.
+
+    Args:
+        max_workers (int): Threads available for in-flight calls
+        delay (float): Fixed hedge delay in seconds, or None to use the p95
+        default_delay (float): Delay used until enough samples are observed,
+                               or None (the default) to not hedge until then
+        min_delay (float): Lower bound for the adaptive delay
+        max_delay (float): Upper bound for the adaptive delay
+        min_samples (int): Samples needed before the p95 is trusted
+    """
+
+    def __init__(self, max_workers=32, delay=None, default_delay=None,
+                 min_delay=0.5, max_delay=30.0, min_samples=20):
+        self.fixed_delay = delay
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+
+        self.latencies = LatencyTracker()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+        self._stats = {
+            "calls": 0,
+            "hedges_fired": 0,
+            "primary_wins": 0,
+            "backup_wins": 0,
+            "fallbacks": 0,
+            "both_failed": 0,
+            "timeouts": 0
+        }
+
+    def current_delay(self):
+        """
+        Hedge delay in seconds: fixed, or p95 of recent primary latency
+
+        Returns:
+            float or None: None while hedging waits for enough samples
+        """
+        if self.fixed_delay is not None:
+            return self.fixed_delay
+        if self.latencies.count() < self.min_samples:
+            return self.default_delay
+        p95 = self.latencies.percentile(95)
+        return min(self.max_delay, max(self.min_delay, p95))
+
+    def run(self, primary, backup, timeout=None):
+        """
+        Dispatch primary, hedging with backup if it is slow
+
+        Args:
+            primary (callable): Preferred answer function
+            backup (callable): Answer function raced against a slow primary
+            timeout (float): Seconds to wait for a valid answer overall
+
+        Returns:
+            tuple: (payload, status, winner, hedged) where winner is
+                   "primary" or "backup"
+
+        Raises:
+            TimeoutError: If neither call answered within the timeout
+        """
+        self._count("calls")
+        start = time.monotonic()
+        expires_at = start + timeout if timeout is not None else None
+
+        def remaining():
+            return None if expires_at is None else max(0.0, expires_at - time.monotonic())
+
+        def timed_primary():
+            payload, status = primary()
+            if status == 200:
+                self.latencies.record(time.monotonic() - start)
+            return payload, status
+
+        primary_future = self._executor.submit(timed_primary)
+        delay = self.current_delay()
+        if expires_at is not None:
+            delay = remaining() if delay is None else min(delay, remaining())
+        # Without a delay the primary gets all the time there is
+        wait([primary_future], timeout=delay)
+
+        if primary_future.done():
+            payload, status = primary_future.result()
+            if status == 200:
+                self._count("primary_wins")
+                return payload, status, "primary", False
+
+            # Primary failed outright, so fall back without hedging
+            self._count("fallbacks")
+            if expires_at is not None and remaining() <= 0:
+                self._count("timeouts")
+                raise TimeoutError("No time left for the backup call")
+            payload, status = backup()
+            self._count("backup_wins" if status == 200 else "both_failed")
+            return payload, status, "backup", False
+
+        if expires_at is not None and remaining() <= 0:
+            self._count("timeouts")
+            raise TimeoutError("Primary call did not answer in time")
+
+        # Primary is slow: race it against the backup
+        self._count("hedges_fired")
+        backup_future = self._executor.submit(backup)
+        names = {primary_future: "primary", backup_future: "backup"}
+        pending = set(names)
+        last = None
+
+        while pending:
+            done, pending = wait(pending, timeout=remaining(), return_when=FIRST_COMPLETED)
+            if not done:
+                self._count("timeouts")
+                raise TimeoutError("Neither call answered in time")
+            for future in done:
+                payload, status = future.result()
+                last = (payload, status, names[future])
+                if status == 200:
+                    # The loser keeps running in its thread; its result is discarded
+                    for other in pending:
+                        other.cancel()
+                    self._count(f"{names[future]}_wins")
+                    return payload, status, names[future], True
+
+        self._count("both_failed")
+        payload, status, winner = last
+        return payload, status, winner, True
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        wins = stats["primary_wins"] + stats["backup_wins"]
+        stats["primary_win_ratio"] = round(stats["primary_wins"] / wins, 4) if wins else None
+        stats["backup_win_ratio"] = round(stats["backup_wins"] / wins, 4) if wins else None
+        delay = self.current_delay()
+        stats["current_delay_s"] = round(delay, 3) if delay is not None else None
+        stats["latency_samples"] = self.latencies.count()
+        return stats
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
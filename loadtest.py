@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+HTTP load test for the app against the local fake MCP server
+
+Starts fake_mcp_server and the app under gunicorn (or targets an already
+running app with --target), then drives the chosen routes either at fixed
+concurrency (closed loop: each client sends its next request when the
+previous one returns) or at a fixed arrival rate (open loop: Poisson
+arrivals, latency measured from the scheduled send time so a slow server
+cannot hide its queueing). Per route it reports throughput, status codes
+and p50/p95/p99/max latency, and writes everything, with the run's
+configuration, to a JSON file.
+
+With --baseline, the run is compared against an earlier results file and
+the script exits non-zero when a route's p95 or throughput regressed by
+more than --max-regression.
+
+Usage:
+    python loadtest.py --concurrency 20 --duration 30 --output loadtest-results.json
+    python loadtest.py --rate 15 --routes ask=3,mcp_chat=1 --latency-ms 1200 --rate-429 0.05
+    python loadtest.py --concurrency 50 --baseline previous.json --max-regression 0.2
+    python loadtest.py --target http://127.0.0.1:8000 --concurrency 10
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+import fake_mcp_server
+
+ROUTES = {
+    "ask": "/ask",
+    "ask_stream": "/ask/stream",
+    "mcp_chat": "/mcp/chat",
+    "mcp_test": "/mcp/test",
+    "health": "/health",
+    "ping": "/ping"
+}
+
+GET_ROUTES = ("health", "ping")
+
+
+def parse_routes(value):
+    """
+    Parse "ask=3,mcp_chat=1" into route weights
+
+    Returns:
+        dict: route name -> weight
+    """
+    weights = {}
+    for token in value.split(","):
+        name, _, weight = token.strip().partition("=")
+        if name not in ROUTES:
+            raise argparse.ArgumentTypeError(f"Unknown route {name!r}; choose from {', '.join(ROUTES)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def start_app(args, upstream_url, port):
+    """Start the app under gunicorn with an environment isolated from other runs"""
+    scratch = tempfile.mkdtemp(prefix="vb-loadtest-")
+    env = dict(
+        os.environ,
+        MCP_SERVER_URL=upstream_url,
+        PINECONE_API_KEY="",
+        PINECONE_WARMUP="false",
+        PROMETHEUS_MULTIPROC_DIR=os.path.join(scratch, "metrics"),
+        MCP_RATE_LIMIT_PATH=os.path.join(scratch, "ratelimit.bin"),
+        PROBE_LOCK_PATH=os.path.join(scratch, "prober.lock"),
+        PROBE_STATE_PATH=os.path.join(scratch, "prober-state.json")
+    )
+    for item in args.app_env:
+        name, _, value = item.partition("=")
+        env[name] = value
+
+    command = [
+        sys.executable, "-m", "gunicorn", "app:app",
+        "-w", str(args.workers),
+        "--threads", str(args.threads),
+        "-b", f"127.0.0.1:{port}",
+        "--timeout", "300"
+    ]
+    proc = subprocess.Popen(command, env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/ping", timeout=1).status_code == 200:
+                return proc
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"App did not start: {' '.join(command)}")
+
+
+class LoadGenerator:
+    """
+    Sends requests to the app and collects (route, status, latency) samples
+
+    Args:
+        base_url (str): App base URL
+        weights (dict): route name -> relative weight
+        repeat_ratio (float): Share of requests reusing a prompt from a small
+                              pool, i.e. expected cache hits
+        timeout (float): Client timeout per request
+        seed (int): Random seed for route and prompt choice
+    """
+
+    def __init__(self, base_url, weights, repeat_ratio=0.0, timeout=60, seed=None):
+        self.base_url = base_url.rstrip("/")
+        self.routes = list(weights)
+        self.weights = [weights[name] for name in self.routes]
+        self.repeat_ratio = repeat_ratio
+        self.timeout = timeout
+
+        self._rng = random.Random(seed)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counter = 0
+        self.samples = []
+
+    def next_request(self):
+        """Pick the route and prompt of the next request"""
+        with self._lock:
+            self._counter += 1
+            route = self._rng.choices(self.routes, self.weights)[0]
+            if self._rng.random() < self.repeat_ratio:
+                prompt = f"What benefits am I eligible for? (common question {self._rng.randint(1, 10)})"
+            else:
+                prompt = f"What benefits am I eligible for? (load test question {self._counter})"
+        return route, prompt
+
+    def send(self, route, prompt, scheduled_at=None):
+        """Send one request and record its sample; latency counts from scheduled_at if given"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+
+        start = scheduled_at if scheduled_at is not None else time.perf_counter()
+        url = self.base_url + ROUTES[route]
+        try:
+            if route in GET_ROUTES:
+                response = session.get(url, timeout=self.timeout)
+            else:
+                response = session.post(url, json={"prompt": prompt}, timeout=self.timeout)
+            body = response.content
+            status = response.status_code
+            if route == "ask_stream" and status == 200 and b"event: error" in body:
+                status = "stream_error"
+        except requests.exceptions.RequestException as e:
+            status = type(e).__name__
+        latency = time.perf_counter() - start
+        with self._lock:
+            self.samples.append((route, status, start, latency))
+
+    def run_closed(self, concurrency, duration, total):
+        """Each of `concurrency` clients sends back to back until time or requests run out"""
+        stop_at = time.perf_counter() + duration
+        remaining = [total]
+
+        def client():
+            while time.perf_counter() < stop_at:
+                with self._lock:
+                    if remaining[0] is not None:
+                        if remaining[0] <= 0:
+                            return
+                        remaining[0] -= 1
+                self.send(*self.next_request())
+
+        threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def run_open(self, rate, duration, total, max_in_flight):
+        """Poisson arrivals at `rate` per second, whether or not earlier requests finished"""
+        stop_at = time.perf_counter() + duration
+        sent = 0
+        next_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            while next_at < stop_at and (total is None or sent < total):
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                route, prompt = self.next_request()
+                pool.submit(self.send, route, prompt, next_at)
+                sent += 1
+                with self._lock:
+                    next_at += self._rng.expovariate(rate)
+
+
+def percentile(latencies, q):
+    return round(latencies[int(q * (len(latencies) - 1))] * 1000, 1) if latencies else None
+
+
+def summarize(samples, elapsed):
+    """Per-route and overall throughput, status counts and latency percentiles"""
+    by_route = {}
+    for route, status, _, latency in samples:
+        by_route.setdefault(route, []).append((status, latency))
+    by_route["total"] = [(status, latency) for _, status, _, latency in samples]
+
+    summary = {}
+    for route, results in by_route.items():
+        ok = sorted(latency for status, latency in results if status == 200)
+        statuses = Counter(str(status) for status, _ in results)
+        summary[route] = {
+            "requests": len(results),
+            "ok": len(ok),
+            "errors": len(results) - len(ok),
+            "status_counts": dict(sorted(statuses.items())),
+            "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else None,
+            "mean_ms": round(sum(ok) / len(ok) * 1000, 1) if ok else None,
+            "p50_ms": percentile(ok, 0.50),
+            "p95_ms": percentile(ok, 0.95),
+            "p99_ms": percentile(ok, 0.99),
+            "max_ms": round(ok[-1] * 1000, 1) if ok else None
+        }
+    return summary
+
+
+def compare(current, baseline, max_regression):
+    """
+    Compare route summaries against a baseline run
+
+    Returns:
+        list: Human-readable regressions, empty if none
+    """
+    regressions = []
+    for route, now in current.items():
+        before = baseline.get(route)
+        if not before:
+            continue
+        for key in ("p95_ms", "p99_ms"):
+            if now[key] and before[key] and now[key] > before[key] * (1 + max_regression):
+                regressions.append(f"{route} {key}: {before[key]} -> {now[key]}")
+        if before["throughput_rps"] and (now["throughput_rps"] or 0) < before["throughput_rps"] * (1 - max_regression):
+            regressions.append(f"{route} throughput_rps: {before['throughput_rps']} -> {now['throughput_rps']}")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    load = parser.add_argument_group("load")
+    mode = load.add_mutually_exclusive_group()
+    mode.add_argument("--concurrency", type=int, default=10, help="Closed loop: concurrent clients")
+    mode.add_argument("--rate", type=float, help="Open loop: requests per second (Poisson arrivals)")
+    load.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    load.add_argument("--requests", type=int, help="Stop after this many requests")
+    load.add_argument("--warmup", type=float, default=0, help="Seconds of samples discarded at the start")
+    load.add_argument("--max-in-flight", type=int, default=256, help="Open loop: client thread limit")
+    load.add_argument("--routes", type=parse_routes, default=parse_routes("ask"),
+                      help=f"Weighted routes, e.g. ask=3,mcp_chat=1 ({', '.join(ROUTES)})")
+    load.add_argument("--repeat-ratio", type=float, default=0.0, help="Share of requests reusing common prompts")
+    load.add_argument("--timeout", type=float, default=60, help="Client timeout per request")
+
+    app = parser.add_argument_group("app")
+    app.add_argument("--target", help="Base URL of an already running app (skips starting one)")
+    app.add_argument("--workers", type=int, default=2)
+    app.add_argument("--threads", type=int, default=8)
+    app.add_argument("--port", type=int, default=8790)
+    app.add_argument("--app-env", action="append", default=[], metavar="NAME=VALUE",
+                     help="Extra environment for the app, e.g. ANSWER_CACHE_MAX_ENTRIES=0")
+
+    # Includes --seed, which also seeds route and prompt choice
+    fake_mcp_server.add_arguments(parser.add_argument_group("fake MCP upstream"))
+
+    results = parser.add_argument_group("results")
+    results.add_argument("--output", default="loadtest-results.json", help="JSON file the results are written to")
+    results.add_argument("--baseline", help="Earlier results file to compare against")
+    results.add_argument("--max-regression", type=float, default=0.2,
+                         help="Allowed relative p95/p99 increase or throughput drop")
+    args = parser.parse_args()
+
+    upstream = proc = None
+    base_url = args.target
+    if not base_url:
+        upstream = fake_mcp_server.start(fake_mcp_server.config_from_args(args))
+        proc = start_app(args, f"http://127.0.0.1:{upstream.server_port}{fake_mcp_server.PREFIX}", args.port)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    generator = LoadGenerator(base_url, args.routes, args.repeat_ratio, args.timeout, args.seed)
+    mode = f"rate {args.rate}/s" if args.rate else f"concurrency {args.concurrency}"
+    print(f"Load test against {base_url}: {mode}, {args.duration}s, routes {args.routes}", flush=True)
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    start = time.perf_counter()
+    try:
+        if args.rate:
+            generator.run_open(args.rate, args.duration, args.requests, args.max_in_flight)
+        else:
+            generator.run_closed(args.concurrency, args.duration, args.requests)
+        upstream_stats = None
+        if upstream is not None:
+            upstream_stats = requests.get(
+                f"http://127.0.0.1:{upstream.server_port}{fake_mcp_server.PREFIX}/_stats", timeout=5
+            ).json()
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+        if upstream is not None:
+            upstream.shutdown()
+
+    measured_from = start + args.warmup
+    samples = [sample for sample in generator.samples if sample[2] >= measured_from]
+    elapsed = max(sample[2] + sample[3] for sample in samples) - measured_from if samples else 0
+    summary = summarize(samples, elapsed)
+
+    report = {
+        "started_at": started_at,
+        "git_revision": git_revision(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "elapsed_s": round(elapsed, 2),
+        "upstream": upstream_stats,
+        "routes": summary
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'route':<11} {'requests':>8} {'errors':>6} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'max ms':>8}  statuses")
+    for route, s in summary.items():
+        print(f"{route:<11} {s['requests']:>8} {s['errors']:>6} {s['throughput_rps'] or 0:>8} "
+              f"{s['p50_ms'] or '-':>8} {s['p95_ms'] or '-':>8} {s['p99_ms'] or '-':>8} "
+              f"{s['max_ms'] or '-':>8}  {s['status_counts']}")
+    if upstream_stats:
+        print(f"upstream calls: {upstream_stats}")
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(summary, json.load(f)["routes"], args.max_regression)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Server-side markdown rendering for answers
+
+Answers are rendered to HTML in a single pass by mistune, with raw HTML in
+the source escaped and unsafe link schemes (javascript:, data:, ...)
+dropped, so the browser can insert the result as-is. Rendered HTML is
+memoized by a digest of the markdown, so a cached or repeated answer is
+only ever rendered once per process.
+
+If mistune is not installed, answers are returned as escaped text with
+line breaks.
+"""
+
+import hashlib
+import html
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from structured_log import log_event
+
+try:
+    import mistune
+except ImportError:
+    mistune = None
+
+
+def _plain_text_html(text):
+    return html.escape(text).replace("\n", "<br>\n")
+
+
+class MarkdownRenderer:
+    """
+    Memoizing markdown-to-HTML renderer
+
+    Args:
+        max_entries (int): Rendered answers kept in the LRU memo
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.engine = "mistune" if mistune is not None else "plain"
+        if mistune is not None:
+            self._markdown = mistune.create_markdown(
+                escape=True,
+                plugins=["strikethrough", "table", "url"]
+            )
+        else:
+            self._markdown = _plain_text_html
+
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+        self._render_ms = 0.0
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "errors": 0
+        }
+
+    def render(self, text):
+        """
+        Render markdown to sanitized HTML
+
+        Args:
+            text (str): Answer markdown
+
+        Returns:
+            str: HTML fragment
+        """
+        if not text:
+            return ""
+
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            rendered = self._memo.get(key)
+            if rendered is not None:
+                self._memo.move_to_end(key)
+                self._stats["hits"] += 1
+                return rendered
+
+        start = time.perf_counter()
+        try:
+            rendered = self._markdown(text)
+        except Exception as e:
+            log_event("markdown.render_failed", logging.WARNING, error=str(e))
+            with self._lock:
+                self._stats["errors"] += 1
+            return _plain_text_html(text)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self._stats["misses"] += 1
+            self._render_ms += elapsed_ms
+            self._memo[key] = rendered
+            while len(self._memo) > self.max_entries:
+                self._memo.popitem(last=False)
+        return rendered
+
+    def with_html(self, payload):
+        """Copy of an answer payload with its content rendered under "html" """
+        if not payload.get("content"):
+            return payload
+        return dict(payload, html=self.render(payload["content"]))
+
+    def clear(self):
+        with self._lock:
+            self._memo.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._memo)
+            render_ms = self._render_ms
+        stats["engine"] = self.engine
+        stats["render_ms_avg"] = round(render_ms / stats["misses"], 3) if stats["misses"] else None
+        return stats
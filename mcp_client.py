@@ -0,0 +1,401 @@
+"""
+Pooled, keep-alive HTTP client for the Pinecone MCP assistant endpoint
+
+One MCPClient is created per gunicorn worker process and shared by every
+route, so repeated questions reuse an already-open TLS connection instead
+of paying a new handshake on each call.
+"""
+
+import logging
+import socket
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+import fast_json
+from structured_log import log_event, truncate
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header, given in seconds or as an HTTP date
+
+    Returns:
+        float or None: Seconds to wait, or None if missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def error_for_status(status_code, text, headers=None):
+    """Map a non-200 MCP response to the clean error shape"""
+    if status_code == 401:
+        log_event("mcp.error", logging.ERROR, code=401, error="Authentication failed - check API key")
+        error = {
+            "success": False,
+            "error": "Authentication failed",
+            "code": 401,
+            "message": "Invalid or missing API key"
+        }
+    elif status_code == 429:
+        log_event("mcp.error", logging.WARNING, code=429, error="Rate limit exceeded")
+        error = {
+            "success": False,
+            "error": "Rate limit exceeded",
+            "code": 429,
+            "message": "Too many requests, please try again later"
+        }
+    else:
+        log_event("mcp.error", logging.ERROR, code=status_code, error="Server error", body=text)
+        error = {
+            "success": False,
+            "error": f"Server error: {status_code}",
+            "code": status_code,
+            "message": text
+        }
+
+    retry_after = parse_retry_after(headers.get("Retry-After")) if headers else None
+    if retry_after is not None:
+        error["retry_after"] = retry_after
+    return error
+
+
+def error_for_exception(e):
+    """Map an exception raised while calling the MCP server to the clean error shape"""
+    timeout_errors = (requests.exceptions.Timeout,)
+    connection_errors = (requests.exceptions.ConnectionError,)
+    if httpx is not None:
+        timeout_errors += (httpx.TimeoutException,)
+        connection_errors += (httpx.NetworkError,)
+
+    if isinstance(e, timeout_errors):
+        log_event("mcp.error", logging.WARNING, code="timeout", error="Request timed out")
+        return {
+            "success": False,
+            "error": "Request timeout",
+            "code": "timeout",
+            "message": "Request took too long to complete"
+        }
+    elif isinstance(e, connection_errors):
+        log_event("mcp.error", logging.WARNING, code="connection", error="Connection error")
+        return {
+            "success": False,
+            "error": "Connection error",
+            "code": "connection",
+            "message": "Unable to connect to MCP server"
+        }
+    else:
+        log_event("mcp.error", logging.ERROR, code="unknown", error=str(e))
+        return {
+            "success": False,
+            "error": str(e),
+            "code": "unknown",
+            "message": "An unexpected error occurred"
+        }
+
+
+def build_payload(prompt, options=None, stream=False):
+    """Build the chat payload sent to the MCP server"""
+    payload = {
+        "messages": [
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        "include_highlights": True,
+        "stream": stream
+    }
+
+    # Add any additional options
+    if options:
+        payload.update(options)
+
+    return payload
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter that enables TCP keep-alive on pooled sockets"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = HTTPConnection.default_socket_options + [
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        ]
+        super().init_poolmanager(*args, **kwargs)
+
+
+class MCPClient:
+    """
+    Reusable client for the MCP server chat endpoint
+
+    Args:
+        base_url (str): MCP assistant URL, e.g. https://.../mcp/assistants/vb
+        api_key (str): Pinecone API key used as a bearer token
+        pool_size (int): Maximum number of pooled connections per host
+        timeout (float): Per-request timeout in seconds
+    """
+
+    def __init__(self, base_url, api_key, pool_size=10, timeout=60):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.pool_size = pool_size
+        self.timeout = timeout
+
+        self.adapter = KeepAliveAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            pool_block=False
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "User-Agent": "VeteransBenefitsAssistant/1.0",
+            "Connection": "keep-alive"
+        })
+
+        self._lock = threading.Lock()
+        self._active = 0
+        self._calls = 0
+
+    def chat(self, prompt, options=None, timeout=None):
+        """
+        Send a prompt to the MCP server chat endpoint
+
+        Args:
+            prompt (str): The user's question/prompt
+            options (dict): Optional parameters like temperature, max_tokens, etc.
+            timeout (float): Overrides the client timeout for this call
+
+        Returns:
+            dict: Clean JSON response with content and metadata
+        """
+        with self._lock:
+            self._active += 1
+            self._calls += 1
+
+        try:
+            if timeout is not None and timeout <= 0:
+                # The caller has no time left; fail as a timeout without calling
+                raise requests.exceptions.Timeout()
+            payload = build_payload(prompt, options)
+
+            log_event("mcp.request", url=self.base_url, prompt=truncate(prompt, 100))
+
+            response = self.session.post(
+                f"{self.base_url}/chat",
+                data=fast_json.dumps_bytes(payload),
+                timeout=self.timeout if timeout is None else timeout
+            )
+
+            log_event("mcp.response", status=response.status_code)
+
+            if response.status_code == 200:
+                response_data = fast_json.loads(response.content)
+                return {
+                    "success": True,
+                    "data": response_data,
+                    "status_code": 200
+                }
+            return error_for_status(response.status_code, response.text, response.headers)
+
+        except Exception as e:
+            return error_for_exception(e)
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def stream_chat(self, prompt, options=None, timeout=None):
+        """
+        Send a prompt to the MCP server in streaming mode
+
+        Args:
+            prompt (str): The user's question/prompt
+            options (dict): Optional parameters like temperature, max_tokens, etc.
+            timeout (float): Overrides the client timeout (per read) for this call
+
+        Yields:
+            dict: Each decoded stream chunk as sent by the server. If the call
+                  fails, a single error dict in the chat() error shape
+                  (with "success": False) is yielded instead.
+        """
+        with self._lock:
+            self._active += 1
+            self._calls += 1
+
+        try:
+            if timeout is not None and timeout <= 0:
+                raise requests.exceptions.Timeout()
+            payload = build_payload(prompt, options, stream=True)
+
+            log_event("mcp.request", url=self.base_url, prompt=truncate(prompt, 100), stream=True)
+
+            response = self.session.post(
+                f"{self.base_url}/chat",
+                data=fast_json.dumps_bytes(payload),
+                timeout=self.timeout if timeout is None else timeout,
+                stream=True
+            )
+
+            with response:
+                log_event("mcp.response", status=response.status_code, stream=True)
+                if response.status_code != 200:
+                    yield error_for_status(response.status_code, response.text, response.headers)
+                    return
+
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or line.startswith(":"):
+                        continue
+                    if line.startswith("data:"):
+                        line = line[5:].strip()
+                    if line == "[DONE]":
+                        break
+                    try:
+                        yield fast_json.loads(line)
+                    except ValueError:
+                        log_event("mcp.stream_decode_error", logging.WARNING, line=truncate(line, 100))
+
+        except Exception as e:
+            yield error_for_exception(e)
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def pool_stats(self):
+        """
+        Report connection pool usage for this worker process
+
+        Returns:
+            dict: active requests, idle pooled connections, and how many
+                  requests reused a connection versus opened a new one
+        """
+        idle = 0
+        opened = 0
+        requests_sent = 0
+
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            requests_sent += pool.num_requests
+            if pool.pool is not None:
+                idle += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+
+        with self._lock:
+            active = self._active
+            calls = self._calls
+
+        return {
+            "pool_size": self.pool_size,
+            "active": active,
+            "idle": idle,
+            "newly_opened": opened,
+            "reused": max(0, requests_sent - opened),
+            "total_calls": calls
+        }
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+class AsyncMCPClient:
+    """
+    asyncio counterpart of MCPClient built on httpx
+
+    A single event loop can keep hundreds of upstream calls in flight over
+    the pooled connections instead of pinning one worker per call.
+
+    Args:
+        base_url (str): MCP assistant URL, e.g. https://.../mcp/assistants/vb
+        api_key (str): Pinecone API key used as a bearer token
+        pool_size (int): Maximum number of concurrent connections
+        timeout (float): Per-request timeout in seconds
+    """
+
+    def __init__(self, base_url, api_key, pool_size=100, timeout=60):
+        if httpx is None:
+            raise ImportError("httpx is required for AsyncMCPClient (pip install httpx)")
+
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.client = httpx.AsyncClient(
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+                "User-Agent": "VeteransBenefitsAssistant/1.0"
+            },
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size
+            ),
+            timeout=timeout
+        )
+        self._active = 0
+        self._calls = 0
+
+    async def chat(self, prompt, options=None, timeout=None):
+        """
+        Send a prompt to the MCP server chat endpoint
+
+        Args:
+            timeout (float): Overrides the client timeout for this call
+
+        Returns:
+            dict: Same shape as MCPClient.chat
+        """
+        self._active += 1
+        self._calls += 1
+        try:
+            if timeout is not None and timeout <= 0:
+                raise httpx.TimeoutException("No time left for the call")
+            response = await self.client.post(
+                f"{self.base_url}/chat",
+                content=fast_json.dumps_bytes(build_payload(prompt, options)),
+                timeout=self.timeout if timeout is None else timeout
+            )
+
+            if response.status_code == 200:
+                return {
+                    "success": True,
+                    "data": fast_json.loads(response.content),
+                    "status_code": 200
+                }
+            return error_for_status(response.status_code, response.text, response.headers)
+
+        except Exception as e:
+            return error_for_exception(e)
+        finally:
+            self._active -= 1
+
+    def pool_stats(self):
+        return {
+            "pool_size": self.pool_size,
+            "active": self._active,
+            "total_calls": self._calls
+        }
+
+    async def close(self):
+        await self.client.aclose()
@@ -0,0 +1,108 @@
+"""
+Prometheus metrics for the Veterans Benefits Assistant
+
+Request counts and latency histograms per route, per-stage latency
+histograms (upstream MCP call, response parsing, SDK fallback, total
+handler time) and upstream call counts labelled the way call_mcp_server
+classifies them.
+
+Under gunicorn, gunicorn.conf.py sets PROMETHEUS_MULTIPROC_DIR so every
+worker writes its samples to shared mmap files and /metrics aggregates
+all workers. Without it, the default in-process registry is used.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Upstream answers take seconds, so buckets extend well past the defaults
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, float("inf"))
+
+HTTP_REQUESTS = Counter(
+    "vb_http_requests_total",
+    "HTTP requests handled",
+    ["route", "method", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "vb_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["route", "method"],
+    buckets=LATENCY_BUCKETS
+)
+STAGE_LATENCY = Histogram(
+    "vb_stage_duration_seconds",
+    "Latency of individual request stages",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+UPSTREAM_CALLS = Counter(
+    "vb_mcp_upstream_calls_total",
+    "MCP upstream calls by result",
+    ["status"]
+)
+
+
+def upstream_status_label(result):
+    """
+    Label a call_mcp_server result: 200, 401, 429, 5xx, timeout,
+    connection, circuit_open, other HTTP codes as-is, or unknown
+    """
+    if result.get("success"):
+        return "200"
+    code = result.get("code", "unknown")
+    if isinstance(code, int):
+        return "5xx" if code >= 500 else str(code)
+    return str(code)
+
+
+def record_upstream(result, seconds):
+    """Record one MCP call's latency and outcome"""
+    STAGE_LATENCY.labels(stage="mcp_call").observe(seconds)
+    UPSTREAM_CALLS.labels(status=upstream_status_label(result)).inc()
+
+
+@contextmanager
+def observe_stage(stage):
+    """Time a block of code into the stage latency histogram"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(stage=stage).observe(time.perf_counter() - start)
+
+
+def record_request(route, method, status, seconds):
+    HTTP_REQUESTS.labels(route=route, method=method, status=str(status)).inc()
+    HTTP_LATENCY.labels(route=route, method=method).observe(seconds)
+    STAGE_LATENCY.labels(stage="handler").observe(seconds)
+
+
+def render():
+    """
+    Render all metrics in the Prometheus text format
+
+    Returns:
+        tuple: (body bytes, content type)
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    """Clean up a dead worker's live-gauge files (called from gunicorn)"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
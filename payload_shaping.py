@@ -0,0 +1,107 @@
+"""
+Compact answer payloads for bandwidth-constrained clients
+
+Answers can carry dozens of citations, many pointing at the same page of the
+same file, each with a full highlight. Compact mode merges citations for the
+same file and page and cuts highlights to a short window; a fields selector
+then keeps only the keys a client actually reads, e.g.
+"content,citations.file,citations.page,citations.url".
+
+All functions return new objects and never modify cached payloads.
+"""
+
+
+def dedupe_citations(citations):
+    """
+    Merge citations that point at the same file and page
+
+    The first citation for a (file, page) is kept, with the highest
+    confidence seen for that page.
+
+    Returns:
+        list: Citations in first-seen order
+    """
+    merged = {}
+    for citation in citations:
+        key = (citation.get("file"), citation.get("page"))
+        existing = merged.get(key)
+        if existing is None:
+            merged[key] = dict(citation)
+        elif citation.get("confidence", 0) > existing.get("confidence", 0):
+            existing["confidence"] = citation["confidence"]
+    return list(merged.values())
+
+
+def truncate_snippet(text, window):
+    """Cut text to at most window characters, at a word boundary when possible"""
+    if not text or len(text) <= window:
+        return text
+    cut = text[:window]
+    space = cut.rfind(" ")
+    if space > window // 2:
+        cut = cut[:space]
+    return cut.rstrip() + "…"
+
+
+def compact_payload(payload, snippet_chars=200):
+    """
+    Copy of an answer payload with deduplicated citations and short highlights
+
+    Args:
+        payload (dict): Answer payload with a "citations" list
+        snippet_chars (int): Highlight window per citation; 0 drops highlights
+
+    Returns:
+        dict: Compacted payload
+    """
+    citations = payload.get("citations")
+    if not citations:
+        return payload
+    compacted = []
+    for citation in dedupe_citations(citations):
+        if snippet_chars <= 0:
+            citation.pop("text", None)
+        elif citation.get("text"):
+            citation["text"] = truncate_snippet(citation["text"], snippet_chars)
+        compacted.append(citation)
+    return dict(payload, citations=compacted)
+
+
+def parse_fields(fields):
+    """
+    Parse a fields selector into a nested key tree
+
+    Args:
+        fields (str or list): Comma-separated or list of dotted key paths
+
+    Returns:
+        dict: e.g. {"content": {}, "citations": {"file": {}, "url": {}}}, or
+              None if no fields were given
+    """
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    tree = {}
+    for path in fields:
+        node = tree
+        for key in str(path).strip().split("."):
+            if key:
+                node = node.setdefault(key, {})
+    return tree or None
+
+
+def select_fields(value, tree):
+    """
+    Keep only the selected keys of a payload
+
+    Dicts keep the keys present in the tree, lists are filtered element by
+    element, and a key whose subtree is empty is kept whole.
+    """
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [select_fields(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: select_fields(value[key], subtree) for key, subtree in tree.items() if key in value}
+    return value
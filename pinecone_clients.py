@@ -0,0 +1,137 @@
+"""
+Lazily initialized Pinecone SDK clients
+
+Importing the pinecone package, constructing the client and looking up the
+assistant and index all happen on a background warm-up thread (or on first
+use), so a worker can start serving /ping, /health and MCP-backed answers
+before the Pinecone control plane has responded. Callers that need a client
+say how long they are willing to wait for the warm-up to finish.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from structured_log import log_event
+
+COLD = "cold"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+
+class PineconeClients:
+    """
+    Pinecone client, assistant and index handles created off the request path
+
+    Args:
+        api_key (str): Pinecone API key
+        assistant_name (str): Assistant used for the SDK fallback
+        index_name (str): Index used for probes and the semantic cache
+    """
+
+    def __init__(self, api_key, assistant_name="vb", index_name="veterans-benefits"):
+        self.api_key = api_key
+        self.assistant_name = assistant_name
+        self.index_name = index_name
+
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._state = COLD
+        self._pc = None
+        self._assistant = None
+        self._index = None
+        self._errors = {}
+        self._init_ms = None
+
+    def warm_up(self):
+        """Start initializing in the background (again, if this process was forked)"""
+        with self._lock:
+            forked_mid_warmup = self._state == WARMING and self._pid != os.getpid()
+            if self._state != COLD and not forked_mid_warmup:
+                return
+            if forked_mid_warmup:
+                # The warm-up thread did not survive the fork
+                self._done = threading.Event()
+            self._pid = os.getpid()
+            self._state = WARMING
+            self._thread = threading.Thread(target=self._initialize, name="pinecone-warmup", daemon=True)
+            self._thread.start()
+
+    def wait(self, timeout=None):
+        """
+        Wait for initialization to finish, starting it if needed
+
+        Args:
+            timeout (float): Seconds to wait; 0 never blocks, None waits indefinitely
+
+        Returns:
+            bool: True if initialization has finished (successfully or not)
+        """
+        self.warm_up()
+        if timeout == 0:
+            return self._done.is_set()
+        return self._done.wait(timeout)
+
+    def client(self, timeout=None):
+        """The Pinecone client, or None if unavailable within the timeout"""
+        self.wait(timeout)
+        return self._pc
+
+    def assistant(self, timeout=None):
+        """The SDK assistant, or None if unavailable within the timeout"""
+        self.wait(timeout)
+        return self._assistant
+
+    def index(self, timeout=None):
+        """The Pinecone index, or None if unavailable within the timeout"""
+        self.wait(timeout)
+        return self._index
+
+    @property
+    def state(self):
+        return self._state
+
+    def is_ready(self):
+        """True once initialization has finished, even if parts of it failed"""
+        return self._state in (READY, FAILED)
+
+    def stats(self):
+        return {
+            "state": self._state,
+            "assistant_connected": self._assistant is not None,
+            "index_connected": self._index is not None,
+            "init_ms": self._init_ms,
+            "errors": dict(self._errors)
+        }
+
+    def _initialize(self):
+        start = time.perf_counter()
+        try:
+            from pinecone import Pinecone
+            self._pc = Pinecone(api_key=self.api_key)
+        except Exception as e:
+            self._errors["client"] = str(e)
+            log_event("startup.pinecone_failed", logging.ERROR, error=str(e))
+        else:
+            try:
+                self._assistant = self._pc.assistant.Assistant(assistant_name=self.assistant_name)
+                log_event("startup.assistant_connected", assistant=self.assistant_name)
+            except Exception as e:
+                self._errors["assistant"] = str(e)
+                log_event("startup.assistant_failed", logging.ERROR, error=str(e))
+
+            try:
+                self._index = self._pc.Index(self.index_name)
+                log_event("startup.index_connected", index=self.index_name)
+            except Exception as e:
+                self._errors["index"] = str(e)
+                log_event("startup.index_failed", logging.WARNING, error=str(e))
+
+        self._init_ms = round((time.perf_counter() - start) * 1000, 1)
+        self._state = FAILED if self._pc is None else READY
+        log_event("startup.pinecone_ready", state=self._state, init_ms=self._init_ms)
+        self._done.set()
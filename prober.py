@@ -0,0 +1,176 @@
+"""
+Background upstream prober
+
+A daemon thread checks the MCP endpoint, the Pinecone SDK assistant and
+the index on a schedule, and keeps the latest result plus a rolling
+latency/success history for each. /mcp/status and /health read that
+snapshot instead of making their own upstream calls.
+
+Only one worker process on the host probes at a time: the prober that
+holds an exclusive file lock runs the checks and publishes the snapshot
+to a shared state file, which the other workers read.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from structured_log import log_event
+
+
+class UpstreamProber:
+    """
+    Periodic health checks shared across worker processes
+
+    Args:
+        checks (dict): name -> callable returning (ok, detail dict)
+        interval (float): Seconds between probe rounds
+        jitter (float): Random fraction of the interval added or removed per round
+        history (int): Number of past results kept per check
+        lock_path (str): File locked by the probing process
+        state_path (str): File the latest snapshot is published to
+    """
+
+    def __init__(self, checks, interval=60, jitter=0.1, history=50,
+                 lock_path="/tmp/vb-prober.lock", state_path="/tmp/vb-prober-state.json"):
+        self.checks = checks
+        self.interval = interval
+        self.jitter = jitter
+        self.lock_path = lock_path
+        self.state_path = state_path
+
+        self._history = {name: deque(maxlen=history) for name in checks}
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+
+        self._snapshot = None
+        self._snapshot_mtime = None
+
+    def start(self):
+        """Start the probe thread (again, if this process was forked)"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        self._pid = os.getpid()
+        self._lock_file = None
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="upstream-prober", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def is_leader(self):
+        return self._lock_file is not None
+
+    def run_once(self):
+        """Run every check once and publish the results"""
+        now = time.time()
+        for name, check in self.checks.items():
+            start = time.perf_counter()
+            try:
+                ok, detail = check()
+            except Exception as e:
+                ok, detail = False, {"error": str(e)}
+            latency_ms = round((time.perf_counter() - start) * 1000, 2)
+
+            with self._lock:
+                self._latest[name] = {
+                    "ok": ok,
+                    "latency_ms": latency_ms,
+                    "checked_at": now,
+                    "detail": detail
+                }
+                self._history[name].append((now, ok, latency_ms))
+
+        self._publish()
+
+    def snapshot(self):
+        """
+        Latest probe results and rolling history summary
+
+        Returns:
+            dict: Per-check latest result and success/latency figures, or
+                  None if no probe has completed yet
+        """
+        self.start()
+        if self.is_leader():
+            with self._lock:
+                return self._build_snapshot()
+
+        try:
+            mtime = os.stat(self.state_path).st_mtime_ns
+        except OSError:
+            return None
+        if mtime != self._snapshot_mtime:
+            try:
+                with open(self.state_path) as f:
+                    self._snapshot = json.load(f)
+                self._snapshot_mtime = mtime
+            except (OSError, ValueError):
+                return self._snapshot
+        return self._snapshot
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._try_lead():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    log_event("probe.failed", logging.WARNING, error=str(e))
+            delay = self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+            self._stop.wait(max(1.0, delay))
+
+    def _try_lead(self):
+        """Take the host-wide probe lock if no other worker holds it"""
+        if self._lock_file is not None:
+            return True
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        log_event("probe.leader", pid=os.getpid())
+        return True
+
+    def _build_snapshot(self):
+        if not self._latest:
+            return None
+        checks = {}
+        for name, latest in self._latest.items():
+            history = list(self._history[name])
+            latencies = sorted(latency for _, ok, latency in history if ok)
+            checks[name] = dict(latest, history={
+                "samples": len(history),
+                "success_rate": round(sum(1 for _, ok, _ in history if ok) / len(history), 4) if history else None,
+                "latency_ms_p50": latencies[len(latencies) // 2] if latencies else None,
+                "latency_ms_max": latencies[-1] if latencies else None
+            })
+            checks[name]["checked_at"] = datetime.fromtimestamp(latest["checked_at"], timezone.utc).isoformat()
+        return {
+            "prober_pid": os.getpid(),
+            "interval": self.interval,
+            "checks": checks
+        }
+
+    def _publish(self):
+        with self._lock:
+            snapshot = self._build_snapshot()
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            log_event("probe.publish_failed", logging.WARNING, error=str(e))
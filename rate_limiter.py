@@ -0,0 +1,192 @@
+"""
+Host-wide token-bucket rate limiter for MCP calls
+
+All worker processes on the host draw from one bucket whose state (tokens,
+refill rate, last update, Retry-After block) lives in a small file guarded
+by an exclusive flock, the same way the upstream prober coordinates
+workers. Calls over budget wait in a short queue, up to their own time
+limit, instead of failing straight away.
+
+The refill rate adapts to the upstream: a 429 halves it (and a Retry-After
+header blocks the bucket until then), and every successful call adds a
+small step back, up to the configured rate.
+"""
+
+import fcntl
+import os
+import struct
+import threading
+import time
+from collections import deque
+
+# tokens, updated_at, rate, blocked_until
+_STATE = struct.Struct("<dddd")
+
+
+class SharedTokenBucket:
+    """
+    Token bucket shared by every process that uses the same state file
+
+    Args:
+        rate (float): Calls per second when upstream is healthy
+        burst (float): Bucket capacity
+        min_rate (float): Floor the adaptive rate never drops below
+        decrease_factor (float): Rate multiplier applied on a 429
+        recovery_step (float): Calls/second added back per successful call
+        max_queue (int): Calls of this process allowed to wait at once
+        path (str): State file shared by the worker processes
+    """
+
+    def __init__(self, rate=10.0, burst=20.0, min_rate=0.5, decrease_factor=0.5,
+                 recovery_step=0.1, max_queue=32, path="/tmp/vb-mcp-ratelimit.bin"):
+        self.max_rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.decrease_factor = decrease_factor
+        self.recovery_step = recovery_step
+        self.max_queue = max_queue
+        self.path = path
+
+        self._fd = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._waits = deque(maxlen=512)
+        self._stats = {
+            "acquired": 0,
+            "queued": 0,
+            "rejected": 0,
+            "queue_full": 0,
+            "throttled": 0
+        }
+
+    def acquire(self, timeout):
+        """
+        Take one token, waiting up to timeout seconds for one to free up
+
+        Returns:
+            float or None: Seconds spent waiting, or None if no token could
+                           be had in time (or the queue is full)
+        """
+        start = time.monotonic()
+        wait = self._take()
+        if wait == 0:
+            self._record_wait(0.0)
+            return 0.0
+
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                self._stats["queue_full"] += 1
+                self._stats["rejected"] += 1
+                return None
+            self._waiting += 1
+            self._stats["queued"] += 1
+
+        try:
+            while True:
+                remaining = timeout - (time.monotonic() - start)
+                if wait > remaining:
+                    with self._lock:
+                        self._stats["rejected"] += 1
+                    return None
+                time.sleep(wait)
+                wait = self._take()
+                if wait == 0:
+                    waited = time.monotonic() - start
+                    self._record_wait(waited)
+                    return waited
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def on_success(self):
+        """Creep the rate back up after a call upstream accepted"""
+        def update(tokens, rate, blocked_until, now):
+            return tokens, min(self.max_rate, rate + self.recovery_step), blocked_until
+        self._update(update)
+
+    def on_throttled(self, retry_after=None):
+        """
+        Back off after upstream answered 429
+
+        Args:
+            retry_after (float): Seconds from the Retry-After header, if any
+        """
+        def update(tokens, rate, blocked_until, now):
+            if retry_after:
+                blocked_until = max(blocked_until, now + retry_after)
+            return 0.0, max(self.min_rate, rate * self.decrease_factor), blocked_until
+        self._update(update)
+        with self._lock:
+            self._stats["throttled"] += 1
+
+    def stats(self):
+        tokens, rate, blocked_until, now = self._update(None)
+        with self._lock:
+            stats = dict(self._stats)
+            stats["queue_depth"] = self._waiting
+            waits = sorted(self._waits)
+        stats["rate"] = round(rate, 3)
+        stats["max_rate"] = self.max_rate
+        stats["tokens"] = round(tokens, 3)
+        stats["blocked_for_s"] = round(max(0.0, blocked_until - now), 3)
+        stats["wait_ms_avg"] = round(sum(waits) / len(waits) * 1000, 3) if waits else None
+        stats["wait_ms_p95"] = round(waits[int(0.95 * (len(waits) - 1))] * 1000, 3) if waits else None
+        return stats
+
+    def _take(self):
+        """Take a token if one is available; otherwise return seconds until one will be"""
+        result = {}
+
+        def update(tokens, rate, blocked_until, now):
+            if blocked_until > now:
+                result["wait"] = blocked_until - now
+            elif tokens >= 1:
+                tokens -= 1
+                result["wait"] = 0
+            else:
+                result["wait"] = (1 - tokens) / rate
+            return tokens, rate, blocked_until
+
+        self._update(update)
+        return result["wait"]
+
+    def _update(self, fn):
+        """
+        Read, refill and optionally modify the shared state under the file lock
+
+        Returns:
+            tuple: (tokens, rate, blocked_until, now) after the update
+        """
+        fd = self._file()
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            now = time.time()
+            data = os.pread(fd, _STATE.size, 0)
+            if len(data) == _STATE.size:
+                tokens, updated_at, rate, blocked_until = _STATE.unpack(data)
+                rate = min(self.max_rate, max(self.min_rate, rate))
+                # No refill while blocked by Retry-After, so the block does not end in a burst
+                refill_from = max(updated_at, blocked_until)
+                tokens = min(self.burst, tokens + max(0.0, now - refill_from) * rate)
+            else:
+                tokens, rate, blocked_until = self.burst, self.max_rate, 0.0
+
+            if fn is not None:
+                tokens, rate, blocked_until = fn(tokens, rate, blocked_until, now)
+            os.pwrite(fd, _STATE.pack(tokens, now, rate, blocked_until), 0)
+            return tokens, rate, blocked_until, now
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def _file(self):
+        # Reopen after a fork so each process holds its own lock description
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._pid = os.getpid()
+        return self._fd
+
+    def _record_wait(self, seconds):
+        with self._lock:
+            self._stats["acquired"] += 1
+            self._waits.append(seconds)
@@ -0,0 +1,164 @@
+"""
+Retry policy for MCP calls
+
+Decides whether a failed call_mcp_server attempt is worth repeating and
+how long to wait first: exponential backoff with full jitter, stretched to
+the upstream's Retry-After when one was sent. A retry is only made if it
+still fits in the caller's remaining time, and a retry budget (a share of
+recent first attempts) keeps retries from multiplying load on an upstream
+that is already struggling.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+
+DEFAULT_RETRYABLE = (429, 502, 503, 504, "connection")
+
+
+def parse_retryable(value):
+    """
+    Parse a comma-separated list of call_mcp_server error codes
+
+    Returns:
+        tuple: HTTP status codes as ints, other codes ("timeout",
+               "connection") as strings
+    """
+    codes = []
+    for token in value.split(","):
+        token = token.strip()
+        if token:
+            codes.append(int(token) if token.isdigit() else token)
+    return tuple(codes)
+
+
+class RetryPolicy:
+    """
+    Backoff and budget rules for repeating failed MCP calls
+
+    Args:
+        max_retries (int): Retries after the first attempt
+        base_delay (float): Backoff cap for the first retry, in seconds;
+                            doubles for every further retry
+        max_delay (float): Upper bound on the jittered backoff
+        max_retry_after (float): Give up instead of waiting for a longer
+                                 Retry-After than this
+        retryable (tuple): Error codes worth retrying
+        budget_ratio (float): Retries allowed per first attempt in the window
+        budget_min (int): Retries always allowed per window, so a quiet
+                          worker can still retry
+        budget_window (float): Seconds the retry budget looks back
+        min_attempt_time (float): Skip a retry that would leave the attempt
+                                  less time than this
+    """
+
+    def __init__(self, max_retries=2, base_delay=0.1, max_delay=2.0, max_retry_after=5.0,
+                 retryable=DEFAULT_RETRYABLE, budget_ratio=0.2, budget_min=3, budget_window=10.0,
+                 min_attempt_time=0.25):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.retryable = frozenset(retryable)
+        self.budget_ratio = budget_ratio
+        self.budget_min = budget_min
+        self.budget_window = budget_window
+        self.min_attempt_time = min_attempt_time
+
+        self._lock = threading.Lock()
+        self._attempts = deque()
+        self._retries = deque()
+        self._stats = {
+            "calls": 0,
+            "retries": 0,
+            "gave_up_attempts": 0,
+            "gave_up_deadline": 0,
+            "gave_up_retry_after": 0,
+            "gave_up_budget": 0,
+            "by_code": {}
+        }
+
+    def record_call(self):
+        """Count a first attempt towards the retry budget"""
+        now = time.monotonic()
+        with self._lock:
+            self._attempts.append(now)
+            self._stats["calls"] += 1
+
+    def is_retryable(self, result):
+        return not result.get("success") and result.get("code") in self.retryable
+
+    def backoff(self, retries):
+        """Full-jitter backoff before retry number retries + 1"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retries))
+
+    def next_delay(self, result, retries, remaining=None):
+        """
+        Seconds to wait before retrying a failed attempt
+
+        Args:
+            result (dict): The failed call_mcp_server result
+            retries (int): Retries already made for this call
+            remaining (float): Seconds the call has left, or None if unbounded
+
+        Returns:
+            float or None: Delay before the next attempt, or None to give up
+        """
+        if not self.is_retryable(result):
+            return None
+        if retries >= self.max_retries:
+            self._count("gave_up_attempts")
+            return None
+
+        delay = self.backoff(retries)
+        retry_after = result.get("retry_after")
+        if retry_after is not None:
+            if retry_after > self.max_retry_after:
+                self._count("gave_up_retry_after")
+                return None
+            delay = max(delay, retry_after)
+
+        if remaining is not None and delay + self.min_attempt_time > remaining:
+            self._count("gave_up_deadline")
+            return None
+        if not self._withdraw():
+            self._count("gave_up_budget")
+            return None
+
+        with self._lock:
+            self._stats["retries"] += 1
+            code = str(result.get("code"))
+            self._stats["by_code"][code] = self._stats["by_code"].get(code, 0) + 1
+        return delay
+
+    def stats(self):
+        with self._lock:
+            self._prune(time.monotonic())
+            stats = dict(self._stats, by_code=dict(self._stats["by_code"]))
+            stats["budget_remaining"] = max(0, int(self._allowance()) - len(self._retries))
+        stats["max_retries"] = self.max_retries
+        return stats
+
+    def _withdraw(self):
+        """Take one retry from the budget, if any is left"""
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            if len(self._retries) >= self._allowance():
+                return False
+            self._retries.append(now)
+            return True
+
+    def _allowance(self):
+        return self.budget_min + self.budget_ratio * len(self._attempts)
+
+    def _prune(self, now):
+        cutoff = now - self.budget_window
+        for window in (self._attempts, self._retries):
+            while window and window[0] < cutoff:
+                window.popleft()
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
@@ -0,0 +1,349 @@
+"""
+Semantic (embedding-similarity) answer cache
+
+Prompts are embedded and compared with previously answered prompts, so
+"how do I apply for disability comp" can reuse the answer stored for
+"VA disability claim process". Embedders and vector stores are pluggable:
+the Pinecone inference API and index are used in production, while the
+hashing embedder and in-memory store work fully offline.
+
+Embeddings say little about numbers: multilingual-e5 scores "rated 100
+percent" and "rated 50 percent" well above the default 0.92 threshold.
+Answers are therefore only reused between prompts that contain the same
+numbers (see match_key), on top of the similarity threshold.
+
+The in-memory store scans its entries with numpy when it is installed
+and in pure Python otherwise, which is far slower for large stores.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import operator
+import re
+import threading
+import time
+import uuid
+from collections import deque
+
+from structured_log import log_event
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _normalize(vector):
+    norm = math.sqrt(sum(v * v for v in vector))
+    if not norm:
+        return list(vector)
+    return [v / norm for v in vector]
+
+
+def _resolve(handle, what):
+    """Return handle, calling it first if it is a lazy zero-argument provider"""
+    value = handle() if callable(handle) else handle
+    if value is None:
+        raise RuntimeError(f"{what} not available")
+    return value
+
+
+def options_key(options):
+    """Stable digest of chat options so answers are only reused for identical options"""
+    options_json = json.dumps(options or {}, sort_keys=True, default=str)
+    return hashlib.sha1(options_json.encode("utf-8")).hexdigest()[:16]
+
+
+def match_key(prompt, options):
+    """
+    Digest a stored answer must share with a prompt to be reused: the chat
+    options and the numbers in the prompt, which similarity alone does not
+    tell apart
+    """
+    numbers = re.findall(r"\d+(?:\.\d+)?", prompt)
+    return options_key({"options": options or {}, "numbers": numbers})
+
+
+class HashingEmbedder:
+    """
+    Offline embedder using feature hashing of word unigrams and bigrams
+
+    It only captures lexical overlap, but needs no network access, which
+    makes it suitable for tests and local development.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dimension=256):
+        self.dimension = dimension
+
+    def embed(self, text):
+        tokens = re.findall(r"[a-z0-9]+", text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        vector = [0.0] * self.dimension
+        for feature in features:
+            digest = hashlib.md5(feature.encode("utf-8")).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimension
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[bucket] += sign
+        return _normalize(vector)
+
+
+class PineconeEmbedder:
+    """
+    Embedder backed by the Pinecone inference API
+
+    Args:
+        pc: Pinecone client, or a callable returning it on first use
+        model (str): Inference model name
+    """
+
+    name = "pinecone"
+
+    def __init__(self, pc, model="multilingual-e5-large"):
+        self.pc = pc
+        self.model = model
+
+    def embed(self, text):
+        result = _resolve(self.pc, "Pinecone client").inference.embed(
+            model=self.model,
+            inputs=[text],
+            parameters={"input_type": "query", "truncate": "END"}
+        )
+        item = result[0]
+        values = item["values"] if isinstance(item, dict) else item.values
+        return _normalize(values)
+
+
+class LocalVectorStore:
+    """
+    In-memory vector store with brute-force cosine search
+
+    With numpy the vectors live in one float32 matrix that is searched with
+    a single matrix-vector product; without it every entry is scored in
+    Python, so keep max_entries small.
+
+    Args:
+        max_entries (int): Oldest entries are dropped beyond this size
+    """
+
+    name = "local"
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = deque()
+        # numpy ring buffer, allocated on the first upsert once the dimension is known
+        self._matrix = None
+        self._keys = None
+        self._stored_at = None
+        self._values = [None] * max_entries if numpy is not None else None
+        self._count = 0
+        self._next = 0
+
+    def query(self, vector, options_hash, min_stored_at):
+        if numpy is not None:
+            return self._query_matrix(vector, options_hash, min_stored_at)
+
+        best_score = -1.0
+        best_value = None
+        with self._lock:
+            entries = list(self._entries)
+        for entry_vector, entry_options, stored_at, value in entries:
+            if entry_options != options_hash or stored_at < min_stored_at:
+                continue
+            score = sum(map(operator.mul, vector, entry_vector))
+            if score > best_score:
+                best_score = score
+                best_value = value
+        return best_value, best_score
+
+    def upsert(self, vector, options_hash, stored_at, prompt, value):
+        if numpy is not None:
+            self._upsert_matrix(vector, options_hash, stored_at, value)
+            return
+        with self._lock:
+            self._entries.append((vector, options_hash, stored_at, value))
+            while len(self._entries) > self.max_entries:
+                self._entries.popleft()
+
+    def size(self):
+        return self._count if numpy is not None else len(self._entries)
+
+    def _query_matrix(self, vector, options_hash, min_stored_at):
+        query = numpy.asarray(vector, dtype=numpy.float32)
+        with self._lock:
+            n = self._count
+            if not n:
+                return None, -1.0
+            eligible = (self._keys[:n] == options_hash) & (self._stored_at[:n] >= min_stored_at)
+            if not eligible.any():
+                return None, -1.0
+            scores = numpy.where(eligible, self._matrix[:n] @ query, -numpy.inf)
+            best = int(scores.argmax())
+            return self._values[best], float(scores[best])
+
+    def _upsert_matrix(self, vector, options_hash, stored_at, value):
+        row = numpy.asarray(vector, dtype=numpy.float32)
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = numpy.zeros((self.max_entries, row.shape[0]), dtype=numpy.float32)
+                self._keys = numpy.zeros(self.max_entries, dtype="U16")
+                self._stored_at = numpy.zeros(self.max_entries, dtype=numpy.float64)
+            slot = self._next
+            self._matrix[slot] = row
+            self._keys[slot] = options_hash
+            self._stored_at[slot] = stored_at
+            self._values[slot] = value
+            self._next = (slot + 1) % self.max_entries
+            self._count = min(self._count + 1, self.max_entries)
+
+
+class PineconeVectorStore:
+    """
+    Vector store that keeps answered prompts in a namespace of a Pinecone index
+
+    The index dimension must match the embedder that is used with it. index
+    may be a callable returning the index on first use.
+    """
+
+    name = "pinecone"
+
+    # Pinecone limits metadata to 40 KB per record
+    MAX_METADATA_BYTES = 38 * 1024
+
+    def __init__(self, index, namespace="semantic-cache"):
+        self.index = index
+        self.namespace = namespace
+
+    def query(self, vector, options_hash, min_stored_at):
+        result = _resolve(self.index, "Pinecone index").query(
+            vector=vector,
+            top_k=1,
+            namespace=self.namespace,
+            include_metadata=True,
+            filter={
+                "options_key": {"$eq": options_hash},
+                "stored_at": {"$gte": min_stored_at}
+            }
+        )
+        matches = result["matches"] if isinstance(result, dict) else result.matches
+        if not matches:
+            return None, -1.0
+        match = matches[0]
+        metadata = match["metadata"] if isinstance(match, dict) else match.metadata
+        score = match["score"] if isinstance(match, dict) else match.score
+        return json.loads(metadata["answer"]), score
+
+    def upsert(self, vector, options_hash, stored_at, prompt, value):
+        answer_json = json.dumps(value, default=str)
+        if len(answer_json) > self.MAX_METADATA_BYTES:
+            return
+        _resolve(self.index, "Pinecone index").upsert(
+            vectors=[{
+                "id": str(uuid.uuid4()),
+                "values": vector,
+                "metadata": {
+                    "prompt": prompt[:500],
+                    "options_key": options_hash,
+                    "stored_at": stored_at,
+                    "answer": answer_json
+                }
+            }],
+            namespace=self.namespace
+        )
+
+    def size(self):
+        return None
+
+
+class SemanticCache:
+    """
+    Near-duplicate answer lookup over embedded prompts
+
+    Args:
+        embedder: Object with an embed(text) -> list[float] method
+        store: Vector store with query() and upsert() methods
+        threshold (float): Minimum cosine similarity to count as a hit;
+                           prompts must also contain the same numbers
+        ttl (float): Seconds a stored answer may be reused
+    """
+
+    def __init__(self, embedder, store, threshold=0.92, ttl=3600):
+        self.embedder = embedder
+        self.store = store
+        self.threshold = threshold
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=512)
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "errors": 0,
+            "stored": 0
+        }
+
+    def lookup(self, prompt, options=None):
+        """
+        Find a previously answered prompt similar to this one
+
+        Returns:
+            tuple: (value or None, similarity, prompt vector). The vector can
+                   be passed back to store() to avoid embedding twice.
+        """
+        start = time.perf_counter()
+        vector = None
+        try:
+            vector = self.embedder.embed(prompt)
+            value, score = self.store.query(vector, match_key(prompt, options), time.time() - self.ttl)
+        except Exception as e:
+            log_event("semantic_cache.lookup_failed", logging.WARNING, error=str(e))
+            with self._lock:
+                self._stats["errors"] += 1
+                self._stats["misses"] += 1
+            return None, None, vector
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        hit = value is not None and score >= self.threshold
+        with self._lock:
+            self._latencies.append(elapsed_ms)
+            self._stats["hits" if hit else "misses"] += 1
+
+        if hit:
+            return value, round(score, 4), vector
+        return None, round(score, 4), vector
+
+    def store_answer(self, prompt, value, options=None, vector=None):
+        """Remember an answer so similar prompts can reuse it"""
+        try:
+            if vector is None:
+                vector = self.embedder.embed(prompt)
+            self.store.upsert(vector, match_key(prompt, options), time.time(), prompt, value)
+            with self._lock:
+                self._stats["stored"] += 1
+        except Exception as e:
+            log_event("semantic_cache.store_failed", logging.WARNING, error=str(e))
+            with self._lock:
+                self._stats["errors"] += 1
+
+    def stats(self):
+        """Return hit rate and lookup latency figures"""
+        with self._lock:
+            stats = dict(self._stats)
+            latencies = sorted(self._latencies)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        if latencies:
+            stats["lookup_ms_avg"] = round(sum(latencies) / len(latencies), 3)
+            stats["lookup_ms_p95"] = round(latencies[int(0.95 * (len(latencies) - 1))], 3)
+        else:
+            stats["lookup_ms_avg"] = None
+            stats["lookup_ms_p95"] = None
+        stats["threshold"] = self.threshold
+        stats["embedder"] = self.embedder.name
+        stats["backend"] = self.store.name
+        stats["entries"] = self.store.size()
+        return stats
@@ -0,0 +1,186 @@
+"""
+Single-flight coalescing of identical in-flight calls
+
+When several threads ask for the same key at the same time, only the first
+(the leader) runs the call; the others wait for it and receive the same
+result. Keys are removed as soon as the call finishes, so this never
+serves stale data - it only collapses concurrent duplicates.
+
+SingleFlight.stream() does the same for generators: one source runs on a
+background thread and every concurrent caller reads its events, replayed
+from the start for callers that join late.
+"""
+
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class _Stream:
+    __slots__ = ("cond", "events", "finished", "error", "subscribers")
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.events = []
+        self.finished = False
+        self.error = None
+        self.subscribers = 0
+
+
+class SingleFlight:
+    """Thread-safe request coalescer"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._streams = {}
+        self._stats = {
+            "calls": 0,
+            "executions": 0,
+            "collapsed": 0
+        }
+
+    def do(self, key, fn, timeout=None):
+        """
+        Run fn() once for all concurrent callers with the same key
+
+        Args:
+            key (str): Identifies duplicate calls
+            fn (callable): The call to run; its exceptions are re-raised
+                           in every waiting caller
+            timeout (float): Seconds a waiting caller gives the leader
+                             before raising TimeoutError
+
+        Returns:
+            tuple: (result of fn, shared) where shared is True when this
+                   caller reused another caller's in-flight call
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats["collapsed"] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._stats["executions"] += 1
+                leader = True
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError(f"Coalesced call for {key} still running after {timeout}s")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    def stream(self, key, source, timeout=None):
+        """
+        Share one event stream among all concurrent callers with the same key
+
+        The first caller's source() runs on a background thread. Each caller
+        iterates every event from the first, so a caller that joins late is
+        replayed what it missed. The source is closed early once every
+        caller has stopped reading.
+
+        Args:
+            key (str): Identifies duplicate streams
+            source (callable): Returns the iterator of events; its
+                               exceptions are re-raised in every caller
+            timeout (float): Seconds a caller that joined another's stream
+                             waits for each next event before its iterator
+                             raises TimeoutError; the first caller's own
+                             source is expected to bound its waits
+
+        Returns:
+            tuple: (generator of events, shared) where shared is True when
+                   this caller joined another caller's stream
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+            stream = self._streams.get(key)
+            shared = stream is not None
+            if shared:
+                self._stats["collapsed"] += 1
+            else:
+                stream = self._streams[key] = _Stream()
+                self._stats["executions"] += 1
+            stream.subscribers += 1
+
+        if not shared:
+            threading.Thread(
+                target=self._pump, args=(key, stream, source), name="singleflight-stream", daemon=True
+            ).start()
+        return self._subscribe(stream, timeout if shared else None), shared
+
+    def _pump(self, key, stream, source):
+        """Read the source into the stream's buffer until it ends or nobody reads"""
+        events = None
+        try:
+            events = source()
+            for event in events:
+                with self._lock:
+                    if stream.subscribers == 0:
+                        # Nobody is reading; new callers start a fresh stream
+                        del self._streams[key]
+                        break
+                with stream.cond:
+                    stream.events.append(event)
+                    stream.cond.notify_all()
+        except BaseException as e:
+            stream.error = e
+        finally:
+            if events is not None and hasattr(events, "close"):
+                events.close()
+            with self._lock:
+                if self._streams.get(key) is stream:
+                    del self._streams[key]
+            with stream.cond:
+                stream.finished = True
+                stream.cond.notify_all()
+
+    def _subscribe(self, stream, timeout):
+        """Yield a stream's events from the first, waiting for new ones"""
+        i = 0
+        try:
+            while True:
+                with stream.cond:
+                    if not stream.cond.wait_for(lambda: i < len(stream.events) or stream.finished, timeout):
+                        raise TimeoutError(f"No stream event within {timeout}s")
+                    if i < len(stream.events):
+                        event = stream.events[i]
+                    elif stream.error is not None:
+                        raise stream.error
+                    else:
+                        return
+                i += 1
+                yield event
+        finally:
+            with self._lock:
+                stream.subscribers -= 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls) + len(self._streams)
+        return stats
@@ -0,0 +1,172 @@
+// Answers arrive as server-rendered, sanitized HTML ("html"); raw markdown
+// is only shown as plain text while a streamed answer is still arriving.
+function renderAnswer(responseDiv, html) {
+    responseDiv.innerHTML = `<strong>Answer:</strong><br><br>${html}`;
+}
+
+function renderPlainAnswer(responseDiv, content) {
+    responseDiv.innerHTML = '<strong>Answer:</strong><br><br>';
+    const text = document.createElement('div');
+    text.className = 'answer-text';
+    text.textContent = content;
+    responseDiv.appendChild(text);
+}
+
+function renderCitations(refsDiv, citations) {
+    if (!citations || citations.length === 0) {
+        return;
+    }
+    refsDiv.style.display = 'block';
+    refsDiv.innerHTML = '<h3>References:</h3>';
+
+    citations.forEach((c, i) => {
+        const div = document.createElement('div');
+        div.className = 'citation-item';
+        const a = document.createElement('a');
+        a.href = c.url;
+        a.target = '_blank';
+        a.textContent = `Reference ${i+1}: ${c.file} (Page ${c.page})`;
+        div.appendChild(a);
+        refsDiv.appendChild(div);
+    });
+}
+
+async function askOnce(prompt, responseDiv, refsDiv) {
+    const res = await fetch('/ask', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({
+            prompt,
+            html: true,
+            compact: true,
+            fields: 'html,citations.file,citations.page,citations.url'
+        })
+    });
+
+    if (!res.ok) {
+        throw new Error(`HTTP error! status: ${res.status}`);
+    }
+
+    const data = await res.json();
+    if (data.html) {
+        renderAnswer(responseDiv, data.html);
+    } else {
+        renderPlainAnswer(responseDiv, data.content || '');
+    }
+    renderCitations(refsDiv, data.citations);
+}
+
+async function askStreaming(prompt, responseDiv, refsDiv) {
+    const res = await fetch('/ask/stream', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({prompt, html: true})
+    });
+
+    if (!res.ok || !res.body) {
+        throw new Error(`HTTP error! status: ${res.status}`);
+    }
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    const citations = [];
+    let buffer = '';
+    let content = '';
+    let html = null;
+    let renderPending = false;
+
+    // Re-render at most once per animation frame while tokens arrive
+    const scheduleRender = () => {
+        if (renderPending) return;
+        renderPending = true;
+        requestAnimationFrame(() => {
+            renderPending = false;
+            renderPlainAnswer(responseDiv, content);
+        });
+    };
+
+    while (true) {
+        const {value, done} = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, {stream: true});
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const message = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            message.split('\n').forEach(line => {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+            if (!data) continue;
+            const payload = JSON.parse(data);
+
+            if (event === 'token') {
+                content += payload.content;
+                scheduleRender();
+            } else if (event === 'citation') {
+                citations.push(payload);
+            } else if (event === 'done') {
+                html = payload.html || null;
+            } else if (event === 'error') {
+                throw new Error(payload.error || 'Streaming failed');
+            }
+        }
+    }
+
+    if (html) {
+        renderAnswer(responseDiv, html);
+    } else {
+        renderPlainAnswer(responseDiv, content);
+    }
+    renderCitations(refsDiv, citations);
+}
+
+async function ask() {
+    const prompt = document.getElementById('prompt').value.trim();
+    if (!prompt) {
+        alert('Please enter a question');
+        return;
+    }
+
+    const button = document.getElementById('askButton');
+    const responseDiv = document.getElementById('response');
+    const refsDiv = document.getElementById('refs');
+
+    // Show loading state
+    button.disabled = true;
+    button.textContent = 'Processing...';
+    responseDiv.style.display = 'block';
+    responseDiv.innerHTML = '<div class="loading">Processing your question...</div>';
+    refsDiv.style.display = 'none';
+
+    try {
+        if (window.ReadableStream && window.TextDecoder) {
+            try {
+                await askStreaming(prompt, responseDiv, refsDiv);
+            } catch (streamError) {
+                console.warn('Streaming failed, retrying without streaming:', streamError);
+                await askOnce(prompt, responseDiv, refsDiv);
+            }
+        } else {
+            await askOnce(prompt, responseDiv, refsDiv);
+        }
+    } catch (error) {
+        responseDiv.innerHTML = `<strong>Error:</strong> ${error.message}`;
+        console.error('Error:', error);
+    } finally {
+        // Reset button state
+        button.disabled = false;
+        button.textContent = 'Ask Question';
+    }
+}
+
+// Allow Enter key to submit
+document.getElementById('prompt').addEventListener('keydown', function(e) {
+    if (e.key === 'Enter' && e.ctrlKey) {
+        ask();
+    }
+});
@@ -0,0 +1,158 @@
+"""
+Fingerprinted, precompressed static assets for the home page
+
+The page shell (static/index.html) references its stylesheet and script
+through placeholders such as {{ url:app.css }}. At startup every asset is
+read once, named after a digest of its content (app.3f2a9c1d0b7e4a65.css)
+and compressed with gzip and, when their packages are installed, brotli
+and zstd. Requests then only pick the best stored encoding; nothing is
+rendered or compressed per request.
+
+Fingerprinted assets never change under the same URL, so they are served
+with a year-long immutable Cache-Control. The page shell keeps its URL and
+is revalidated on every visit, which is cheap with its strong ETag. Both
+carry no-transform, so the API's response compressor (and any proxy) never
+re-encodes them behind the per-encoding ETags.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable, no-transform"
+REVALIDATE_CACHE_CONTROL = "no-cache, no-transform"
+
+# Preferred order when the client accepts several encodings equally
+ENCODING_PREFERENCE = ("zstd", "br", "gzip", "identity")
+
+PLACEHOLDER = re.compile(r"\{\{\s*url:([\w.-]+)\s*\}\}")
+
+
+def available_encodings():
+    """Content encodings this process can precompress with"""
+    return tuple(encoding for encoding, module in (("zstd", zstandard), ("br", brotli), ("gzip", gzip))
+                 if module is not None)
+
+
+class StaticAsset:
+    """
+    One static file held in memory in every encoding worth serving
+
+    Args:
+        body (bytes): Uncompressed content
+        content_type (str): Content-Type header value
+        cache_control (str): Cache-Control header value
+        min_compress_bytes (int): Bodies smaller than this are not compressed
+    """
+
+    def __init__(self, body, content_type, cache_control, min_compress_bytes=256):
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.bodies = {"identity": body}
+
+        if len(body) >= min_compress_bytes:
+            compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                compressed["br"] = brotli.compress(body, quality=11)
+            if zstandard is not None:
+                compressed["zstd"] = zstandard.ZstdCompressor(level=19).compress(body)
+            for encoding, data in compressed.items():
+                # Only keep encodings that actually save bytes
+                if len(data) < len(body):
+                    self.bodies[encoding] = data
+
+    def etag(self, encoding):
+        """Strong validator, distinct per encoding since the bytes differ"""
+        if encoding == "identity":
+            return self.digest
+        return f"{self.digest}-{encoding}"
+
+    def select_encoding(self, accept_encodings):
+        """
+        Pick the stored encoding the client prefers
+
+        Args:
+            accept_encodings: werkzeug Accept object for Accept-Encoding
+
+        Returns:
+            str: "zstd", "br", "gzip" or "identity"
+        """
+        best = "identity"
+        best_quality = 0
+        for encoding in ENCODING_PREFERENCE:
+            if encoding not in self.bodies:
+                continue
+            if encoding == "identity":
+                quality = 1 if not accept_encodings or "identity" not in accept_encodings \
+                    else accept_encodings["identity"]
+            else:
+                quality = accept_encodings[encoding]
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def sizes(self):
+        return {encoding: len(body) for encoding, body in self.bodies.items()}
+
+
+class AssetBundle:
+    """
+    The home page shell plus the fingerprinted files it references
+
+    Args:
+        static_dir (str): Directory holding the page shell and its assets
+        url_prefix (str): URL path the fingerprinted assets are served under
+        index_name (str): File name of the page shell
+    """
+
+    def __init__(self, static_dir, url_prefix="/assets", index_name="index.html"):
+        self.static_dir = static_dir
+        self.url_prefix = url_prefix.rstrip("/")
+
+        with open(os.path.join(static_dir, index_name), encoding="utf-8") as f:
+            shell = f.read()
+
+        self.assets = {}
+        self.urls = {}
+        for name in sorted(set(PLACEHOLDER.findall(shell))):
+            with open(os.path.join(static_dir, name), "rb") as f:
+                body = f.read()
+            asset = StaticAsset(body, self._content_type(name), IMMUTABLE_CACHE_CONTROL)
+            stem, ext = os.path.splitext(name)
+            fingerprinted = f"{stem}.{asset.digest}{ext}"
+            self.assets[fingerprinted] = asset
+            self.urls[name] = f"{self.url_prefix}/{fingerprinted}"
+
+        html = PLACEHOLDER.sub(lambda m: self.urls[m.group(1)], shell)
+        self.index = StaticAsset(html.encode("utf-8"), "text/html; charset=utf-8", REVALIDATE_CACHE_CONTROL)
+
+    def get(self, fingerprinted_name):
+        """Return the asset served under this file name, or None"""
+        return self.assets.get(fingerprinted_name)
+
+    def stats(self):
+        return {
+            "encodings": list(available_encodings()),
+            "index": self.index.sizes(),
+            "assets": {url: self.assets[url.rsplit("/", 1)[1]].sizes() for url in self.urls.values()}
+        }
+
+    @staticmethod
+    def _content_type(name):
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type.endswith("javascript"):
+            content_type += "; charset=utf-8"
+        return content_type
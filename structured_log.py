@@ -0,0 +1,196 @@
+"""
+Non-blocking, sampled structured (JSON) logging
+
+Request threads only format a small dict and put it on an in-memory
+queue; a background listener thread serializes the records and writes
+them to stdout. If the log drain falls behind and the queue fills up,
+records are dropped and counted instead of blocking requests.
+
+Configuration (environment):
+    LOG_LEVEL            Minimum level (default INFO)
+    LOG_SAMPLE_RATES     Per-event sampling, e.g. "mcp.request=0.1,ask.start=0.25"
+    LOG_MAX_FIELD_CHARS  Truncate string fields beyond this length (default 500)
+    LOG_QUEUE_SIZE       Maximum queued records before dropping (default 10000)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+LOGGER_NAME = "vb"
+
+logger = logging.getLogger(LOGGER_NAME)
+
+# Skip per-record lookups the JSON format does not use
+logging.logThreads = False
+logging.logMultiprocessing = False
+
+_sample_rates = {}
+_max_field_chars = 500
+_listener = None
+_handler = None
+_stream = None
+_lock = threading.Lock()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: records are dropped when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Formatting happens on the listener thread, not the request thread
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, event, pid, plus event fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "event": record.getMessage(),
+            "pid": record.process
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def parse_sample_rates(spec):
+    """Parse "event=rate,event=rate" into a dict"""
+    rates = {}
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        event, rate = item.split("=", 1)
+        try:
+            rates[event.strip()] = max(0.0, min(1.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+def configure_logging(stream=None, level=None, sample_rates=None, max_field_chars=None, queue_size=None):
+    """
+    Install the queue-backed JSON handler on the "vb" logger
+
+    Arguments override the corresponding environment variables. Calling
+    this again replaces the previous configuration.
+    """
+    global _listener, _handler, _stream, _sample_rates, _max_field_chars
+
+    with _lock:
+        if _listener is not None:
+            if _listener._thread is not None:
+                _listener.stop()
+            logger.removeHandler(_handler)
+
+        _stream = stream or sys.stdout
+        _sample_rates = sample_rates if sample_rates is not None else parse_sample_rates(os.getenv("LOG_SAMPLE_RATES"))
+        _max_field_chars = max_field_chars or int(os.getenv("LOG_MAX_FIELD_CHARS", "500"))
+
+        output = logging.StreamHandler(_stream)
+        output.setFormatter(JsonFormatter())
+
+        log_queue = queue.Queue(maxsize=queue_size or int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+        _handler = DroppingQueueHandler(log_queue)
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+
+        logger.addHandler(_handler)
+        logger.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+        logger.propagate = False
+        _listener.start()
+
+
+def _stop_listener():
+    # Drain queued records before the interpreter exits
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+atexit.register(_stop_listener)
+
+
+def _restart_after_fork():
+    # The listener thread does not survive fork (e.g. gunicorn --preload)
+    if _listener is not None:
+        configure_logging(stream=_stream, sample_rates=_sample_rates, max_field_chars=_max_field_chars)
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def truncate(value, limit=None):
+    """Shorten long strings, noting how much was cut"""
+    limit = limit or _max_field_chars
+    if isinstance(value, str) and len(value) > limit:
+        return f"{value[:limit]}...[{len(value) - limit} more chars]"
+    return value
+
+
+def log_event(event, level=logging.INFO, exc_info=None, **fields):
+    """
+    Log a structured event
+
+    Args:
+        event (str): Dotted event name, e.g. "mcp.response"
+        level (int): logging level
+        exc_info: Passed through to logging for tracebacks
+        **fields: Extra JSON fields; long strings are truncated
+    """
+    if not logger.isEnabledFor(level):
+        return
+    rate = _sample_rates.get(event)
+    if rate is not None and rate < 1.0 and random.random() >= rate:
+        return
+    if rate is not None and rate < 1.0:
+        fields["sample_rate"] = rate
+    fields = {key: truncate(value) for key, value in fields.items()}
+    if exc_info is True:
+        exc_info = sys.exc_info()
+    # makeRecord skips logger.log's stack walk to find the caller
+    record = logger.makeRecord(logger.name, level, "", 0, event, None, exc_info, extra={"fields": fields})
+    logger.handle(record)
+
+
+def stats():
+    """Queue depth and dropped-record count for /health"""
+    if _handler is None:
+        return None
+    return {
+        "queued": _handler.queue.qsize(),
+        "dropped": _handler.dropped,
+        "level": logging.getLevelName(logger.level),
+        "sample_rates": dict(_sample_rates)
+    }
+
+
+def flush(timeout=5.0):
+    """Wait until queued records have been written (used at exit and in benchmarks)"""
+    if _handler is None:
+        return
+    deadline = time.monotonic() + timeout
+    while _handler.queue.qsize() and time.monotonic() < deadline:
+        time.sleep(0.001)
+    _stream.flush()
+
+
+configure_logging()
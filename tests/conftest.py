@@ -0,0 +1,71 @@
+"""
+Shared fixtures: a fake MCP server and the Flask app wired to it
+
+app.py reads its configuration from the environment at import time, so the
+environment is set here, before any test module imports it. Background work
+(Pinecone warm-up, probes, hedging, the semantic cache) is switched off, and
+each test gets fresh resilience components through the app fixture.
+"""
+
+import os
+import tempfile
+import uuid
+
+import pytest
+
+import fake_mcp_server
+
+FAKE_CONFIG = dict(latency_ms=20, latency_dist="fixed", content_words=30, citations=2, citation_words=10, seed=7)
+
+fake_mcp = fake_mcp_server.start(fake_mcp_server.FakeMCPConfig(**FAKE_CONFIG))
+state_dir = tempfile.mkdtemp(prefix="vb-tests-")
+
+os.environ.update({
+    "MCP_SERVER_URL": f"http://127.0.0.1:{fake_mcp.server_port}{fake_mcp_server.PREFIX}",
+    # A dummy key, so env.txt never supplies the real one
+    "PINECONE_API_KEY": "test-key",
+    "PINECONE_WARMUP": "false",
+    "PROBE_ENABLED": "false",
+    "PROBE_LOCK_PATH": os.path.join(state_dir, "probe.lock"),
+    "PROBE_STATE_PATH": os.path.join(state_dir, "probe.json"),
+    "MCP_HEDGE_ENABLED": "false",
+    "SEMANTIC_CACHE_BACKEND": "off",
+    "MCP_RATE_LIMIT_PATH": os.path.join(state_dir, "ratelimit.bin"),
+    "MCP_TIMEOUT": "10"
+})
+
+import app as vb_app  # noqa: E402  (needs the environment above)
+from circuit_breaker import CircuitBreaker  # noqa: E402
+
+
+@pytest.fixture
+def fake():
+    """The running fake MCP server's FakeMCP, reset to a fast, healthy config"""
+    fake_mcp.fake.config = fake_mcp_server.FakeMCPConfig(**FAKE_CONFIG)
+    yield fake_mcp.fake
+    fake_mcp.fake.config = fake_mcp_server.FakeMCPConfig(**FAKE_CONFIG)
+
+
+@pytest.fixture
+def app(fake, monkeypatch):
+    """
+    The app module with a fresh circuit breaker (threshold 3) and no retries,
+    rate limiting or admission control; tests install the ones they exercise
+    """
+    monkeypatch.setattr(vb_app, "mcp_breaker", CircuitBreaker(failure_threshold=3, recovery_timeout=30))
+    monkeypatch.setattr(vb_app, "mcp_retry_policy", None)
+    monkeypatch.setattr(vb_app, "mcp_rate_limiter", None)
+    monkeypatch.setattr(vb_app, "admission", None)
+    vb_app.answer_cache.clear()
+    return vb_app
+
+
+@pytest.fixture
+def client(app):
+    return app.app.test_client()
+
+
+@pytest.fixture
+def prompt():
+    """A prompt no other test has asked, so caches and coalescing stay out of the way"""
+    return f"What benefits apply to claim {uuid.uuid4().hex[:8]}?"
@@ -0,0 +1,110 @@
+"""
+The exact-match answer cache: keys, LRU eviction, TTL and stale-while-revalidate
+"""
+
+import threading
+import time
+
+from answer_cache import AnswerCache
+
+
+def test_keys_ignore_case_whitespace_and_trailing_punctuation():
+    key = AnswerCache.make_key("How do I apply?")
+    assert AnswerCache.make_key("  how do  I APPLY ") == key
+    assert AnswerCache.make_key("How do I apply?", {"temperature": 0}) != key
+    assert AnswerCache.make_key("How do I apply?", namespace="mcp_chat") != key
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AnswerCache(max_entries=2)
+    cache.set("a", {"content": "a"})
+    cache.set("b", {"content": "b"})
+    assert cache.get("a") == ({"content": "a"}, False)
+    cache.set("c", {"content": "c"})
+
+    assert cache.get("b") == (None, False)
+    assert cache.get("a")[0] == {"content": "a"}
+    assert cache.get("c")[0] == {"content": "c"}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_size_bound_evicts_and_oversized_answers_are_skipped():
+    cache = AnswerCache(max_entries=10, max_bytes=60)
+    cache.set("a", {"content": "x" * 20})
+    cache.set("b", {"content": "y" * 20})
+    assert cache.get("a") == (None, False)
+    assert cache.stats()["bytes"] <= 60
+
+    cache.set("huge", {"content": "z" * 100})
+    assert cache.get("huge") == (None, False)
+    assert cache.get("b")[0] == {"content": "y" * 20}
+
+
+def test_entries_go_stale_then_expire():
+    cache = AnswerCache(ttl=0.05, stale_ttl=0.05)
+    cache.set("k", {"content": "answer"})
+    assert cache.get("k") == ({"content": "answer"}, False)
+    time.sleep(0.06)
+    assert cache.get("k") == ({"content": "answer"}, True)
+    time.sleep(0.06)
+    assert cache.get("k") == (None, False)
+    stats = cache.stats()
+    assert (stats["hits"], stats["stale_hits"], stats["expirations"]) == (1, 1, 1)
+
+
+def test_stale_entry_is_refreshed_once_in_the_background():
+    cache = AnswerCache(ttl=0.01, stale_ttl=10)
+    cache.set("k", {"content": "old"})
+    time.sleep(0.02)
+    release = threading.Event()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        release.wait(1)
+        return {"content": "new"}
+
+    cache.refresh("k", loader)
+    cache.refresh("k", loader)
+    assert cache.get("k") == ({"content": "old"}, True)
+    release.set()
+    deadline = time.monotonic() + 1
+    while cache.stats()["refreshes"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+    assert loads == [1]
+    assert cache.get("k") == ({"content": "new"}, False)
+
+
+def test_failed_refresh_keeps_the_stale_entry():
+    cache = AnswerCache(ttl=0.01, stale_ttl=10)
+    cache.set("k", {"content": "old"})
+    time.sleep(0.02)
+    cache.refresh("k", lambda: None)
+    deadline = time.monotonic() + 1
+    while cache.stats()["refresh_failures"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert cache.get("k") == ({"content": "old"}, True)
+
+
+def test_zero_entries_disables_the_cache():
+    cache = AnswerCache(max_entries=0)
+    cache.set("k", {"content": "answer"})
+    assert cache.get("k") == (None, False)
+
+
+def test_routes_serve_stale_answers_and_refresh_them(app, client, fake, monkeypatch, prompt):
+    monkeypatch.setattr(app, "answer_cache", AnswerCache(ttl=0.05, stale_ttl=10))
+    assert client.post("/mcp/chat", json={"prompt": prompt}).get_json()["metadata"]["cached"] is False
+    time.sleep(0.06)
+
+    calls = fake.stats()["calls"]
+    stale = client.post("/mcp/chat", json={"prompt": prompt}).get_json()
+    assert stale["metadata"]["cache_state"] == "stale"
+    deadline = time.monotonic() + 2
+    while app.answer_cache.stats()["refreshes"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert fake.stats()["calls"] == calls + 1
+
+    fresh = client.post("/mcp/chat", json={"prompt": prompt}).get_json()
+    assert fresh["metadata"]["cache_state"] == "fresh"
@@ -0,0 +1,317 @@
+"""
+The resilience components wired into app.py, driven through the Flask routes
+against the fake MCP server
+"""
+
+import os
+import runpy
+import threading
+import time
+from types import SimpleNamespace
+
+from admission import AdaptiveConcurrencyLimit
+from circuit_breaker import CircuitBreaker
+from rate_limiter import SharedTokenBucket
+from retry_policy import RetryPolicy
+
+
+def chat(client, prompt, deadline_ms=None):
+    headers = {"X-Request-Deadline-Ms": str(deadline_ms)} if deadline_ms else {}
+    return client.post("/mcp/chat", json={"prompt": prompt}, headers=headers)
+
+
+def test_mcp_chat_answers_and_caches(client, fake, prompt):
+    response = chat(client, prompt)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["source"] == "mcp_server_advanced"
+    assert prompt in body["content"]
+    assert len(body["citations"]) == 2
+    assert body["metadata"]["cached"] is False
+
+    calls = fake.stats()["calls"]
+    again = chat(client, prompt).get_json()
+    assert again["metadata"]["cached"] is True
+    assert fake.stats()["calls"] == calls
+
+
+def test_upstream_errors_open_the_breaker(app, client, fake, prompt):
+    fake.config.error_rate = 1.0
+    for i in range(3):
+        response = chat(client, f"{prompt} {i}")
+        assert response.status_code == 500
+        assert response.get_json()["code"] in (500, 502, 503)
+    assert app.mcp_breaker.state == "open"
+
+    calls = fake.stats()["calls"]
+    response = chat(client, f"{prompt} open")
+    assert response.get_json()["code"] == "circuit_open"
+    assert fake.stats()["calls"] == calls
+
+
+def test_retries_stop_at_max_retries(app, client, fake, monkeypatch, prompt):
+    monkeypatch.setattr(app, "mcp_retry_policy", RetryPolicy(max_retries=2, base_delay=0.001, retryable=(500, 502, 503)))
+    fake.config.error_rate = 1.0
+    calls = fake.stats()["calls"]
+    assert chat(client, prompt).status_code == 500
+    assert fake.stats()["calls"] - calls == 3
+    assert app.mcp_retry_policy.stats()["retries"] == 2
+
+
+def test_retry_recovers_from_transient_failure(app, client, fake, monkeypatch, prompt):
+    monkeypatch.setattr(app, "mcp_retry_policy", RetryPolicy(max_retries=2, base_delay=0.001))
+    fake.config.rate_429 = 1.0
+    fake.config.retry_after = 0
+
+    # Heal the upstream as soon as the first attempt has failed
+    original = app.mcp_client.chat
+
+    def chat_once_then_heal(*args, **kwargs):
+        result = original(*args, **kwargs)
+        fake.config.rate_429 = 0.0
+        return result
+
+    monkeypatch.setattr(app.mcp_client, "chat", chat_once_then_heal)
+    response = chat(client, prompt)
+    assert response.status_code == 200
+    assert response.get_json()["metadata"]["retries"] == 1
+
+
+def test_429_throttles_the_rate_limiter(app, client, fake, monkeypatch, tmp_path, prompt):
+    limiter = SharedTokenBucket(rate=10, burst=5, path=str(tmp_path / "bucket"))
+    monkeypatch.setattr(app, "mcp_rate_limiter", limiter)
+    fake.config.rate_429 = 1.0
+    fake.config.retry_after = 1
+
+    response = chat(client, prompt)
+    assert response.get_json()["code"] == 429
+    stats = limiter.stats()
+    assert stats["throttled"] == 1
+    assert stats["rate"] == 5
+    assert stats["blocked_for_s"] > 0.5
+    assert app.mcp_breaker.state == "closed"
+
+    # Blocked past this request's deadline: rejected without calling upstream
+    calls = fake.stats()["calls"]
+    response = chat(client, f"{prompt} again", deadline_ms=300)
+    assert response.status_code == 429
+    assert response.get_json()["code"] == "rate_limited"
+    assert fake.stats()["calls"] == calls
+
+
+def test_admission_sheds_excess_requests(app, fake, monkeypatch, prompt):
+    monkeypatch.setattr(app, "admission", AdaptiveConcurrencyLimit(initial_limit=1, min_limit=1, max_limit=1))
+    fake.config.latency_ms = 300
+    responses = []
+
+    def ask(i):
+        responses.append(chat(app.app.test_client(), f"{prompt} {i}"))
+
+    threads = [threading.Thread(target=ask, args=(i,)) for i in range(2)]
+    threads[0].start()
+    time.sleep(0.1)
+    threads[1].start()
+    for t in threads:
+        t.join(5)
+
+    assert sorted(r.status_code for r in responses) == [200, 503]
+    shed = next(r for r in responses if r.status_code == 503)
+    assert shed.get_json()["code"] == "overloaded"
+    assert shed.headers["Retry-After"] == "2"
+    assert app.admission.stats()["in_flight"] == 0
+
+
+def test_admission_sheds_a_second_concurrent_stream(app, client, monkeypatch, prompt):
+    monkeypatch.setattr(app, "admission", AdaptiveConcurrencyLimit(initial_limit=1, min_limit=1, max_limit=1))
+    first = client.post("/ask/stream", json={"prompt": prompt}, buffered=False)
+    assert first.status_code == 200
+
+    shed = client.post("/ask/stream", json={"prompt": f"{prompt} again"})
+    assert shed.status_code == 503
+    assert shed.get_json()["code"] == "overloaded"
+    assert shed.headers["Retry-After"] == "2"
+
+    # The slot is held until the stream has been read to the end
+    assert app.admission.stats()["in_flight"] == 1
+    assert "event: done" in first.get_data(as_text=True)
+    first.close()
+    assert app.admission.stats()["in_flight"] == 0
+
+    # Closed without reading: released when the response is closed
+    unread = client.post("/ask/stream", json={"prompt": f"{prompt} unread"}, buffered=False)
+    unread.close()
+    assert app.admission.stats()["in_flight"] == 0
+
+
+def stream_events(response):
+    return [block.split("\n", 1)[0][len("event: "):] for block in response.get_data(as_text=True).split("\n\n") if block]
+
+
+def test_stream_longer_than_the_deadline_is_not_cut_off(client, fake, prompt):
+    # 1.2 s in all, but the first chunk comes after 0.4 s and the rest 0.1 s apart
+    fake.config.latency_ms = 1200
+    fake.config.content_words = 200
+    response = client.post("/ask/stream", json={"prompt": prompt}, headers={"X-Request-Deadline-Ms": "1000"})
+    events = stream_events(response)
+    assert events.count("token") >= 10
+    assert events[-1] == "done"
+
+
+def test_stream_that_stalls_before_its_first_chunk_ends_within_the_deadline(client, fake, prompt):
+    fake.config.latency_ms = 3000
+    start = time.monotonic()
+    response = client.post("/ask/stream", json={"prompt": prompt}, headers={"X-Request-Deadline-Ms": "1000"})
+    events = stream_events(response)
+    assert time.monotonic() - start < 1.5
+    assert events == ["error"]
+
+
+def test_concurrent_identical_streams_share_one_upstream_stream(app, fake, prompt):
+    fake.config.latency_ms = 400
+    calls = fake.stats()["calls"]
+    bodies = []
+
+    def ask():
+        bodies.append(app.app.test_client().post("/ask/stream", json={"prompt": prompt}).get_data(as_text=True))
+
+    threads = [threading.Thread(target=ask) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+
+    assert fake.stats()["calls"] == calls + 1
+    tokens = [body.split("event: done")[0] for body in bodies]
+    assert tokens[0] == tokens[1] == tokens[2]
+    assert sum('"coalesced":true' in body for body in bodies) == 2
+
+
+def test_stream_fallbacks_are_coalesced(app, fake, monkeypatch, prompt):
+    fake.config.error_rate = 1.0
+    sdk_calls = []
+
+    def sdk_answer(prompt, deadline=None):
+        sdk_calls.append(prompt)
+        time.sleep(0.3)
+        return {"content": "From the SDK", "citations": [], "source": "pinecone_sdk"}, 200
+
+    monkeypatch.setattr(app, "sdk_answer", sdk_answer)
+    bodies = []
+
+    def ask():
+        bodies.append(app.app.test_client().post("/ask/stream", json={"prompt": prompt}).get_data(as_text=True))
+
+    threads = [threading.Thread(target=ask) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+
+    assert sdk_calls == [prompt]
+    assert all("From the SDK" in body and "event: done" in body for body in bodies)
+
+
+def test_batch_items_count_against_admission(app, client, fake, monkeypatch, prompt):
+    monkeypatch.setattr(app, "admission", AdaptiveConcurrencyLimit(initial_limit=2, min_limit=2, max_limit=2))
+    response = client.post("/ask/batch", json={"prompts": [f"{prompt} {i}" for i in range(4)], "concurrency": 8})
+    body = response.get_json()
+    assert body["concurrency"] == 2
+    assert body["succeeded"] == 4
+    assert app.admission.stats()["admitted"] == 4
+
+
+def test_request_deadline_bounds_the_mcp_call(client, fake, prompt):
+    fake.config.latency_ms = 2000
+    start = time.monotonic()
+    response = chat(client, prompt, deadline_ms=300)
+    assert time.monotonic() - start < 1
+    assert response.status_code == 504
+    assert response.get_json()["code"] == "deadline_exceeded"
+
+
+def test_timeouts_under_the_default_deadline_open_the_breaker(app, client, fake, monkeypatch, prompt):
+    # The upstream is slower than the server's own default deadline allows
+    monkeypatch.setattr(app, "DEADLINE_DEFAULT_MS", 400)
+    fake.config.latency_ms = 1500
+    for i in range(3):
+        assert chat(client, f"{prompt} {i}").status_code == 504
+    assert app.mcp_breaker.state == "open"
+
+
+def test_timeouts_under_a_shortened_client_deadline_do_not(app, client, fake, prompt):
+    fake.config.latency_ms = 1500
+    for i in range(4):
+        assert chat(client, f"{prompt} {i}", deadline_ms=400).status_code == 504
+    stats = app.mcp_breaker.stats()
+    assert stats["state"] == "closed"
+    assert stats["consecutive_failures"] == 0
+
+
+def half_open_breaker(app, monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    monkeypatch.setattr(app, "mcp_breaker", breaker)
+    return breaker
+
+
+def test_stream_closed_early_is_not_a_success(app, fake, monkeypatch, tmp_path, prompt):
+    breaker = half_open_breaker(app, monkeypatch)
+    limiter = SharedTokenBucket(rate=10, recovery_step=1, path=str(tmp_path / "bucket"))
+    limiter.on_throttled()
+    monkeypatch.setattr(app, "mcp_rate_limiter", limiter)
+    upstream = []
+    monkeypatch.setattr(app.metrics, "record_upstream", lambda result, seconds: upstream.append(result))
+
+    chunks = app.stream_mcp_server(prompt)
+    assert next(chunks)["type"] == "message_start"
+    chunks.close()
+
+    # Like release(): the trial slot is free again, but nothing was learned
+    assert breaker.state == "half_open"
+    assert breaker.allow_request()
+    assert limiter.stats()["rate"] == 5
+    assert upstream == []
+
+
+def test_stream_read_to_the_end_is_a_success(app, fake, monkeypatch, tmp_path, prompt):
+    breaker = half_open_breaker(app, monkeypatch)
+    limiter = SharedTokenBucket(rate=10, recovery_step=1, path=str(tmp_path / "bucket"))
+    limiter.on_throttled()
+    monkeypatch.setattr(app, "mcp_rate_limiter", limiter)
+
+    chunks = list(app.stream_mcp_server(prompt))
+    assert chunks[-1]["type"] == "message_end"
+    assert breaker.state == "closed"
+    assert limiter.stats()["rate"] == 6
+
+
+def test_zero_timeout_fails_without_calling_upstream(app, fake, prompt):
+    calls = fake.stats()["calls"]
+    assert app.mcp_client.chat(prompt, timeout=0)["code"] == "timeout"
+    assert list(app.mcp_client.stream_chat(prompt, timeout=0))[0]["code"] == "timeout"
+    assert fake.stats()["calls"] == calls
+
+
+def test_mcp_test_with_no_time_left_is_a_deadline_error(client, fake, prompt):
+    calls = fake.stats()["calls"]
+    # Less than the parse reserve: nothing is left for the MCP call
+    response = client.post("/mcp/test", json={"prompt": prompt}, headers={"X-Request-Deadline-Ms": "100"})
+    assert response.status_code == 504
+    assert response.get_json()["code"] == "deadline_exceeded"
+    assert fake.stats()["calls"] == calls
+
+
+def test_gunicorn_workers_size_admission_below_their_threads(app, monkeypatch):
+    monkeypatch.setattr(app, "admission", AdaptiveConcurrencyLimit(initial_limit=20, min_limit=2, max_limit=100))
+    config = runpy.run_path(os.path.join(os.path.dirname(app.__file__), "gunicorn.conf.py"))
+    assert config["worker_class"] == "gthread"
+    assert config["threads"] > 1
+
+    config["post_worker_init"](SimpleNamespace(cfg=SimpleNamespace(threads=8)))
+    assert app.admission.max_limit == 8 - app.ADMISSION_RESERVED_THREADS
+    assert app.admission.limit == 8 - app.ADMISSION_RESERVED_THREADS
+
+    # A single-threaded (sync) worker cannot shed; the limit is left alone
+    app.size_admission(1)
+    assert app.admission.limit == 8 - app.ADMISSION_RESERVED_THREADS
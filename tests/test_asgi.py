@@ -0,0 +1,154 @@
+"""
+The ASGI variant served against the fake MCP server: deadlines and
+prober-backed status, matching app.py
+"""
+
+import threading
+import time
+
+import pytest
+from starlette.testclient import TestClient
+
+import asgi_app
+from rate_limiter import SharedTokenBucket
+from retry_policy import RetryPolicy
+
+
+@pytest.fixture
+def asgi_client(app):
+    with TestClient(asgi_app.app) as client:
+        yield client
+
+
+def test_mcp_chat_answers(asgi_client, prompt):
+    response = asgi_client.post("/mcp/chat", json={"prompt": prompt})
+    assert response.status_code == 200
+    assert response.json()["source"] == "mcp_server_advanced"
+
+
+@pytest.mark.parametrize("where", ["header", "options"])
+def test_mcp_chat_honours_the_request_deadline(asgi_client, fake, prompt, where):
+    fake.config.latency_ms = 2000
+    if where == "header":
+        kwargs = {"json": {"prompt": prompt}, "headers": {"X-Request-Deadline-Ms": "400"}}
+    else:
+        kwargs = {"json": {"prompt": prompt, "options": {"deadline_ms": 400}}}
+    start = time.monotonic()
+    response = asgi_client.post("/mcp/chat", **kwargs)
+    assert time.monotonic() - start < 1.5
+    assert response.status_code == 504
+    assert response.json()["code"] == "deadline_exceeded"
+
+
+def test_ask_fallback_stays_within_the_deadline(asgi_client, fake, prompt):
+    fake.config.latency_ms = 2000
+    start = time.monotonic()
+    response = asgi_client.post("/ask", json={"prompt": prompt}, headers={"X-Request-Deadline-Ms": "500"})
+    assert time.monotonic() - start < 1.5
+    assert response.status_code != 200
+
+
+def test_upstream_errors_open_the_shared_breaker(app, asgi_client, fake, prompt):
+    fake.config.error_rate = 1.0
+    for i in range(3):
+        assert asgi_client.post("/mcp/chat", json={"prompt": f"{prompt} {i}"}).status_code == 500
+    assert app.mcp_breaker.state == "open"
+
+    calls = fake.stats()["calls"]
+    response = asgi_client.post("/mcp/chat", json={"prompt": f"{prompt} open"})
+    assert response.json()["code"] == "circuit_open"
+    assert fake.stats()["calls"] == calls
+
+
+def test_retries_follow_the_shared_policy(app, asgi_client, fake, monkeypatch, prompt):
+    monkeypatch.setattr(app, "mcp_retry_policy", RetryPolicy(max_retries=2, base_delay=0.001, retryable=(500, 502, 503)))
+    fake.config.error_rate = 1.0
+    calls = fake.stats()["calls"]
+    assert asgi_client.post("/mcp/chat", json={"prompt": prompt}).status_code == 500
+    assert fake.stats()["calls"] - calls == 3
+
+
+def test_429_throttles_the_shared_rate_limiter(app, asgi_client, fake, monkeypatch, tmp_path, prompt):
+    limiter = SharedTokenBucket(rate=10, burst=5, path=str(tmp_path / "bucket"))
+    monkeypatch.setattr(app, "mcp_rate_limiter", limiter)
+    fake.config.rate_429 = 1.0
+    fake.config.retry_after = 1
+
+    assert asgi_client.post("/mcp/chat", json={"prompt": prompt}).json()["code"] == 429
+    assert limiter.stats()["throttled"] == 1
+    assert limiter.stats()["rate"] == 5
+
+    # Blocked past this request's deadline: rejected without calling upstream
+    calls = fake.stats()["calls"]
+    response = asgi_client.post("/mcp/chat", json={"prompt": f"{prompt} again"},
+                                headers={"X-Request-Deadline-Ms": "300"})
+    assert response.status_code == 429
+    assert response.json()["code"] == "rate_limited"
+    assert fake.stats()["calls"] == calls
+
+
+def test_concurrent_identical_prompts_share_one_call(asgi_client, fake, prompt):
+    fake.config.latency_ms = 300
+    calls = fake.stats()["calls"]
+    responses = []
+
+    def ask():
+        responses.append(asgi_client.post("/mcp/chat", json={"prompt": prompt}).json())
+
+    threads = [threading.Thread(target=ask) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+
+    assert fake.stats()["calls"] == calls + 1
+    assert all(body["success"] for body in responses)
+    assert sorted(bool(body["metadata"].get("coalesced")) for body in responses) == [False, True, True]
+
+
+class StubProber:
+    SNAPSHOT = {
+        "prober_pid": 1,
+        "interval": 60,
+        "checks": {
+            "mcp": {"ok": True, "checked_at": "2026-01-01T00:00:00+00:00", "latency_ms": 40.0,
+                    "detail": {"has_content": True, "has_citations": True, "has_metadata": True}},
+            "sdk": {"ok": False, "checked_at": "2026-01-01T00:00:00+00:00", "latency_ms": 1.0,
+                    "detail": {"error": "Pinecone SDK still initializing"}}
+        }
+    }
+
+    def snapshot(self):
+        return self.SNAPSHOT
+
+
+@pytest.mark.parametrize("server", ["asgi", "wsgi"])
+def test_mcp_status_is_served_from_the_prober(app, asgi_client, client, fake, monkeypatch, server):
+    monkeypatch.setattr(app, "upstream_prober", StubProber())
+    calls = fake.stats()["calls"]
+    response = (asgi_client if server == "asgi" else client).get("/mcp/status")
+    body = response.json() if server == "asgi" else response.get_json()
+    assert body["connection_test"] == "success"
+    assert body["last_test_time"] == "2026-01-01T00:00:00+00:00"
+    assert body["mcp_response_sample"]["has_content"] is True
+    assert body["probes"]["sdk"]["ok"] is False
+    assert fake.stats()["calls"] == calls
+
+
+def test_mcp_status_is_pending_before_the_first_probe(app, asgi_client, monkeypatch):
+    monkeypatch.setattr(app, "upstream_prober", None)
+    body = asgi_client.get("/mcp/status").json()
+    assert body["connection_test"] == "pending"
+    assert body["last_test_time"] is None
+
+
+def test_mcp_status_live_calls_upstream(asgi_client, fake):
+    calls = fake.stats()["calls"]
+    body = asgi_client.get("/mcp/status?live=true").json()
+    assert body["connection_test"] == "success"
+    assert fake.stats()["calls"] == calls + 1
+
+
+def test_health_reports_probes(app, asgi_client, monkeypatch):
+    monkeypatch.setattr(app, "upstream_prober", StubProber())
+    assert asgi_client.get("/health").json()["probes"] == StubProber.SNAPSHOT
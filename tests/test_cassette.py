@@ -0,0 +1,136 @@
+"""
+Upstream cassettes: record against the fake MCP server, then replay with no
+upstream calls
+"""
+
+import gzip
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from cassette import Cassette, CassetteMiss
+from mcp_client import MCPClient
+
+
+class Offline:
+    """Upstream stand-in that fails the test if a replay reaches it"""
+
+    timeout = 10
+
+    def chat(self, *args, **kwargs):
+        raise AssertionError("replay called the upstream")
+
+    stream_chat = chat
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cassettes" / "upstream.jsonl.gz")
+
+
+@pytest.fixture
+def mcp(fake):
+    client = MCPClient(os.environ["MCP_SERVER_URL"], "test-key", pool_size=2)
+    yield client
+    client.close()
+
+
+def test_mcp_chat_and_stream_round_trip(fake, mcp, path, prompt):
+    recorder = Cassette(path, mode="record").wrap_mcp_client(mcp)
+    recorded = recorder.chat(prompt, {"temperature": 0})
+    recorded_chunks = list(recorder.stream_chat(prompt))
+    assert recorded["success"] is True
+    assert recorder.cassette.stats()["recorded"] == 2
+
+    calls = fake.stats()["calls"]
+    replay = Cassette(path, mode="replay", speed="fast")
+    player = replay.wrap_mcp_client(Offline())
+    assert player.chat(prompt, {"temperature": 0}) == recorded
+    assert list(player.stream_chat(prompt)) == recorded_chunks
+    assert fake.stats()["calls"] == calls
+    assert replay.stats()["replayed"] == 2
+
+    # Options are part of the match
+    assert player.chat(prompt)["code"] == "cassette_miss"
+    assert list(player.stream_chat("never recorded")) == [
+        {"success": False, "error": "Not in cassette", "code": "cassette_miss",
+         "message": "No recorded upstream response for this request"}
+    ]
+    assert replay.stats()["misses"] == 2
+
+
+def test_repeated_requests_cycle_through_recordings(path):
+    cassette = Cassette(path, mode="record")
+    for n in (1, 2):
+        cassette.record("mcp_chat", "q", None, 0.01, response={"success": True, "n": n})
+
+    player = Cassette(path, mode="replay", speed="fast").wrap_mcp_client(Offline())
+    assert [player.chat("q")["n"] for _ in range(3)] == [1, 2, 1]
+
+
+def test_recorded_speed_honours_the_call_timeout(path):
+    cassette = Cassette(path, mode="record")
+    cassette.record("mcp_chat", "slow", None, 0.03, response={"success": True})
+    cassette.record("mcp_chat", "too slow", None, 5, response={"success": True})
+    cassette.record("mcp_stream", "stalls", None, 5, chunks=[[10, {"content": "a"}], [5000, {"content": "b"}]])
+
+    player = Cassette(path, mode="replay").wrap_mcp_client(Offline())
+    assert player.chat("slow") == {"success": True}
+    assert player.chat("too slow", timeout=0.02)["code"] == "timeout"
+    chunks = list(player.stream_chat("stalls", timeout=0.05))
+    assert chunks[0] == {"content": "a"}
+    assert chunks[1]["code"] == "timeout"
+
+
+def test_truncated_cassette_keeps_complete_interactions(path):
+    cassette = Cassette(path, mode="record")
+    cassette.record("mcp_chat", "kept", None, 0.01, response={"success": True})
+    with open(path, "ab") as f:
+        f.write(gzip.compress(b'{"kind": "mcp_chat", "key": "lost"}\n')[:12])
+
+    replay = Cassette(path, mode="replay", speed="fast")
+    assert replay.stats()["interactions"] == 1
+    assert replay.wrap_mcp_client(Offline()).chat("kept") == {"success": True}
+
+
+def test_sdk_assistant_round_trip(path):
+    class Assistant:
+        def chat(self, messages, **kwargs):
+            return SimpleNamespace(
+                message=SimpleNamespace(content=f"SDK answer to {messages[-1]['content']}"),
+                citations=[SimpleNamespace(references=[SimpleNamespace(pages=[3], _private="x")])]
+            )
+
+    messages = [{"role": "user", "content": "How do I appeal?"}]
+    recorded = Cassette(path, mode="record").wrap_assistant(Assistant()).chat(messages=messages)
+
+    player = Cassette(path, mode="replay", speed="fast").wrap_assistant(None)
+    replayed = player.chat(messages=messages)
+    assert replayed.message.content == recorded.message.content
+    assert replayed.citations[0].references[0].pages == [3]
+    assert not hasattr(replayed.citations[0].references[0], "_private")
+    with pytest.raises(CassetteMiss):
+        player.chat(messages=[{"role": "user", "content": "Something else"}])
+
+
+def test_invalid_mode_or_speed_is_rejected(path):
+    with pytest.raises(ValueError):
+        Cassette(path, mode="rewind")
+    with pytest.raises(ValueError):
+        Cassette(path, speed="slow")
+
+
+def test_app_replays_a_recorded_answer_with_the_upstream_down(app, client, fake, monkeypatch, path, prompt):
+    monkeypatch.setattr(app, "mcp_client", Cassette(path, mode="record").wrap_mcp_client(app.mcp_client))
+    recorded = client.post("/mcp/chat", json={"prompt": prompt}).get_json()
+    assert recorded["success"] is True
+
+    app.answer_cache.clear()
+    fake.config.error_rate = 1.0
+    calls = fake.stats()["calls"]
+    monkeypatch.setattr(app, "mcp_client", Cassette(path, mode="replay", speed="fast").wrap_mcp_client(Offline()))
+    replayed = client.post("/mcp/chat", json={"prompt": prompt}).get_json()
+    assert replayed["content"] == recorded["content"]
+    assert replayed["citations"] == recorded["citations"]
+    assert fake.stats()["calls"] == calls
@@ -0,0 +1,164 @@
+"""
+Response compression: negotiation, size threshold, validators and
+chunk-by-chunk compression of streamed responses
+"""
+
+import gzip
+import json
+import zlib
+
+import pytest
+from flask import Flask, Response, jsonify, stream_with_context
+from werkzeug.wrappers import Request
+
+from compression import ResponseCompressor
+
+BIG = {"content": "Veterans may apply for benefits online. " * 100}
+
+
+def accept(header):
+    return Request.from_values(headers={"Accept-Encoding": header}).accept_encodings
+
+
+@pytest.fixture
+def compressor():
+    return ResponseCompressor(min_size=256)
+
+
+@pytest.fixture
+def api(compressor):
+    app = Flask(__name__)
+    compressor.init_app(app)
+
+    @app.route("/big")
+    def big():
+        return jsonify(BIG)
+
+    @app.route("/small")
+    def small():
+        return jsonify({"ok": True})
+
+    @app.route("/tagged")
+    def tagged():
+        response = jsonify(BIG)
+        response.set_etag("abc")
+        return response
+
+    @app.route("/weak")
+    def weak():
+        response = jsonify(BIG)
+        response.set_etag("abc", weak=True)
+        return response
+
+    @app.route("/no-transform")
+    def no_transform():
+        response = jsonify(BIG)
+        response.headers["Cache-Control"] = "no-transform"
+        return response
+
+    @app.route("/png")
+    def png():
+        return Response(b"\x89PNG" + b"\0" * 2048, mimetype="image/png")
+
+    @app.route("/events")
+    def events():
+        def generate():
+            for i in range(5):
+                yield f"event: token\ndata: {json.dumps({'content': f'part {i} '})}\n\n"
+        return Response(stream_with_context(generate()), mimetype="text/event-stream")
+
+    return app.test_client()
+
+
+@pytest.mark.parametrize("header,expected", [
+    ("gzip", "gzip"),
+    ("gzip, deflate", "gzip"),
+    ("gzip, br", "br"),
+    ("gzip, br, zstd", "zstd"),
+    ("zstd;q=0.5, br;q=0.8, gzip", "gzip"),
+    ("br;q=0.9, gzip;q=0.5", "br"),
+    ("gzip;q=0, identity", None),
+    ("deflate", None),
+    ("", None),
+    ("*", "zstd")
+])
+def test_negotiation_follows_q_values_then_preference(compressor, header, expected):
+    if expected == "br":
+        pytest.importorskip("brotli")
+    if expected == "zstd":
+        pytest.importorskip("zstandard")
+    assert compressor.negotiate(accept(header)) == expected
+
+
+def test_preference_only_lists_available_encoders():
+    compressor = ResponseCompressor(preference=("snappy", "gzip"))
+    assert compressor.preference == ["gzip"]
+    assert compressor.negotiate(accept("snappy, gzip;q=0.1")) == "gzip"
+
+
+def test_large_json_is_compressed(api, compressor):
+    response = api.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert json.loads(gzip.decompress(response.data)) == BIG
+    stats = compressor.stats()
+    assert stats["compressed"] == 1 and stats["by_encoding"] == {"gzip": 1}
+    assert 0 < stats["ratio"] < 1
+
+
+def test_small_bodies_are_sent_as_is_but_still_vary(api, compressor):
+    response = api.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.get_json() == {"ok": True}
+    assert compressor.stats()["skipped_small"] == 1
+
+
+def test_identity_clients_get_identity_with_vary(api):
+    response = api.get("/big")
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.get_json() == BIG
+
+
+def test_strong_etag_gets_an_encoding_suffix(api):
+    assert api.get("/tagged", headers={"Accept-Encoding": "gzip"}).headers["ETag"] == '"abc-gzip"'
+    assert api.get("/tagged").headers["ETag"] == '"abc"'
+    assert api.get("/weak", headers={"Accept-Encoding": "gzip"}).headers["ETag"] == 'W/"abc"'
+
+
+@pytest.mark.parametrize("path", ["/no-transform", "/png"])
+def test_opted_out_and_binary_responses_pass_through(api, path):
+    response = api.get(path, headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert "Vary" not in response.headers
+
+
+def test_streamed_events_are_compressed_chunk_by_chunk(api, compressor):
+    response = api.get("/events", headers={"Accept-Encoding": "gzip"}, buffered=False)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+
+    # Every compressed chunk decodes to its whole event without waiting for
+    # the rest of the stream
+    decoder = zlib.decompressobj(wbits=31)
+    chunks = [chunk for chunk in response.response if chunk]
+    decoded = [decoder.decompress(chunk) for chunk in chunks]
+    response.close()
+    assert decoded[:5] == [
+        f"event: token\ndata: {json.dumps({'content': f'part {i} '})}\n\n".encode() for i in range(5)
+    ]
+    assert decoder.eof
+    assert compressor.stats()["streamed"] == 1
+
+
+def test_ask_stream_decodes_to_the_same_events(app, client, prompt):
+    if app.response_compressor is None:
+        pytest.skip("compression disabled")
+    client.post("/ask/stream", json={"prompt": prompt})
+    # Both replay the cached answer, so their events match byte for byte
+    plain = client.post("/ask/stream", json={"prompt": prompt})
+    compressed = client.post("/ask/stream", json={"prompt": prompt}, headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in plain.headers
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(compressed.data) == plain.data
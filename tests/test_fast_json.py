@@ -0,0 +1,63 @@
+"""
+fast_json matches Flask's default provider for the types jsonify() accepts,
+on both backends
+"""
+
+import dataclasses
+import datetime
+import decimal
+import json
+import uuid
+
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import fast_json
+
+
+@dataclasses.dataclass
+class Citation:
+    file: str
+    page: int
+    retrieved: datetime.date
+
+
+VALUE = {
+    "date": datetime.date(2026, 1, 2),
+    "datetime": datetime.datetime(2026, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+    "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "decimal": decimal.Decimal("1.10"),
+    "citation": Citation("m21-1.pdf", 4, datetime.date(2026, 1, 2)),
+    "wide": 2 ** 70
+}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(fast_json, "orjson", None)
+    return request.param
+
+
+def test_matches_flasks_default_provider(backend):
+    expected = json.loads(DefaultJSONProvider(Flask(__name__)).dumps(VALUE))
+    assert expected["datetime"] == "Fri, 02 Jan 2026 03:04:05 GMT"
+    assert json.loads(fast_json.dumps(VALUE)) == expected
+    assert fast_json.loads(fast_json.dumps_bytes(VALUE, sort_keys=True)) == expected
+
+
+def test_jsonify_uses_the_fallback(backend):
+    app = Flask(__name__)
+    app.json = fast_json.FastJSONProvider(app)
+    with app.app_context():
+        body = app.json.response(VALUE).get_json()
+    assert body["date"] == "Fri, 02 Jan 2026 00:00:00 GMT"
+    assert body["citation"] == {"file": "m21-1.pdf", "page": 4, "retrieved": "Fri, 02 Jan 2026 00:00:00 GMT"}
+
+
+def test_unknown_types_still_raise(backend):
+    with pytest.raises(TypeError):
+        fast_json.dumps({"value": object()})
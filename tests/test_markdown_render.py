@@ -0,0 +1,88 @@
+"""
+Server-side markdown rendering: sanitizing, the plain-text fallback and
+memoization
+"""
+
+import re
+
+import pytest
+
+import markdown_render
+from markdown_render import MarkdownRenderer
+
+
+@pytest.fixture
+def renderer():
+    pytest.importorskip("mistune")
+    return MarkdownRenderer()
+
+
+@pytest.mark.parametrize("markdown", [
+    "[apply](javascript:alert(1))",
+    "[apply](JaVaScRiPt:alert(1))",
+    "[apply](  javascript:alert(1))",
+    "[apply](java&#115;cript:alert(1))",
+    "[apply](data:text/html,<script>alert(1)</script>)",
+    "![form](javascript:alert(1))"
+])
+def test_unsafe_link_schemes_are_dropped(renderer, markdown):
+    rendered = renderer.render(markdown)
+    urls = re.findall(r'(?:href|src)="([^"]*)"', rendered)
+    assert len(urls) == 1
+    assert not re.match(r"\s*(javascript|data|java&)", urls[0], re.IGNORECASE)
+
+
+def test_raw_html_is_escaped(renderer):
+    rendered = renderer.render('<script>alert(1)</script> <a href="javascript:alert(1)">x</a>')
+    assert "<script>" not in rendered and "<a " not in rendered
+    assert "&lt;script&gt;" in rendered
+
+
+def test_safe_links_and_markdown_survive(renderer):
+    rendered = renderer.render("**Eligibility**: see [the manual](https://www.va.gov/m21-1) and ~~old~~ rules")
+    assert '<a href="https://www.va.gov/m21-1">the manual</a>' in rendered
+    assert "<strong>Eligibility</strong>" in rendered
+    assert "<del>old</del>" in rendered
+
+
+def test_with_html_adds_rendered_content_without_touching_the_payload(renderer):
+    payload = {"content": "[x](javascript:alert(1))", "citations": []}
+    shaped = renderer.with_html(payload)
+    assert "html" not in payload
+    assert "javascript:" not in shaped["html"]
+    assert renderer.with_html({"content": ""}) == {"content": ""}
+
+
+def test_repeated_answers_are_rendered_once(renderer):
+    first = renderer.render("# Title")
+    assert renderer.render("# Title") is first
+    renderer.render("# Other")
+    stats = renderer.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 2)
+
+
+def test_memo_is_bounded():
+    renderer = MarkdownRenderer(max_entries=2)
+    for text in ("a", "b", "c"):
+        renderer.render(text)
+    assert renderer.stats()["entries"] == 2
+
+
+def test_plain_fallback_escapes_everything(monkeypatch):
+    monkeypatch.setattr(markdown_render, "mistune", None)
+    renderer = MarkdownRenderer()
+    assert renderer.engine == "plain"
+    assert renderer.render('<a href="javascript:alert(1)">x</a>\nnext') == \
+        "&lt;a href=&quot;javascript:alert(1)&quot;&gt;x&lt;/a&gt;<br>\nnext"
+
+
+def test_ask_html_is_sanitized(app, client, monkeypatch, prompt):
+    pytest.importorskip("mistune")
+    monkeypatch.setattr(app, "answer_question", lambda prompt, options=None, deadline=None: (
+        {"content": "Apply [here](javascript:alert(1))", "citations": [], "source": "mcp_server"},
+        200
+    ))
+    body = client.post("/ask", json={"prompt": prompt, "html": True}).get_json()
+    assert body["content"] == "Apply [here](javascript:alert(1))"
+    assert "javascript:" not in body["html"]
+    assert "<a " in body["html"]
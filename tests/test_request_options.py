@@ -0,0 +1,125 @@
+"""
+Validation and coercion of request options on the answer routes
+"""
+
+import json
+
+import pytest
+
+
+@pytest.mark.parametrize("field, value", [
+    ("concurrency", "abc"),
+    ("concurrency", 0),
+    ("concurrency", -2),
+    ("concurrency", 2.5),
+    ("concurrency", None),
+    ("concurrency", [4]),
+    ("item_timeout", "soon"),
+    ("item_timeout", 0),
+    ("item_timeout", -1),
+    ("item_timeout", "nan"),
+    ("item_timeout", "inf"),
+    ("stream", "maybe")
+])
+def test_batch_rejects_invalid_settings(client, fake, prompt, field, value):
+    calls = fake.stats()["calls"]
+    response = client.post("/ask/batch", json={"prompts": [prompt], field: value})
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body["success"] is False
+    assert body["code"] == 400
+    assert field in body["error"]
+    assert fake.stats()["calls"] == calls
+
+
+def test_batch_accepts_numeric_strings_and_caps_concurrency(app, client, prompt):
+    response = client.post("/ask/batch", json={
+        "prompts": [prompt], "concurrency": str(app.BATCH_MAX_CONCURRENCY + 10), "item_timeout": "5"
+    })
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["concurrency"] == app.BATCH_MAX_CONCURRENCY
+    assert body["succeeded"] == 1
+
+
+def test_batch_concurrency_never_exceeds_the_connection_pool(app, client, monkeypatch, prompt):
+    assert app.mcp_client.pool_size >= app.BATCH_MAX_CONCURRENCY
+    monkeypatch.setattr(app.mcp_client, "pool_size", 3)
+    body = client.post("/ask/batch", json={"prompts": [prompt], "concurrency": 8}).get_json()
+    assert body["concurrency"] == 3
+
+
+@pytest.mark.parametrize("value, streamed", [("false", False), ("0", False), (False, False), ("true", True), (1, True)])
+def test_batch_stream_flag_is_coerced(client, prompt, value, streamed):
+    response = client.post("/ask/batch", json={"prompts": [prompt], "stream": value})
+    assert response.status_code == 200
+    if streamed:
+        assert response.mimetype == "application/x-ndjson"
+        lines = response.get_data(as_text=True).splitlines()
+        assert [json.loads(line)["success"] for line in lines] == [True]
+    else:
+        assert response.mimetype == "application/json"
+        assert response.get_json()["count"] == 1
+
+
+@pytest.mark.parametrize("route", ["/ask", "/mcp/chat", "/mcp/test"])
+@pytest.mark.parametrize("value", ["abc", -1, "-5", 12.5, True, [10]])
+def test_invalid_snippet_chars_is_a_400(client, fake, prompt, route, value):
+    calls = fake.stats()["calls"]
+    response = client.post(route, json={"prompt": prompt, "compact": True, "snippet_chars": value})
+    assert response.status_code == 400
+    assert "snippet_chars" in response.get_json()["error"]
+    assert fake.stats()["calls"] == calls
+
+
+def test_invalid_snippet_chars_in_the_query_string_is_a_400(client, prompt):
+    response = client.post("/mcp/chat?compact=true&snippet_chars=lots", json={"prompt": prompt})
+    assert response.status_code == 400
+    assert response.get_json()["code"] == 400
+
+
+@pytest.mark.parametrize("snippet_chars", [0, "0", 24, "24"])
+def test_snippet_chars_bounds_highlights(client, prompt, snippet_chars):
+    response = client.post("/mcp/chat", json={"prompt": prompt, "compact": True, "snippet_chars": snippet_chars})
+    assert response.status_code == 200
+    assert response.get_json()["citations"]
+    for citation in response.get_json()["citations"]:
+        assert len(citation.get("text", "")) <= int(snippet_chars) + 1
+
+
+def test_flag_strings_in_the_body_are_coerced(client, prompt):
+    plain = client.post("/mcp/chat", json={"prompt": prompt, "compact": "false", "html": "false"}).get_json()
+    assert "html" not in plain
+    shaped = client.post("/mcp/chat", json={"prompt": prompt, "compact": "true", "html": "true"}).get_json()
+    assert "html" in shaped
+
+
+@pytest.mark.parametrize("route", ["/ask", "/mcp/chat", "/mcp/test"])
+@pytest.mark.parametrize("value", [5, {"content": True}, ["content", 3]])
+def test_invalid_fields_is_a_400(client, fake, prompt, route, value):
+    calls = fake.stats()["calls"]
+    response = client.post(route, json={"prompt": prompt, "fields": value})
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "fields must be a string or list of strings"
+    assert fake.stats()["calls"] == calls
+
+
+def test_fields_selects_keys(client, prompt):
+    body = client.post("/mcp/chat", json={"prompt": prompt, "fields": ["content", "citations.url"]}).get_json()
+    assert set(body) == {"content", "citations"}
+    assert all(set(citation) == {"url"} for citation in body["citations"])
+
+
+@pytest.mark.parametrize("value, rendered", [("false", False), (False, False), ("true", True), (True, True)])
+def test_stream_html_flag_is_coerced(client, prompt, value, rendered):
+    body = client.post("/ask/stream", json={"prompt": prompt, "html": value}).get_data(as_text=True)
+    done = body.split("event: done\ndata: ")[1]
+    assert ('"html":' in done) is rendered
+
+
+def test_stream_rejects_an_invalid_html_flag(client, fake, prompt):
+    calls = fake.stats()["calls"]
+    response = client.post("/ask/stream", json={"prompt": prompt, "html": "maybe"})
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "html must be a boolean"
+    assert fake.stats()["calls"] == calls
@@ -0,0 +1,403 @@
+"""
+State transitions of the resilience primitives, exercised directly
+"""
+
+import threading
+import time
+
+import pytest
+
+from admission import AdaptiveConcurrencyLimit
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from hedging import HedgedDispatcher
+from rate_limiter import SharedTokenBucket
+from retry_policy import RetryPolicy, parse_retryable
+from singleflight import SingleFlight
+
+TIMEOUT = {"success": False, "code": "timeout"}
+UNAVAILABLE = {"success": False, "code": 503}
+THROTTLED = {"success": False, "code": 429}
+
+
+# Circuit breaker
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3)
+    breaker.record(TIMEOUT)
+    breaker.record(UNAVAILABLE)
+    breaker.record({"success": True})
+    breaker.record(TIMEOUT)
+    breaker.record(TIMEOUT)
+    assert breaker.state == CLOSED
+    breaker.record(UNAVAILABLE)
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_breaker_ignores_client_side_errors():
+    breaker = CircuitBreaker(failure_threshold=2)
+    for _ in range(5):
+        breaker.record(THROTTLED)
+        breaker.record({"success": False, "code": 401})
+    assert breaker.state == CLOSED
+
+
+def test_breaker_half_open_trial_closes_or_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    time.sleep(0.06)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.stats()["transitions"] == {"closed->open": 1, "open->half_open": 2, "half_open->open": 1,
+                                              "half_open->closed": 1}
+
+
+def test_breaker_release_frees_half_open_slot_without_closing():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.release()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+
+
+# Single-flight
+
+def test_singleflight_collapses_concurrent_calls():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(1)
+        return "answer"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+    leader.start()
+    started.wait(1)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(3)]
+    for t in followers:
+        t.start()
+    while flight.stats()["collapsed"] < 3:
+        time.sleep(0.005)
+    release.set()
+    for t in [leader] + followers:
+        t.join(1)
+
+    assert calls == [1]
+    assert sorted(results, key=lambda r: r[1]) == [("answer", False)] + [("answer", True)] * 3
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_singleflight_shares_errors_and_times_out_waiters():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(1)
+        raise ValueError("upstream broke")
+
+    errors = []
+
+    def call(timeout=None):
+        try:
+            flight.do("k", failing, timeout=timeout)
+        except Exception as e:
+            errors.append(type(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(1)
+    impatient = threading.Thread(target=call, kwargs={"timeout": 0.02})
+    patient = threading.Thread(target=call)
+    impatient.start()
+    patient.start()
+    impatient.join(1)
+    assert errors == [TimeoutError]
+    release.set()
+    leader.join(1)
+    patient.join(1)
+    assert sorted(e.__name__ for e in errors) == ["TimeoutError", "ValueError", "ValueError"]
+
+    # The key is free again: a new call runs
+    assert flight.do("k", lambda: 1) == (1, False)
+
+
+def test_singleflight_stream_replays_to_late_joiners():
+    flight = SingleFlight()
+    gate = threading.Event()
+    sources = []
+
+    def source():
+        sources.append(1)
+        yield "a"
+        gate.wait(1)
+        yield "b"
+
+    first, shared = flight.stream("k", source, timeout=1)
+    assert not shared
+    assert next(first) == "a"
+    late, shared = flight.stream("k", source, timeout=1)
+    assert shared
+    gate.set()
+    assert list(first) == ["b"]
+    assert list(late) == ["a", "b"]
+    assert sources == [1]
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_singleflight_stream_closes_its_source_when_nobody_reads():
+    flight = SingleFlight()
+    closed = threading.Event()
+
+    def source():
+        try:
+            while True:
+                yield "tick"
+                time.sleep(0.01)
+        finally:
+            closed.set()
+
+    events, _ = flight.stream("k", source, timeout=1)
+    assert next(events) == "tick"
+    events.close()
+    assert closed.wait(1)
+
+    # A stalled source times out the callers that joined it
+    def stalled():
+        time.sleep(0.5)
+        yield "late"
+
+    first, _ = flight.stream("stalled", stalled, timeout=0.05)
+    joined, _ = flight.stream("stalled", stalled, timeout=0.05)
+    with pytest.raises(TimeoutError):
+        next(joined)
+    assert next(first) == "late"
+
+
+# Hedged dispatch
+
+def slow(seconds, payload, status=200):
+    def fn():
+        time.sleep(seconds)
+        return payload, status
+    return fn
+
+
+def test_hedge_not_fired_for_fast_primary():
+    hedger = HedgedDispatcher(max_workers=4, delay=0.2)
+    assert hedger.run(slow(0, "p"), slow(0, "b")) == ("p", 200, "primary", False)
+    assert hedger.stats()["hedges_fired"] == 0
+
+
+def test_hedge_backup_wins_against_slow_primary():
+    hedger = HedgedDispatcher(max_workers=4, delay=0.02)
+    assert hedger.run(slow(0.5, "p"), slow(0, "b")) == ("b", 200, "backup", True)
+    assert hedger.stats()["backup_wins"] == 1
+
+
+def test_hedge_falls_back_when_primary_fails():
+    hedger = HedgedDispatcher(max_workers=4, delay=1)
+    assert hedger.run(slow(0, "p", 502), slow(0, "b")) == ("b", 200, "backup", False)
+    assert hedger.stats()["fallbacks"] == 1
+
+
+def test_hedge_respects_timeout():
+    hedger = HedgedDispatcher(max_workers=4, delay=0.02)
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        hedger.run(slow(0.5, "p"), slow(0.5, "b"), timeout=0.1)
+    assert time.monotonic() - start < 0.3
+    assert hedger.stats()["timeouts"] == 1
+
+
+def test_no_hedging_until_enough_samples():
+    hedger = HedgedDispatcher(max_workers=4, min_delay=0.01, min_samples=3)
+    assert hedger.current_delay() is None
+    backup_calls = []
+
+    def backup():
+        backup_calls.append(1)
+        return "b", 200
+
+    # Cold: a slow primary is waited for, never raced
+    assert hedger.run(slow(0.1, "p"), backup) == ("p", 200, "primary", False)
+    with pytest.raises(TimeoutError):
+        hedger.run(slow(0.5, "p"), backup, timeout=0.1)
+    assert backup_calls == []
+    assert hedger.stats()["current_delay_s"] is None
+
+    for _ in range(2):
+        hedger.run(slow(0.02, "p"), backup)
+    assert hedger.current_delay() is not None
+    assert hedger.run(slow(0.5, "p"), backup) == ("b", 200, "backup", True)
+
+
+def test_hedge_delay_tracks_p95():
+    hedger = HedgedDispatcher(max_workers=4, default_delay=5, min_delay=0.01, min_samples=5)
+    assert hedger.current_delay() == 5
+    for _ in range(5):
+        hedger.run(slow(0.02, "p"), slow(0, "b"))
+    assert 0.01 <= hedger.current_delay() < 1
+
+
+# Shared token bucket
+
+def test_bucket_burst_then_waits_for_refill(tmp_path):
+    bucket = SharedTokenBucket(rate=20, burst=2, path=str(tmp_path / "bucket"))
+    assert bucket.acquire(0) == 0
+    assert bucket.acquire(0) == 0
+    assert bucket.acquire(0.01) is None
+    waited = bucket.acquire(1)
+    assert 0.02 < waited < 0.2
+    assert bucket.stats()["rejected"] == 1
+
+
+def test_bucket_is_shared_through_its_file(tmp_path):
+    path = str(tmp_path / "bucket")
+    first = SharedTokenBucket(rate=0.5, burst=3, path=path)
+    second = SharedTokenBucket(rate=0.5, burst=3, path=path)
+    assert first.acquire(0) == 0
+    assert second.acquire(0) == 0
+    assert first.acquire(0) == 0
+    assert second.acquire(0) is None
+
+
+def test_bucket_throttle_blocks_and_recovers(tmp_path):
+    bucket = SharedTokenBucket(rate=10, burst=5, min_rate=1, recovery_step=1, path=str(tmp_path / "bucket"))
+    bucket.on_throttled(retry_after=0.1)
+    stats = bucket.stats()
+    assert stats["rate"] == 5
+    assert stats["tokens"] == 0
+    assert stats["blocked_for_s"] > 0.05
+    # No token is handed out while blocked, however long the caller waits
+    assert bucket.acquire(0.05) is None
+    waited = bucket.acquire(1)
+    assert waited >= 0.1
+
+    bucket.on_success()
+    bucket.on_success()
+    assert bucket.stats()["rate"] == 7
+    for _ in range(10):
+        bucket.on_success()
+    assert bucket.stats()["rate"] == 10
+
+
+def test_bucket_queue_is_bounded(tmp_path):
+    bucket = SharedTokenBucket(rate=5, burst=1, max_queue=1, path=str(tmp_path / "bucket"))
+    assert bucket.acquire(0) == 0
+    waiter = threading.Thread(target=bucket.acquire, args=(1,))
+    waiter.start()
+    while bucket.stats()["queue_depth"] < 1:
+        time.sleep(0.005)
+    assert bucket.acquire(1) is None
+    assert bucket.stats()["queue_full"] == 1
+    waiter.join(1)
+    assert bucket.stats()["acquired"] == 2
+
+
+# Retry policy
+
+def test_retry_policy_only_retries_retryable_codes():
+    policy = RetryPolicy(base_delay=0.01)
+    assert policy.next_delay({"success": False, "code": 500}, 0) is None
+    assert policy.next_delay(TIMEOUT, 0) is None
+    assert policy.next_delay(UNAVAILABLE, 0) is not None
+    assert policy.next_delay(UNAVAILABLE, 2) is None
+    assert policy.stats()["gave_up_attempts"] == 1
+    assert parse_retryable("429, 503,timeout") == (429, 503, "timeout")
+
+
+def test_retry_policy_honours_retry_after_and_deadline():
+    policy = RetryPolicy(base_delay=0.01, max_retry_after=1)
+    assert policy.next_delay(dict(THROTTLED, retry_after=0.5), 0) == 0.5
+    assert policy.next_delay(dict(THROTTLED, retry_after=2), 0) is None
+    assert policy.next_delay(dict(THROTTLED, retry_after=0.5), 0, remaining=0.6) is None
+    stats = policy.stats()
+    assert stats["gave_up_retry_after"] == 1
+    assert stats["gave_up_deadline"] == 1
+
+
+def test_retry_budget_limits_retries_per_window():
+    policy = RetryPolicy(base_delay=0.001, budget_ratio=0.5, budget_min=1, budget_window=0.2)
+    for _ in range(2):
+        policy.record_call()
+    # budget_min + 0.5 * 2 calls = 2 retries in the window
+    assert policy.next_delay(UNAVAILABLE, 0) is not None
+    assert policy.next_delay(UNAVAILABLE, 0) is not None
+    assert policy.next_delay(UNAVAILABLE, 0) is None
+    assert policy.stats()["gave_up_budget"] == 1
+    assert policy.stats()["budget_remaining"] == 0
+
+    time.sleep(0.25)
+    assert policy.stats()["budget_remaining"] == 1
+    assert policy.next_delay(UNAVAILABLE, 0) is not None
+
+
+# Adaptive concurrency limit
+
+def test_admission_sheds_over_the_limit():
+    limit = AdaptiveConcurrencyLimit(initial_limit=2, min_limit=1, max_limit=4)
+    assert limit.try_acquire()
+    assert limit.try_acquire()
+    assert not limit.try_acquire()
+    limit.release(0.01)
+    assert limit.try_acquire()
+    assert limit.stats()["shed"] == 1
+
+
+def test_admission_backs_off_once_per_latency():
+    limit = AdaptiveConcurrencyLimit(initial_limit=10, min_limit=2, latency_target=0.5, backoff=0.5)
+    for _ in range(3):
+        limit.try_acquire()
+    for _ in range(3):
+        limit.release(1.0)
+    assert limit.limit == 5
+    assert limit.stats()["decreases"] == 1
+
+    limit.try_acquire()
+    limit._last_decrease -= 1.0
+    limit.release(0.1, ok=False)
+    assert limit.limit == 2
+
+
+def test_admission_grows_only_while_in_use():
+    limit = AdaptiveConcurrencyLimit(initial_limit=4, max_limit=5)
+    limit.try_acquire()
+    limit.release(0.01)
+    assert limit.stats()["increases"] == 0
+
+    for _ in range(10):
+        for _ in range(3):
+            limit.try_acquire()
+        for _ in range(3):
+            limit.release(0.01)
+    assert limit.limit == 5
+    assert limit.stats()["in_flight"] == 0
+
+
+def test_admission_ceiling_can_be_lowered():
+    limit = AdaptiveConcurrencyLimit(initial_limit=20, min_limit=4, max_limit=100)
+    limit.set_max_limit(3)
+    assert limit.limit == 3
+    assert limit.min_limit == 3
+    for _ in range(3):
+        assert limit.try_acquire()
+    assert not limit.try_acquire()
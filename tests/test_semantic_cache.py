@@ -0,0 +1,57 @@
+"""
+Semantic cache matching, on both the numpy and the pure-Python local store
+"""
+
+import time
+
+import pytest
+
+import semantic_cache
+from semantic_cache import HashingEmbedder, LocalVectorStore, SemanticCache
+
+ANSWER = {"content": "Apply online with VA Form 21-526EZ."}
+
+
+@pytest.fixture(params=["numpy", "python"])
+def store(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(semantic_cache, "numpy", None)
+    return LocalVectorStore(max_entries=3)
+
+
+def test_similar_prompt_hits(store):
+    cache = SemanticCache(HashingEmbedder(), store, threshold=0.7)
+    cache.store_answer("how do I apply for disability compensation", ANSWER)
+    value, similarity, _ = cache.lookup("how do I apply for disability compensation benefits")
+    assert value == ANSWER
+    assert similarity >= 0.7
+    assert cache.lookup("what is the GI Bill housing allowance")[0] is None
+
+
+def test_prompts_with_different_numbers_never_match(store):
+    cache = SemanticCache(HashingEmbedder(), store, threshold=0.5)
+    cache.store_answer("what is the monthly payment for a 100 percent rating", ANSWER)
+    assert cache.lookup("what is the monthly payment for a 50 percent rating")[0] is None
+    assert cache.lookup("what is the monthly payment for a 100 percent rating")[0] == ANSWER
+
+
+def test_options_and_ttl_are_respected(store):
+    cache = SemanticCache(HashingEmbedder(), store, threshold=0.9, ttl=0.05)
+    cache.store_answer("how do I appeal a decision", ANSWER, options={"temperature": 0})
+    assert cache.lookup("how do I appeal a decision", options={"temperature": 1})[0] is None
+    assert cache.lookup("how do I appeal a decision", options={"temperature": 0})[0] == ANSWER
+    time.sleep(0.06)
+    assert cache.lookup("how do I appeal a decision", options={"temperature": 0})[0] is None
+
+
+def test_oldest_entries_are_evicted(store):
+    cache = SemanticCache(HashingEmbedder(), store, threshold=0.99)
+    prompts = ["pension eligibility", "survivors benefits", "education benefits", "home loan guaranty"]
+    for prompt in prompts:
+        cache.store_answer(prompt, {"content": prompt})
+    assert store.size() == 3
+    assert cache.lookup(prompts[0])[0] is None
+    for prompt in prompts[1:]:
+        assert cache.lookup(prompt)[0] == {"content": prompt}
@@ -0,0 +1,108 @@
+"""
+The precompressed home page and fingerprinted assets: encodings, ETags and
+revalidation
+"""
+
+import gzip
+import re
+
+import pytest
+from werkzeug.wrappers import Request
+
+import static_assets
+from static_assets import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, StaticAsset
+
+
+def revalidate(client, path, accept_encoding):
+    first = client.get(path, headers={"Accept-Encoding": accept_encoding})
+    again = client.get(path, headers={"Accept-Encoding": accept_encoding, "If-None-Match": first.headers["ETag"]})
+    return first, again
+
+
+def test_zstd_only_client_gets_a_precompressed_body_and_a_304(client):
+    pytest.importorskip("zstandard")
+    first, again = revalidate(client, "/", "zstd")
+    assert first.headers["Content-Encoding"] == "zstd"
+    assert "no-transform" in first.headers["Cache-Control"]
+    assert again.status_code == 304
+
+
+def test_identity_bodies_are_not_recompressed(app, client, monkeypatch):
+    # Without a stored zstd body a zstd-only client gets identity, and the
+    # API compressor must leave it (and its ETag) alone
+    monkeypatch.setattr(static_assets, "zstandard", None)
+    page = StaticAsset(b"<p>" + b"benefits " * 400 + b"</p>", "text/html; charset=utf-8", REVALIDATE_CACHE_CONTROL)
+    monkeypatch.setattr(app.static_assets, "index", page)
+
+    first, again = revalidate(client, "/", "zstd")
+    assert "Content-Encoding" not in first.headers
+    assert first.headers["ETag"] == f'"{page.etag("identity")}"'
+    assert again.status_code == 304
+
+
+def asset_urls(client):
+    html = client.get("/", headers={"Accept-Encoding": "identity"}).get_data(as_text=True)
+    return re.findall(r'(?:href|src)="(/assets/[^"]+)"', html)
+
+
+def test_index_references_fingerprinted_immutable_assets(app, client):
+    urls = asset_urls(client)
+    assert sorted(urls) == sorted(app.static_assets.urls.values())
+    assert "{{" not in client.get("/").get_data(as_text=True)
+
+    for url in urls:
+        assert re.fullmatch(r"/assets/app\.[0-9a-f]{16}\.(css|js)", url)
+        response = client.get(url, headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert gzip.decompress(response.data) == app.static_assets.get(url.rsplit("/", 1)[1]).bodies["identity"]
+
+
+@pytest.mark.parametrize("accept_encoding,encoding", [
+    ("gzip", "gzip"),
+    ("gzip, br", "br"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("identity", "identity"),
+    ("", "identity")
+])
+def test_each_encoding_revalidates_against_its_own_etag(app, client, accept_encoding, encoding):
+    if encoding == "br":
+        pytest.importorskip("brotli")
+    first, again = revalidate(client, "/", accept_encoding)
+    assert first.status_code == 200
+    assert first.headers.get("Content-Encoding", "identity") == encoding
+    assert first.headers["ETag"] == f'"{app.static_assets.index.etag(encoding)}"'
+    assert first.headers["Cache-Control"] == REVALIDATE_CACHE_CONTROL
+
+    assert again.status_code == 304
+    assert again.data == b""
+    assert again.headers["ETag"] == first.headers["ETag"]
+    assert again.headers["Vary"] == "Accept-Encoding"
+
+
+def test_etag_for_another_encoding_or_a_stale_one_gets_a_full_body(app, client):
+    index = app.static_assets.index
+    for etag in (index.etag("identity"), "0123456789abcdef-gzip"):
+        response = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": f'"{etag}"'})
+        assert response.status_code == 200
+        assert response.data == index.bodies["gzip"]
+
+
+def test_weak_and_listed_validators_match(app, client):
+    etag = app.static_assets.index.etag("gzip")
+    for if_none_match in (f'W/"{etag}"', f'"stale", "{etag}"', "*"):
+        response = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": if_none_match})
+        assert response.status_code == 304
+
+
+def test_unknown_asset_is_a_404(client):
+    response = client.get("/assets/app.0000000000000000.css")
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "Not found"}
+
+
+def test_small_bodies_are_only_stored_uncompressed():
+    asset = StaticAsset(b"body{}", "text/css; charset=utf-8", IMMUTABLE_CACHE_CONTROL)
+    assert list(asset.bodies) == ["identity"]
+    assert asset.select_encoding(Request.from_values(headers={"Accept-Encoding": "gzip, br"}).accept_encodings) == "identity"
@@ -0,0 +1,84 @@
+"""
+/ask/stream: Server-Sent Events framing, cached replay and the SDK fallback
+"""
+
+import json
+
+
+def parse_sse(body):
+    """[(event, data)] from an SSE body, checking every message's framing"""
+    assert body.endswith("\n\n")
+    events = []
+    for block in body[:-2].split("\n\n"):
+        event_line, data_line = block.split("\n")
+        assert event_line.startswith("event: ") and data_line.startswith("data: ")
+        events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return events
+
+
+def ask_stream(client, prompt, **fields):
+    response = client.post("/ask/stream", json=dict(fields, prompt=prompt))
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert response.headers["X-Accel-Buffering"] == "no"
+    return parse_sse(response.get_data(as_text=True))
+
+
+def test_tokens_then_citations_then_done(client, prompt):
+    events = ask_stream(client, prompt)
+    names = [name for name, _ in events]
+    assert names[0] == "token" and names[-1] == "done"
+    assert names.count("citation") == 2
+    assert names.index("citation") > max(i for i, name in enumerate(names) if name == "token")
+
+    content = "".join(data["content"] for name, data in events if name == "token")
+    assert prompt in content
+    for name, data in events:
+        if name == "citation":
+            assert {"file", "page", "url"} <= set(data)
+    done = events[-1][1]
+    assert done["source"] == "mcp_server"
+    assert done["metadata"]["cached"] is False
+    assert "html" not in done
+
+
+def test_streamed_answer_is_cached_and_replayed(client, fake, prompt):
+    first = ask_stream(client, prompt)
+    calls = fake.stats()["calls"]
+    again = ask_stream(client, prompt, html=True)
+    assert fake.stats()["calls"] == calls
+
+    assert [name for name, _ in again] == ["token", "citation", "citation", "done"]
+    assert again[0][1]["content"] == "".join(data["content"] for name, data in first if name == "token")
+    assert again[-1][1]["metadata"]["cached"] is True
+    assert again[-1][1]["html"].startswith("<p>")
+
+    # /ask shares the cache with the stream
+    assert client.post("/ask", json={"prompt": prompt}).get_json()["metadata"]["cached"] is True
+
+
+def test_failed_mcp_stream_falls_back_to_the_sdk(app, client, fake, monkeypatch, prompt):
+    fake.config.error_rate = 1.0
+    monkeypatch.setattr(app, "sdk_answer", lambda prompt, deadline=None: (
+        {"content": "From the SDK", "citations": [{"file": "m21-1.pdf", "page": 2, "url": "#"}], "source": "pinecone_sdk"},
+        200
+    ))
+    events = ask_stream(client, prompt)
+    assert [name for name, _ in events] == ["token", "citation", "done"]
+    assert events[0][1] == {"content": "From the SDK"}
+    assert events[-1][1]["source"] == "pinecone_sdk"
+
+
+def test_failed_fallback_ends_with_an_error_event(app, client, fake, monkeypatch, prompt):
+    fake.config.error_rate = 1.0
+    monkeypatch.setattr(app, "sdk_answer", lambda prompt, deadline=None: (
+        {"error": "Neither MCP server nor Pinecone SDK available"}, 500
+    ))
+    assert ask_stream(client, prompt) == [("error", {"error": "Neither MCP server nor Pinecone SDK available"})]
+
+
+def test_missing_prompt_is_a_400(client):
+    response = client.post("/ask/stream", json={})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "No prompt provided"}